@@ -31,6 +31,7 @@ from frappe_social.frappe_social.api.analytics import (
     fetch_post_analytics_now,
     get_summary,
     get_post_analytics,
+    get_post_metric_series,
     get_top_posts,
     compare_platforms,
 )
@@ -53,6 +54,7 @@ __all__ = [
     "fetch_post_analytics_now",
     "get_summary",
     "get_post_analytics",
+    "get_post_metric_series",
     "get_top_posts",
     "compare_platforms",
 ]
@@ -1,8 +1,11 @@
 import frappe
 from frappe import _
-from frappe.utils import today, add_days, now_datetime
+from frappe.utils import now_datetime
 from typing import List, Dict, Any
+from frappe_social.frappe_social.services.analytics_cache import AnalyticsCache
 from frappe_social.frappe_social.services.analytics_service import AnalyticsService
+from frappe_social.frappe_social.services.metric_series import MetricSeries
+from frappe_social.frappe_social.services.post_leaderboard import PostLeaderboard
 from frappe_social.frappe_social.providers import get_provider
 
 
@@ -41,6 +44,19 @@ def get_post_analytics(post_name: str) -> dict:
     return {post.platform: latest[0] if latest else {"error": "No data yet"}}
 
 
+@frappe.whitelist()
+def get_post_metric_series(posts, start: str = None, end: str = None, metrics=None) -> dict:
+    """
+    Metric time series for one or many posts: {post_name: [{"ts", "resolution", <metric>...}]}
+
+    `posts` and `metrics` take a name or a JSON list; `start`/`end` bound the timestamps
+    """
+    posts = frappe.parse_json(posts) if str(posts).startswith("[") else [posts]
+    if metrics:
+        metrics = frappe.parse_json(metrics) if str(metrics).startswith("[") else [metrics]
+    return MetricSeries.get_series(posts, start, end, metrics)
+
+
 @frappe.whitelist()
 def get_summary(integration: str, days: int = 30) -> dict:
     """Get analytics summary for an integration"""
@@ -48,42 +64,21 @@ def get_summary(integration: str, days: int = 30) -> dict:
 
 
 @frappe.whitelist()
-def get_top_posts(days: int = 30, limit: int = 10) -> List[dict]:
-    """Get top performing posts (adapted for no child table)"""
+def get_top_posts(
+    days: int = 30, limit: int = 10, start: int = 0, platform: str = None, organization: str = None
+) -> List[dict]:
+    """
+    Top performing posts by engagement rate, served from the Redis leaderboards.
+    `days` is rounded up to a leaderboard window (7, 30 or 90); `start` pages through the ranking
+    """
     try:
-        start_date = add_days(today(), -int(days))
         limit_val = int(limit)
         if limit_val <= 0 or limit_val > 100:
             limit_val = 10
 
-        # Since there's no platforms child table, we join on post.platform and analytics.platform
-        posts = frappe.db.sql(
-            """
-            SELECT
-                sp.name,
-                sp.content,
-                sp.published_time,
-                sp.platform,
-                spa.impressions,
-                spa.reach,
-                spa.likes,
-                spa.comments,
-                spa.shares,
-                spa.engagement_rate
-            FROM `tabSocial Post` sp
-            LEFT JOIN `tabSocial Post Analytics` spa
-                ON spa.social_post = sp.name
-                AND spa.platform = sp.platform
-            WHERE sp.status = 'Published'
-              AND sp.published_time >= %s
-            ORDER BY COALESCE(spa.engagement_rate, 0) DESC
-            LIMIT %s
-        """,
-            (start_date, limit_val),
-            as_dict=True,
+        return PostLeaderboard.get_top(
+            int(days), limit_val, max(int(start), 0), platform or None, organization or None
         )
-
-        return posts or []
     except Exception as e:
         frappe.log_error(f"Error fetching top posts: {str(e)}", "Analytics API")
         return []
@@ -93,41 +88,10 @@ def get_top_posts(days: int = 30, limit: int = 10) -> List[dict]:
 def compare_platforms(days: int = 30) -> dict:
     """Compare analytics across connected platforms (works with one or many)"""
     try:
-        start_date = add_days(today(), -int(days))
-        integrations = frappe.get_all(
-            "Social Integration", filters={"enabled": 1, "connection_status": "Connected"}, pluck="name"
+        days = int(days)
+        return AnalyticsCache.get_or_build(
+            f"compare_platforms:{days}", lambda: AnalyticsService.compare_platforms(days)
         )
-
-        if not integrations:
-            return {}
-
-        comparison = {}
-        for name in integrations:
-            try:
-                integration = frappe.get_doc("Social Integration", name)
-                analytics = frappe.get_all(
-                    "Social Analytics",
-                    filters={"integration": name, "date": [">=", start_date]},
-                    fields=["*"],
-                    order_by="date desc",
-                )
-
-                if analytics:
-                    latest = analytics[0]
-                    comparison[name] = {
-                        "platform": integration.platform,
-                        "profile_name": integration.profile_name,
-                        "followers": latest.get("followers_count") or 0,
-                        "total_impressions": sum(a.get("impressions") or 0 for a in analytics),
-                        "total_engagement": sum(
-                            (a.get("likes") or 0) + (a.get("comments") or 0) + (a.get("shares") or 0)
-                            for a in analytics
-                        ),
-                    }
-            except Exception as e:
-                frappe.log_error(f"Error comparing platform {name}: {str(e)}", "Analytics API")
-
-        return comparison
     except Exception as e:
         frappe.log_error(f"Error in compare_platforms: {str(e)}", "Analytics API")
         return {}
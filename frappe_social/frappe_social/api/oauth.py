@@ -10,9 +10,9 @@ import frappe
 import secrets
 import hashlib
 import base64
-import requests
 from frappe import _
 from frappe.utils import get_url, now_datetime, add_to_date
+from frappe_social.frappe_social.utils import http
 
 
 # =============================================================================
@@ -138,7 +138,7 @@ def callback_twitter():
         return _oauth_error_redirect("Invalid OAuth state")
 
     settings = frappe.get_single("Social Settings")
-    response = requests.post(
+    response = http.post(
         "https://api.twitter.com/2/oauth2/token",
         data={
             "code": code,
@@ -154,7 +154,7 @@ def callback_twitter():
         return _oauth_error_redirect(f"Token exchange failed: {response.text}")
 
     token_data = response.json()
-    user_response = requests.get(
+    user_response = http.get(
         "https://api.twitter.com/2/users/me",
         params={"user.fields": "profile_image_url,public_metrics"},
         headers={"Authorization": f"Bearer {token_data['access_token']}"},
@@ -196,7 +196,7 @@ def callback_linkedin():
         return _oauth_error_redirect("Invalid OAuth state")
 
     settings = frappe.get_single("Social Settings")
-    response = requests.post(
+    response = http.post(
         "https://www.linkedin.com/oauth/v2/accessToken",
         data={
             "grant_type": "authorization_code",
@@ -212,7 +212,7 @@ def callback_linkedin():
         return _oauth_error_redirect(f"Token exchange failed: {response.text}")
 
     token_data = response.json()
-    user_data = requests.get(
+    user_data = http.get(
         "https://api.linkedin.com/v2/userinfo",
         headers={"Authorization": f"Bearer {token_data['access_token']}"},
     ).json()
@@ -270,7 +270,7 @@ def _handle_meta_callback(platform: str):
 
     # Get long-lived token
     short_token = (
-        requests.get(
+        http.get(
             f"https://graph.facebook.com/{api_version}/oauth/access_token",
             params={
                 "client_id": settings.meta_app_id,
@@ -283,7 +283,7 @@ def _handle_meta_callback(platform: str):
         .get("access_token")
     )
 
-    long_token_data = requests.get(
+    long_token_data = http.get(
         f"https://graph.facebook.com/{api_version}/oauth/access_token",
         params={
             "grant_type": "fb_exchange_token",
@@ -297,14 +297,14 @@ def _handle_meta_callback(platform: str):
     expires_in = long_token_data.get("expires_in", 5184000)
 
     # Get user info
-    me_data = requests.get(
+    me_data = http.get(
         f"https://graph.facebook.com/{api_version}/me",
         params={"access_token": user_token, "fields": "id,name,email"},
     ).json()
 
     # Get pages
     pages = (
-        requests.get(
+        http.get(
             f"https://graph.facebook.com/{api_version}/me/accounts",
             params={"access_token": user_token, "fields": "id,name,access_token,picture{url},fan_count"},
         )
@@ -319,7 +319,7 @@ def _handle_meta_callback(platform: str):
     if platform == "Instagram":
         ig_pages = []
         for page in pages:
-            ig_data = requests.get(
+            ig_data = http.get(
                 f"https://graph.facebook.com/{api_version}/{page['id']}",
                 params={
                     "access_token": page["access_token"],
@@ -457,7 +457,7 @@ def callback_youtube():
         return _oauth_error_redirect("Invalid OAuth state")
 
     settings = frappe.get_single("Social Settings")
-    response = requests.post(
+    response = http.post(
         "https://oauth2.googleapis.com/token",
         data={
             "code": code,
@@ -472,12 +472,12 @@ def callback_youtube():
         return _oauth_error_redirect(f"Token exchange failed: {response.text}")
 
     token_data = response.json()
-    user_info = requests.get(
+    user_info = http.get(
         "https://www.googleapis.com/oauth2/v2/userinfo",
         headers={"Authorization": f"Bearer {token_data['access_token']}"},
     ).json()
 
-    channel_data = requests.get(
+    channel_data = http.get(
         "https://www.googleapis.com/youtube/v3/channels",
         params={"access_token": token_data["access_token"], "part": "snippet,statistics", "mine": "true"},
     ).json()
@@ -574,7 +574,7 @@ def _save_integration(
 
     if profile_image:
         try:
-            response = requests.get(profile_image)
+            response = http.get(profile_image)
             if response.status_code == 200:
                 # Guess file extension
                 content_type = response.headers.get("content-type", "image/jpeg")
@@ -629,7 +629,7 @@ def test_connection(integration: str) -> dict:
     try:
         if doc.platform == "Twitter":
             valid = (
-                requests.get(
+                http.get(
                     "https://api.twitter.com/2/users/me",
                     headers={"Authorization": f"Bearer {doc.get_password('access_token')}"},
                 ).status_code
@@ -637,7 +637,7 @@ def test_connection(integration: str) -> dict:
             )
         elif doc.platform == "LinkedIn":
             valid = (
-                requests.get(
+                http.get(
                     "https://api.linkedin.com/v2/userinfo",
                     headers={"Authorization": f"Bearer {doc.get_password('access_token')}"},
                 ).status_code
@@ -646,7 +646,7 @@ def test_connection(integration: str) -> dict:
         elif doc.platform in ["Facebook", "Instagram"]:
             token = doc.get_password("page_access_token") or doc.get_password("access_token")
             valid = (
-                requests.get(
+                http.get(
                     f"https://graph.facebook.com/{settings.meta_api_version or 'v21.0'}/me",
                     params={"access_token": token},
                 ).status_code
@@ -654,7 +654,7 @@ def test_connection(integration: str) -> dict:
             )
         elif doc.platform == "YouTube":
             valid = (
-                requests.get(
+                http.get(
                     "https://www.googleapis.com/youtube/v3/channels",
                     params={
                         "access_token": doc.get_password("access_token"),
@@ -18,14 +18,16 @@ def publish_now(post_name: str) -> dict:
     if post.status not in ["Draft", "Scheduled", "Failed", "Cancelled"]:
         frappe.throw(_("Cannot publish post with status '{0}'").format(post.status))
 
+    # A manual publish starts a new series of automatic retries
     # If it's a Draft, submit it first (DocStatus=1)
     if post.docstatus == 0 or post.docstatus == 2:
         post.scheduled_time = now_datetime()
+        post.retry_count = 0
         post.submit()
         frappe.db.commit()
     else:
         # If already submitted (e.g. Scheduled/Failed), just update the timestamp
-        post.db_set("scheduled_time", now_datetime())
+        post.db_set({"scheduled_time": now_datetime(), "retry_count": 0})
 
     return PostService.publish_post(post_name)
 
@@ -44,6 +46,7 @@ def schedule(post_name: str, scheduled_time: str) -> dict:
 
     post.scheduled_time = scheduled_dt
     post.status = "Scheduled"
+    post.retry_count = 0
 
     if post.docstatus == 0:
         post.submit()
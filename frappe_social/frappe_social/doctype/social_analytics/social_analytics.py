@@ -37,3 +37,8 @@ class SocialAnalytics(Document):
             "change": change,
             "change_percent": change_percent
         })
+
+
+def on_doctype_update():
+    # Upsert key for AnalyticsService.ingest()
+    frappe.db.add_unique("Social Analytics", ["integration", "date"])
@@ -1,8 +1,14 @@
 # Copyright (c) 2024, Frappe Social and contributors
 # For license information, please see license.txt
 
+import frappe
 from frappe.model.document import Document
 
 
 class SocialAnalyticsMetric(Document):
     pass
+
+
+def on_doctype_update():
+    # Upsert key for AnalyticsService.ingest()
+    frappe.db.add_unique("Social Analytics Metric", ["parent", "metric_name"])
@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Macrobian and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Social Analytics Rollup", {
+// 	refresh(frm) {
+
+// 	},
+// });
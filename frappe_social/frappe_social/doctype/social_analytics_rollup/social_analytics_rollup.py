@@ -0,0 +1,15 @@
+# Copyright (c) 2025, Macrobian and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class SocialAnalyticsRollup(Document):
+    pass
+
+
+def on_doctype_update():
+    # Upsert key for AnalyticsRollup.refresh(), and the range reads of reports
+    frappe.db.add_unique("Social Analytics Rollup", ["integration", "period", "period_start"])
+    frappe.db.add_index("Social Analytics Rollup", ["period", "period_start"])
@@ -1,11 +1,40 @@
 # Copyright (c) 2024, Frappe Social and contributors
 # For license information, please see license.txt
 
+import frappe
 from frappe.model.document import Document
 from frappe.utils import now_datetime, add_to_date, get_datetime
+from frappe_social.frappe_social.services.analytics_cache import AnalyticsCache
+from frappe_social.frappe_social.services.credential_cache import CredentialCache
+from frappe_social.frappe_social.services.provider_cache import ProviderCache
 
 
 class SocialIntegration(Document):
+    def on_update(self):
+        # Connection state and profile name appear in cached analytics responses
+        AnalyticsCache.invalidate()
+        CredentialCache.evict(self.name)
+        ProviderCache.invalidate(self.name)
+
+    def on_trash(self):
+        CredentialCache.evict(self.name)
+        ProviderCache.invalidate(self.name)
+
+    def get_password(self, fieldname="password", raise_exception=True):
+        """Stored secrets are decrypted once and served from CredentialCache"""
+        value = self.get(fieldname)
+        if value and not self.is_dummy_password(value):
+            # Set on this document and not saved yet
+            return value
+        if self.is_new():
+            return super().get_password(fieldname, raise_exception)
+        return CredentialCache.get(
+            self.name,
+            fieldname,
+            self.modified,
+            lambda: super(SocialIntegration, self).get_password(fieldname, raise_exception),
+        )
+
     def get_access_token(self):
         return self.get_password('access_token') if self.access_token else None
     
@@ -48,3 +77,8 @@ class SocialIntegration(Document):
         self.last_error = error_message
         self.last_error_time = now_datetime()
         self.save(ignore_permissions=True)
+
+
+def on_doctype_update():
+    # One integration per platform account; OAuth callbacks look it up by this pair
+    frappe.db.add_unique("Social Integration", ["platform", "profile_id"])
@@ -226,6 +226,35 @@ class SocialPost(Document):
         if num_videos > 1 and not provider_class.ALLOWS_MULTI_VIDEO:
             frappe.throw(f"{self.platform} does not support multiple videos")
 
+    def on_update(self):
+        self.sync_schedule_index()
+
+    def on_submit(self):
+        self.sync_schedule_index()
+
+    def on_update_after_submit(self):
+        self.sync_schedule_index()
+
+    def on_cancel(self):
+        self.sync_schedule_index()
+
+    def on_trash(self):
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        ScheduleIndex.remove(self.name)
+        ScheduleIndex.remove_continuation(self.name)
+        # The metric series is meaningless without its post
+        frappe.db.delete("Social Post Metric Point", {"social_post": self.name})
+
+    def sync_schedule_index(self):
+        """Keep the Redis schedule index in step with status and scheduled_time.
+
+        Runs after commit so the dispatcher never pops a post whose row is not yet visible.
+        """
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        frappe.db.after_commit.add(lambda: ScheduleIndex.sync_post(self))
+
     def can_transition_to(self, new_status: str) -> bool:
         """Check if status transition is valid"""
         return new_status in self.VALID_TRANSITIONS.get(self.status, [])
@@ -261,3 +290,10 @@ def get_platforms_for_organization(organization):
         distinct=True,
         order_by="platform asc",
     )
+
+
+def on_doctype_update():
+    # Dispatcher and claim sweeps: status plus scheduled_time
+    frappe.db.add_index("Social Post", ["status", "scheduled_time"])
+    # Analytics refresh and leaderboards: published posts by age, with a platform post id
+    frappe.db.add_index("Social Post", ["status", "published_time", "post_id"])
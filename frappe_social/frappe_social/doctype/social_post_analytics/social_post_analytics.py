@@ -3,23 +3,38 @@
 
 import frappe
 from frappe.model.document import Document
+from frappe.utils import getdate
 
 
 class SocialPostAnalytics(Document):
     def before_save(self):
         """Calculate engagement rate before saving"""
         self.calculate_engagement_rate()
+        if not self.bucket and self.fetched_at:
+            self.bucket = getdate(self.fetched_at)
 
     def calculate_engagement_rate(self):
         """Calculate engagement rate from metrics"""
-        total_engagement = (self.likes or 0) + (self.comments or 0) + (self.shares or 0) + (self.saves or 0)
-        if self.reach and self.reach > 0:
-            self.engagement_rate = round((total_engagement / self.reach) * 100, 2)
-        elif self.impressions and self.impressions > 0:
-            self.engagement_rate = round((total_engagement / self.impressions) * 100, 2)
-        else:
-            self.engagement_rate = 0
+        self.engagement_rate = calculate_engagement_rate(self.as_dict())
 
     def add_metric(self, metric_name: str, metric_value, previous_analytics=None):
         """Add metric tracking for post-level analytics"""
         pass
+
+
+def calculate_engagement_rate(metrics: dict) -> float:
+    """Engagement rate for a dict of post metrics (also used by bulk writes, which skip before_save)"""
+    metrics = frappe._dict(metrics)
+    total_engagement = (metrics.likes or 0) + (metrics.comments or 0) + (metrics.shares or 0) + (metrics.saves or 0)
+    if metrics.reach and metrics.reach > 0:
+        return round((total_engagement / metrics.reach) * 100, 2)
+    elif metrics.impressions and metrics.impressions > 0:
+        return round((total_engagement / metrics.impressions) * 100, 2)
+    return 0
+
+
+def on_doctype_update():
+    # Upsert key for AnalyticsService.ingest()
+    frappe.db.add_unique("Social Post Analytics", ["social_post", "platform", "bucket"])
+    # Latest snapshot of a post
+    frappe.db.add_index("Social Post Analytics", ["social_post", "fetched_at"])
@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Macrobian and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class SocialPostMetricPoint(Document):
+    pass
+
+
+def on_doctype_update():
+    # Series reads are always "one post, time range"
+    frappe.db.add_index("Social Post Metric Point", ["social_post", "ts"])
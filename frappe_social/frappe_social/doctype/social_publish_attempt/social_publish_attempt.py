@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Macrobian and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class SocialPublishAttempt(Document):
+    pass
+
+
+def on_doctype_update():
+    # Attempt history of a post, newest first
+    frappe.db.add_index("Social Publish Attempt", ["social_post", "attempted_at"])
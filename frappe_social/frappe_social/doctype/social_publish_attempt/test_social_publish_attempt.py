@@ -0,0 +1,9 @@
+# Copyright (c) 2025, Macrobian and Contributors
+# See license.txt
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+
+class TestSocialPublishAttempt(FrappeTestCase):
+	pass
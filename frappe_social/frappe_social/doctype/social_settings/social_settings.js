@@ -15,13 +15,12 @@ frappe.ui.form.on('Social Settings', {
         // Reset counters button
         frm.add_custom_button(__('Reset Daily Counters'), function () {
             frappe.confirm(
-                __('Reset all daily post counters and quota tracking?'),
+                __('Reset all daily post counters, rate limits and quota tracking?'),
                 function () {
-                    frm.set_value('twitter_posts_today', 0);
-                    frm.set_value('instagram_posts_today', 0);
-                    frm.set_value('youtube_quota_used', 0);
-                    frm.save();
-                    frappe.show_alert({ message: __('Counters reset'), indicator: 'green' });
+                    frm.call('reset_daily_counters').then(() => {
+                        frm.reload_doc();
+                        frappe.show_alert({ message: __('Counters reset'), indicator: 'green' });
+                    });
                 }
             );
         }, __('Actions'));
@@ -37,18 +36,19 @@ frappe.ui.form.on('Social Settings', {
     },
 
     show_quota_dashboard: function (frm) {
+        let posts_today = (frm.doc.__onload || {}).posts_today || {};
         let html = `
             <div class="row" style="margin-top: 15px;">
                 <div class="col-sm-4">
                     <div class="stat-box">
                         <h6>Twitter Posts Today</h6>
-                        <h3>${frm.doc.twitter_posts_today || 0} / ${frm.doc.twitter_daily_limit || 17}</h3>
+                        <h3>${posts_today.Twitter || 0} / ${frm.doc.twitter_daily_limit || 17}</h3>
                     </div>
                 </div>
                 <div class="col-sm-4">
                     <div class="stat-box">
                         <h6>Instagram Posts Today</h6>
-                        <h3>${frm.doc.instagram_posts_today || 0} / ${frm.doc.instagram_daily_limit || 25}</h3>
+                        <h3>${posts_today.Instagram || 0} / ${frm.doc.instagram_daily_limit || 25}</h3>
                     </div>
                 </div>
                 <div class="col-sm-4">
@@ -4,11 +4,24 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import today, getdate
+from frappe_social.frappe_social.services.provider_cache import SETTINGS, ProviderCache
+from frappe_social.frappe_social.services.rate_limiter import RateLimiter
 
 
 class SocialSettings(Document):
+    def onload(self):
+        # Counted in Redis by RateLimiter; shown on the quota dashboard
+        self.set_onload(
+            "posts_today",
+            {platform: RateLimiter.posts_today(platform) for platform in ("Twitter", "Instagram")},
+        )
+
     def validate(self):
         self.update_twitter_daily_limit()
+
+    def on_update(self):
+        # Every cached provider was built from these settings
+        ProviderCache.invalidate(SETTINGS)
     
     def update_twitter_daily_limit(self):
         """Update Twitter daily limit based on tier"""
@@ -21,27 +34,17 @@ class SocialSettings(Document):
         self.twitter_daily_limit = tier_limits.get(self.twitter_tier, 17)
     
     def can_post_to_twitter(self) -> bool:
-        return (self.twitter_posts_today or 0) < self.twitter_daily_limit
+        return RateLimiter.posts_today("Twitter") < self.twitter_daily_limit
     
     def can_post_to_instagram(self) -> bool:
-        return (self.instagram_posts_today or 0) < self.instagram_daily_limit
-    
-    def increment_twitter_posts(self):
-        self.twitter_posts_today = (self.twitter_posts_today or 0) + 1
-        self.save(ignore_permissions=True)
-    
-    def increment_instagram_posts(self):
-        self.instagram_posts_today = (self.instagram_posts_today or 0) + 1
-        self.save(ignore_permissions=True)
+        return RateLimiter.posts_today("Instagram") < self.instagram_daily_limit
     
+    @frappe.whitelist()
     def reset_daily_counters(self):
-        """Reset daily counters - called by scheduled job"""
-        self.twitter_posts_today = 0
-        self.instagram_posts_today = 0
+        """Refill every account's rate limit buckets and clear today's counts"""
+        RateLimiter.reset()
         
-        # Reset YouTube quota if new day
-        if self.youtube_quota_reset_date != today():
-            self.youtube_quota_used = 0
-            self.youtube_quota_reset_date = today()
+        self.youtube_quota_used = 0
+        self.youtube_quota_reset_date = today()
         
         self.save(ignore_permissions=True)
@@ -5,7 +5,8 @@ Base Provider for Social Media Platforms
 import frappe
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+from frappe_social.frappe_social.services.provider_cache import ProviderCache
 
 
 @dataclass
@@ -15,6 +16,11 @@ class PublishResult:
     post_url: Optional[str] = None
     error_message: Optional[str] = None
     raw_response: Optional[Dict] = None
+    # Seconds to wait before trying again; set when the publish was deferred, not failed
+    retry_after: Optional[float] = None
+    # Set when the platform is still working (e.g. processing media): the publish is
+    # continued with resume_publish(pending_state) after `retry_after` seconds
+    pending_state: Optional[Dict[str, Any]] = None
 
 
 @dataclass
@@ -32,6 +38,8 @@ class TokenRefreshResult:
     refresh_token: Optional[str] = None
     expires_in: Optional[int] = None
     error_message: Optional[str] = None
+    # Meta: the page token re-issued for the refreshed user token
+    page_access_token: Optional[str] = None
 
 
 class BaseProvider(ABC):
@@ -42,11 +50,21 @@ class BaseProvider(ABC):
     SUPPORTS_IMAGES: bool = False
     SUPPORTS_VIDEO: bool = False
     MAX_IMAGES: int = 0
+    # Endpoint class -> (requests, period in seconds); overrides get_rate_limits() defaults
+    RATE_LIMITS: Dict[str, Tuple[int, int]] = {}
+    # Resumable uploads hand back to the queue after this long, so one file never holds a worker
+    UPLOAD_SLICE_SECONDS = 240
+    # Post IDs per fetch_posts_analytics() request when the platform has a multi-ID endpoint
+    ANALYTICS_BATCH_SIZE = 1
 
     def __init__(self, integration_name: str = None):
-        self.settings = frappe.get_single("Social Settings")
+        self.settings = ProviderCache.get_settings()
         self.integration = None
         self.integration_name = integration_name
+        # Set by the caller to receive (bytes_sent, total_bytes) during media uploads
+        self.progress_callback = None
+        # Set by the caller to persist in-progress publish state (e.g. acknowledged upload offsets)
+        self.checkpoint_callback = None
         if integration_name:
             self.integration = frappe.get_doc("Social Integration", integration_name)
 
@@ -72,23 +90,88 @@ class BaseProvider(ABC):
         """Fetch analytics for a specific post"""
         pass
 
+    def fetch_posts_analytics(
+        self, post_ids: List[str], integration_name: str = None
+    ) -> Dict[str, AnalyticsResult]:
+        """
+        Fetch analytics for up to ANALYTICS_BATCH_SIZE posts, keyed by post ID.
+
+        Override with the platform's multi-ID endpoint; the default fetches one by one.
+        """
+        return {post_id: self.fetch_post_analytics(post_id, integration_name) for post_id in post_ids}
+
     @abstractmethod
     def get_daily_limit(self) -> int:
         """Get daily rate limit for this platform"""
         pass
 
+    def report_progress(self, sent: int, total: int) -> None:
+        """Pass media upload progress on to progress_callback, if any"""
+        if self.progress_callback:
+            self.progress_callback(sent, total)
+
+    def _get_full_path(self, file_path: str) -> str:
+        """Get absolute local file path from Frappe file URL"""
+        if not file_path:
+            raise ValueError("Empty file path")
+        file_path = file_path.strip()
+        mappings = (
+            ("/private/files/", ("private", "files")),
+            ("/public/files/", ("public", "files")),
+            ("/files/", ("public", "files")),
+        )
+        for prefix, site_path in mappings:
+            if file_path.startswith(prefix):
+                relative = file_path[len(prefix) :]
+                return frappe.get_site_path(*site_path, relative)
+        return frappe.get_site_path(file_path.lstrip("/"))
+
+    def checkpoint(self, state: Dict[str, Any]) -> None:
+        """Persist progress of a multi-step publish so it can resume after the job dies"""
+        if self.checkpoint_callback:
+            self.checkpoint_callback(state)
+
+    def get_upload_chunk_size(self) -> int:
+        """Chunk size in bytes for resumable uploads (Social Settings)"""
+        return max(int(self.settings.upload_chunk_size_mb or 8), 1) * 1024 * 1024
+
+    def resume_publish(self, state: Dict[str, Any]) -> PublishResult:
+        """Continue a publish that returned pending_state - override in subclass if used"""
+        return PublishResult(success=False, error_message=f"{self.PLATFORM} cannot resume a publish")
+
     def refresh_token(self, integration_name: str = None) -> TokenRefreshResult:
-        """Refresh OAuth token - override in subclass if supported"""
+        """
+        Get new tokens from the platform - override in subclass if supported.
+        Only returns them; TokenService stores them on the integration.
+        """
         return TokenRefreshResult(success=False, error_message="Token refresh not supported")
 
-    def increment_rate_limit(self):
-        """Increment daily rate limit counter"""
-        cache_key = f"social_rate_limit_{self.PLATFORM.lower()}"
-        current = frappe.cache.get_value(cache_key) or 0
-        frappe.cache.set_value(cache_key, current + 1, expires_in_sec=86400)
-
-    def check_rate_limit(self) -> bool:
-        """Check if under daily rate limit"""
-        cache_key = f"social_rate_limit_{self.PLATFORM.lower()}"
-        current = frappe.cache.get_value(cache_key) or 0
-        return current < self.get_daily_limit()
+    def reload_integration(self) -> None:
+        """Re-read the integration, e.g. after TokenService stored new tokens"""
+        if self.integration_name:
+            self.integration = frappe.get_doc("Social Integration", self.integration_name)
+
+    def get_rate_limits(self) -> Dict[str, Tuple[int, int]]:
+        """Token bucket limits per endpoint class for one account"""
+        daily_limit = self.get_daily_limit()
+        limits = {
+            "publish": (daily_limit, 86400),
+            "media_upload": (daily_limit * max(self.MAX_IMAGES, 1), 86400),
+            "insights": (200, 3600),
+        }
+        limits.update(self.RATE_LIMITS)
+        return limits
+
+    def acquire_rate_limit(self, costs: Dict[str, int] = None) -> float:
+        """
+        Take rate limit tokens for this account.
+
+        Returns 0 when granted, otherwise the seconds to wait (nothing is taken).
+        """
+        from frappe_social.frappe_social.services.rate_limiter import RateLimiter
+
+        if not self.integration_name:
+            return 0
+        return RateLimiter.acquire(
+            self.integration_name, costs or {"publish": 1}, self.get_rate_limits(), self.PLATFORM
+        )
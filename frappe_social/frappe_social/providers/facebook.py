@@ -6,7 +6,10 @@ import os
 import frappe
 import requests
 import time
-from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult
+from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult, TokenRefreshResult
+from frappe_social.frappe_social.providers.meta import GraphBatch, refresh_long_lived_token
+from frappe_social.frappe_social.utils import http
+from frappe_social.frappe_social.utils.multipart import FilePart, MultipartEncoder
 
 
 class FacebookProvider(BaseProvider):
@@ -19,6 +22,8 @@ class FacebookProvider(BaseProvider):
     ALLOWS_MULTI_VIDEO = False
     MAX_STORY_BATCH = 10
     DAILY_POST_LIMIT = 200
+    # Graph API platform limit: 200 calls per user per hour
+    RATE_LIMITS = {"media_upload": (200, 3600), "insights": (200, 3600)}
     ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/gif"]
     MAX_IMAGE_SIZE = 8 * 1024 * 1024  # 8 MB
     ALLOWED_VIDEO_TYPES = ["video/mp4", "video/quicktime"]
@@ -28,28 +33,15 @@ class FacebookProvider(BaseProvider):
     REEL_MAX_VIDEO_SIZE = 1024 * 1024 * 1024  # 1 GB
     REEL_MIN_DURATION = 3  # seconds
     REEL_MAX_DURATION = 90  # seconds
+    # Chunk uploads of a resumable video session may fail this many times in a row
+    MAX_CHUNK_FAILURES = 5
+    ANALYTICS_BATCH_SIZE = 25  # two Graph batch sub-requests per post
 
     def __init__(self, integration_name: str = None):
         super().__init__(integration_name)
         self.api_version = self.settings.meta_api_version or "v21.0"
         self.api_base = f"https://graph.facebook.com/{self.api_version}"
 
-    def _get_full_path(self, file_path: str) -> str:
-        """Get absolute local file path from Frappe file URL"""
-        if not file_path:
-            raise ValueError("Empty file path")
-        file_path = file_path.strip()
-        mappings = (
-            ("/private/files/", ("private", "files")),
-            ("/public/files/", ("public", "files")),
-            ("/files/", ("public", "files")),
-        )
-        for prefix, site_path in mappings:
-            if file_path.startswith(prefix):
-                relative = file_path[len(prefix) :]
-                return frappe.get_site_path(*site_path, relative)
-        return frappe.get_site_path(file_path.lstrip("/"))
-
     def _get_public_url(self, file_path: str) -> str:
         """Get publicly accessible URL"""
         if file_path.startswith("http"):
@@ -154,13 +146,12 @@ class FacebookProvider(BaseProvider):
                 return PublishResult(success=False, error_message=f"File not found: {full_path}")
 
             # Step 1: Upload photo (unpublished)
-            with open(full_path, "rb") as f:
-                upload_resp = requests.post(
-                    f"{self.api_base}/{page_id}/photos",
-                    files={"source": f},
-                    data={"published": "false", "access_token": page_token},
-                    timeout=60,
-                ).json()
+            upload_resp = self._upload_file(
+                f"{self.api_base}/{page_id}/photos",
+                full_path,
+                data={"published": "false", "access_token": page_token},
+                timeout=60,
+            ).json()
 
             if "id" not in upload_resp:
                 return self._handle_error(upload_resp, "Photo upload for story failed")
@@ -168,7 +159,7 @@ class FacebookProvider(BaseProvider):
             photo_id = upload_resp["id"]
 
             # Step 2: Publish as story
-            publish_resp = requests.post(
+            publish_resp = http.post(
                 f"{self.api_base}/{page_id}/photo_stories",
                 data={"photo_id": photo_id, "access_token": page_token},
                 timeout=30,
@@ -200,7 +191,7 @@ class FacebookProvider(BaseProvider):
                 return PublishResult(success=False, error_message="Story video exceeds 100MB limit")
 
             # STEP 1: Init session
-            start_resp = requests.post(
+            start_resp = http.post(
                 f"{self.api_base}/{page_id}/video_stories",
                 data={
                     "upload_phase": "start",
@@ -221,7 +212,7 @@ class FacebookProvider(BaseProvider):
 
             # STEP 2: Upload EXACTLY as Meta docs
             with open(full_path, "rb") as f:
-                upload_resp = requests.post(
+                upload_resp = http.post(
                     upload_url,
                     headers={
                         "Authorization": f"OAuth {page_token}",
@@ -244,7 +235,7 @@ class FacebookProvider(BaseProvider):
                 return self._handle_error(upload_json, "Upload phase failed")
 
             # STEP 3: Finish
-            finish_resp = requests.post(
+            finish_resp = http.post(
                 f"{self.api_base}/{page_id}/video_stories",
                 data={
                     "upload_phase": "finish",
@@ -292,17 +283,19 @@ class FacebookProvider(BaseProvider):
                     error_message=f"Reel video too large: {file_size / (1024*1024):.2f}MB (max 1GB)",
                 )
 
-            with open(full_path, "rb") as f:
-                reel_resp = requests.post(
-                    f"{self.api_base}/{page_id}/videos",
-                    files={"source": f},
-                    data={
-                        "description": content or "",
-                        "access_token": page_token,
-                        # Short vertical videos automatically become Reels
-                    },
-                    timeout=600,
-                ).json()
+            if file_size > self.get_upload_chunk_size():
+                return self._start_video_upload(page_id, page_token, full_path, content or "", "Reel")
+
+            reel_resp = self._upload_file(
+                f"{self.api_base}/{page_id}/videos",
+                full_path,
+                data={
+                    "description": content or "",
+                    "access_token": page_token,
+                    # Short vertical videos automatically become Reels
+                },
+                timeout=600,
+            ).json()
 
             if "id" not in reel_resp:
                 return self._handle_error(reel_resp, "Reel upload failed")
@@ -322,7 +315,7 @@ class FacebookProvider(BaseProvider):
         Supports: single image, multiple images, single video
         """
         try:
-            attached_media = []
+            image_paths = []
 
             # Handle media files
             for media in media_files or []:
@@ -335,14 +328,19 @@ class FacebookProvider(BaseProvider):
                             success=False, error_message="Only one video allowed in feed post"
                         )
 
+                    # Large videos go through a resumable upload session
+                    if os.path.getsize(full_path) > self.get_upload_chunk_size():
+                        return self._start_video_upload(
+                            page_id, page_token, full_path, content or "", "Video"
+                        )
+
                     # Upload video directly (publishes immediately)
-                    with open(full_path, "rb") as f:
-                        video_resp = requests.post(
-                            f"{self.api_base}/{page_id}/videos",
-                            files={"source": f},
-                            data={"description": content or "", "access_token": page_token},
-                            timeout=600,
-                        ).json()
+                    video_resp = self._upload_file(
+                        f"{self.api_base}/{page_id}/videos",
+                        full_path,
+                        data={"description": content or "", "access_token": page_token},
+                        timeout=600,
+                    ).json()
 
                     if "id" not in video_resp:
                         return self._handle_error(video_resp, "Video upload failed")
@@ -351,22 +349,11 @@ class FacebookProvider(BaseProvider):
                     post_url = f"https://www.facebook.com/{video_id}"
                     return PublishResult(success=True, post_id=video_id, post_url=post_url)
 
-                # Handle images
-                with open(full_path, "rb") as f:
-                    img_resp = requests.post(
-                        f"{self.api_base}/{page_id}/photos",
-                        files={"source": f},
-                        data={"published": "false", "access_token": page_token},
-                        timeout=60,
-                    ).json()
-
-                if "id" not in img_resp:
-                    return self._handle_error(img_resp, "Image upload failed")
-
-                attached_media.append({"media_fbid": img_resp["id"]})
+                # Images are uploaded in the same Graph batch as the post below
+                image_paths.append(full_path)
 
             # Create post data
-            data = {"access_token": page_token, "message": content or ""}
+            data = {"message": content or ""}
 
             # Handle scheduling
             if scheduled_time:
@@ -386,19 +373,19 @@ class FacebookProvider(BaseProvider):
             if cta and final_link:
                 cta_type = self._map_cta(cta)
                 if cta_type:
-                    if attached_media:
+                    if image_paths:
                         data["call_to_action"] = frappe.as_json(
                             {"type": cta_type, "value": {"link": final_link}}
                         )
                     else:
                         data["link"] = final_link
 
-            # Attach media for multi-image posts
-            for i, media_item in enumerate(attached_media):
-                data[f"attached_media[{i}]"] = frappe.as_json(media_item)
+            if image_paths:
+                return self._publish_photo_post(image_paths, data, page_token, page_id)
 
             # Publish post
-            post_resp = requests.post(f"{self.api_base}/{page_id}/feed", data=data, timeout=60).json()
+            data["access_token"] = page_token
+            post_resp = http.post(f"{self.api_base}/{page_id}/feed", data=data, timeout=60).json()
 
             if "id" not in post_resp:
                 return self._handle_error(post_resp, "Feed post creation failed")
@@ -411,6 +398,157 @@ class FacebookProvider(BaseProvider):
             frappe.log_error(title="Facebook Feed Post Error", message=f"{str(e)}\n{frappe.get_traceback()}")
             return PublishResult(success=False, error_message=str(e))
 
+    def _publish_photo_post(
+        self, image_paths: list, data: dict, page_token: str, page_id: str
+    ) -> PublishResult:
+        """
+        Upload the photos unpublished and create the feed post attaching them in one Graph batch.
+        The post references the photo IDs, so Meta only creates it if every upload worked
+        """
+        batch = GraphBatch(self.api_base, page_token)
+        for i, full_path in enumerate(image_paths):
+            photo = batch.add(
+                "POST",
+                f"{page_id}/photos",
+                body={"published": "false"},
+                file=FilePart(full_path),
+                name=f"photo{i}",
+            )
+            data[f"attached_media[{i}]"] = frappe.as_json({"media_fbid": batch.ref(photo)})
+        batch.add("POST", f"{page_id}/feed", body=data, name="post")
+
+        *photo_resps, post_resp = batch.execute(
+            timeout=60 * len(image_paths), callback=self.report_progress
+        )
+
+        for photo_resp in photo_resps:
+            if photo_resp.code != 200 or "id" not in photo_resp.body:
+                return self._handle_error(photo_resp.body, "Image upload failed")
+        if post_resp.code != 200 or "id" not in post_resp.body:
+            return self._handle_error(post_resp.body, "Feed post creation failed")
+
+        post_id = post_resp.body["id"]
+        post_url = f"https://www.facebook.com/{post_id}"
+        return PublishResult(success=True, post_id=post_id, post_url=post_url)
+
+    def _start_video_upload(
+        self, page_id: str, page_token: str, full_path: str, description: str, label: str
+    ) -> PublishResult:
+        """Open a resumable (start/transfer/finish) upload session and start sending the video"""
+        file_size = os.path.getsize(full_path)
+
+        start_data = http.post(
+            f"{self.api_base}/{page_id}/videos",
+            data={"upload_phase": "start", "file_size": file_size, "access_token": page_token},
+            timeout=60,
+        ).json()
+
+        if "upload_session_id" not in start_data:
+            return self._handle_error(start_data, f"{label} upload start failed")
+
+        state = {
+            "step": "video_upload",
+            "label": label,
+            "path": full_path,
+            "file_size": file_size,
+            "description": description,
+            "session_id": start_data["upload_session_id"],
+            "video_id": start_data.get("video_id"),
+            "start_offset": int(start_data["start_offset"]),
+            "end_offset": int(start_data["end_offset"]),
+            "failures": 0,
+        }
+        self.checkpoint(state)
+        return self._continue_video_upload(state, page_id, page_token)
+
+    def resume_publish(self, state: dict) -> PublishResult:
+        """Continue a resumable video upload from its last acknowledged offset"""
+        if state.get("step") != "video_upload":
+            return super().resume_publish(state)
+
+        page_token = self.integration.get_password("page_access_token") if self.integration else None
+        page_id = self.integration.page_id if self.integration else None
+        if not page_token or not page_id:
+            return PublishResult(success=False, error_message="Missing page credentials")
+
+        return self._continue_video_upload(state, page_id, page_token)
+
+    def _continue_video_upload(self, state: dict, page_id: str, page_token: str) -> PublishResult:
+        """
+        Transfer chunks from the last acknowledged offset, then finish the session.
+
+        Each acknowledged offset is checkpointed on the post. After UPLOAD_SLICE_SECONDS
+        the state is handed back so the rest is sent by a fresh job.
+        """
+        url = f"{self.api_base}/{page_id}/videos"
+        chunk_size = self.get_upload_chunk_size()
+        file_size = state["file_size"]
+        deadline = time.monotonic() + self.UPLOAD_SLICE_SECONDS
+
+        while state["start_offset"] < state["end_offset"]:
+            if time.monotonic() > deadline:
+                return PublishResult(success=False, pending_state=state, retry_after=0)
+
+            start = state["start_offset"]
+            chunk = FilePart(state["path"], offset=start, length=min(state["end_offset"] - start, chunk_size))
+            fields = {
+                "upload_phase": "transfer",
+                "upload_session_id": state["session_id"],
+                "start_offset": start,
+                "access_token": page_token,
+            }
+
+            def on_sent(sent, _, start=start):
+                self.report_progress(min(start + sent, file_size), file_size)
+
+            try:
+                with MultipartEncoder(fields, {"video_file_chunk": chunk}, callback=on_sent) as body:
+                    data = http.post(
+                        url, data=body, headers={"Content-Type": body.content_type}, timeout=300
+                    ).json()
+            except Exception as e:
+                data = {"error": {"message": str(e)}}
+
+            if "start_offset" not in data:
+                state["failures"] += 1
+                if state["failures"] >= self.MAX_CHUNK_FAILURES:
+                    return self._handle_error(data, f"{state['label']} chunk upload failed")
+
+                # Try the same offset again later instead of restarting the upload
+                return PublishResult(
+                    success=False,
+                    error_message=f"{state['label']} chunk at byte {start} failed; retrying",
+                    pending_state=state,
+                    retry_after=15 * 2 ** state["failures"],
+                )
+
+            state.update(
+                start_offset=int(data["start_offset"]), end_offset=int(data["end_offset"]), failures=0
+            )
+            self.checkpoint(state)
+
+        finish_data = http.post(
+            url,
+            data={
+                "upload_phase": "finish",
+                "upload_session_id": state["session_id"],
+                "description": state["description"],
+                "access_token": page_token,
+            },
+            timeout=120,
+        ).json()
+
+        if not finish_data.get("success"):
+            return self._handle_error(finish_data, f"{state['label']} upload finish failed")
+
+        video_id = state["video_id"]
+        return PublishResult(success=True, post_id=video_id, post_url=f"https://www.facebook.com/{video_id}")
+
+    def _upload_file(self, url: str, full_path: str, data: dict, timeout: int, field: str = "source"):
+        """POST a file as multipart form data, streamed from disk with progress reporting"""
+        with MultipartEncoder(data, {field: FilePart(full_path)}, callback=self.report_progress) as body:
+            return http.post(url, data=body, headers={"Content-Type": body.content_type}, timeout=timeout)
+
     def _handle_error(self, response_data, context: str):
         """Centralized error handling with detailed logging"""
         try:
@@ -445,6 +583,9 @@ class FacebookProvider(BaseProvider):
         """Get daily posting limit"""
         return self.DAILY_POST_LIMIT
 
+    def refresh_token(self, integration_name: str = None) -> TokenRefreshResult:
+        return refresh_long_lived_token(self.api_base, self.settings, self.get_integration_doc(integration_name))
+
     def fetch_account_analytics(self, integration_name: str = None) -> AnalyticsResult:
         """Fetch page analytics including engagement metrics"""
         try:
@@ -459,30 +600,31 @@ class FacebookProvider(BaseProvider):
             return AnalyticsResult(success=False, error_message="Missing page ID")
 
         try:
-            page_response = requests.get(
-                f"{self.api_base}/{integration.page_id}",
-                params={
-                    "access_token": page_token,
-                    "fields": "name,fan_count,followers_count,talking_about_count",
-                },
+            # Page fields and recent posts in one round trip
+            batch = GraphBatch(self.api_base, page_token)
+            batch.add(
+                "GET",
+                integration.page_id,
+                params={"fields": "name,fan_count,followers_count,talking_about_count"},
             )
-            if page_response.status_code != 200:
-                error = page_response.json().get("error", {})
-                return AnalyticsResult(success=False, error_message=error.get("message", "Failed"))
-
-            page_data = page_response.json()
-            posts_response = requests.get(
-                f"{self.api_base}/{integration.page_id}/posts",
+            batch.add(
+                "GET",
+                f"{integration.page_id}/posts",
                 params={
-                    "access_token": page_token,
                     "fields": "id,shares,reactions.summary(total_count),comments.summary(total_count)",
                     "limit": 25,
                 },
             )
+            page_response, posts_response = batch.execute()
+            if page_response.code != 200:
+                error = page_response.body.get("error", {})
+                return AnalyticsResult(success=False, error_message=error.get("message", "Failed"))
+
+            page_data = page_response.body
 
             total_likes, total_comments, total_shares, posts_count = 0, 0, 0, 0
-            if posts_response.status_code == 200:
-                posts_data = posts_response.json().get("data", [])
+            if posts_response.code == 200:
+                posts_data = posts_response.body.get("data", [])
                 posts_count = len(posts_data)
                 for post in posts_data:
                     total_likes += post.get("reactions", {}).get("summary", {}).get("total_count", 0)
@@ -522,82 +664,103 @@ class FacebookProvider(BaseProvider):
 
     def fetch_post_analytics(self, post_id: str, integration_name: str = None) -> AnalyticsResult:
         """Fetch analytics for a specific post - safe for both Post and Video nodes"""
+        return self.fetch_posts_analytics([post_id], integration_name)[post_id]
+
+    def fetch_posts_analytics(self, post_ids: list, integration_name: str = None) -> dict:
+        """
+        Fetch analytics for up to ANALYTICS_BATCH_SIZE posts in one Graph batch. Each post's
+        node fields and insights are sub-requests of their own, so an error stays with its post
+        """
         try:
             integration = self.get_integration_doc(integration_name or self.integration_name)
             page_token = integration.get_password("page_access_token") or integration.get_password(
                 "access_token"
             )
             if not page_token:
-                return AnalyticsResult(success=False, error_message="Missing token")
+                return {i: AnalyticsResult(success=False, error_message="Missing token") for i in post_ids}
+
+            fields = "id,permalink_url,reactions.summary(total_count),comments.summary(total_count)"
+            batch = GraphBatch(self.api_base, page_token)
+            metrics = "post_impressions,post_impressions_unique"
+            for post_id in post_ids:
+                batch.add("GET", post_id, params={"fields": f"{fields},shares"})
+                batch.add("GET", f"{post_id}/insights", params={"metric": metrics})
+            responses = batch.execute()
+            nodes = dict(zip(post_ids, responses[0::2], strict=True))
+            insights = dict(zip(post_ids, responses[1::2], strict=True))
+
+            # 'shares' does not exist on Video nodes and fails their lookup; ask those again without it
+            videos = [i for i in post_ids if self._lacks_shares(nodes[i])]
+            if videos:
+                frappe.logger().info(f"Shares field not available for {videos} (likely Videos)")
+                batch = GraphBatch(self.api_base, page_token)
+                for post_id in videos:
+                    batch.add("GET", post_id, params={"fields": fields})
+                nodes.update(zip(videos, batch.execute(), strict=True))
+
+            results = {}
+            for post_id in post_ids:
+                node = nodes[post_id]
+                if node.code != 200 or not node.body:
+                    message = node.body.get("error", {}).get("message") or "Failed to fetch post data"
+                    results[post_id] = AnalyticsResult(success=False, error_message=message)
+                    continue
+
+                # Missing insights (e.g. not enough audience yet) leave impressions & reach unknown
+                response = insights[post_id]
+                rows = response.body.get("data") if response.code == 200 else None
+                if not rows:
+                    frappe.logger().warning(f"Insights unavailable for {post_id}: {response.body}")
+                results[post_id] = self._post_metrics(node.body, rows or None)
+            return results
 
-            # Step 1: Get basic post data safely
-            response = requests.get(
-                f"{self.api_base}/{post_id}",
-                params={
-                    "access_token": page_token,
-                    "fields": "id,permalink_url,reactions.summary(total_count),comments.summary(total_count),shares",
-                },
-            )
+        except Exception as e:
+            frappe.log_error(message=f"Post IDs: {post_ids}\nError: {str(e)}", title="FB Post Analytics Error")
+            return {i: AnalyticsResult(success=False, error_message=str(e)) for i in post_ids}
 
-            likes = comments = shares = 0
-            if response.status_code == 200:
-                data = response.json()
-                likes = data.get("reactions", {}).get("summary", {}).get("total_count", 0)
-                comments = data.get("comments", {}).get("summary", {}).get("total_count", 0)
-                # Safely get shares — may be missing on Video nodes
-                shares_data = data.get("shares", {})
-                if isinstance(shares_data, dict):
-                    shares = shares_data.get("count", 0)
-                # If 'shares' is missing entirely (common on Video), default to 0
-            else:
-                error = response.json().get("error", {})
-                # If field error, continue with 0 shares
-                if error.get("code") == 100 and "shares" in error.get("message", ""):
-                    frappe.logger().info(f"Shares field not available for post {post_id} (likely a Video)")
-                    shares = 0
-                else:
-                    return AnalyticsResult(
-                        success=False, error_message=error.get("message", "Failed to fetch post data")
-                    )
-
-            # Step 2: Get insights (impressions & reach)
-            impressions = reach = 0
-            try:
-                insights_resp = requests.get(
-                    f"{self.api_base}/{post_id}/insights",
-                    params={"access_token": page_token, "metric": "post_impressions,post_impressions_unique"},
-                )
-                if insights_resp.status_code == 200:
-                    for item in insights_resp.json().get("data", []):
-                        value = item.get("values", [{}])[0].get("value", 0)
-                        if item["name"] == "post_impressions":
-                            impressions = value
-                        elif item["name"] == "post_impressions_unique":
-                            reach = value
-            except Exception as e:
-                frappe.logger().warning(f"Insights unavailable for {post_id}: {str(e)}")
-
-            # Calculate engagement rate
-            total_engagement = likes + comments + shares
-            if reach > 0:
-                engagement_rate = round((total_engagement / reach) * 100, 2)
-            elif impressions > 0:
-                engagement_rate = round((total_engagement / impressions) * 100, 2)
-            else:
-                engagement_rate = 0
+    @staticmethod
+    def _lacks_shares(response) -> bool:
+        error = response.body.get("error", {})
+        return error.get("code") == 100 and "shares" in error.get("message", "")
 
-            return AnalyticsResult(
-                success=True,
-                metrics={
-                    "likes": likes,
-                    "comments": comments,
-                    "shares": shares,
-                    "impressions": impressions,
-                    "reach": reach,
-                    "engagement_rate": engagement_rate,
-                },
-            )
-
-        except Exception as e:
-            frappe.log_error(message=f"Post ID: {post_id}\nError: {str(e)}", title="FB Post Analytics Error")
-            return AnalyticsResult(success=False, error_message=str(e))
+    def _post_metrics(self, data: dict, insights: list = None) -> AnalyticsResult:
+        """
+        Build post metrics from a node's fields and its insights rows.
+        Without insights, impressions and reach are None (not fetched), not 0
+        """
+        likes = data.get("reactions", {}).get("summary", {}).get("total_count", 0)
+        comments = data.get("comments", {}).get("summary", {}).get("total_count", 0)
+        # Safely get shares — may be missing on Video nodes
+        shares_data = data.get("shares", {})
+        shares = shares_data.get("count", 0) if isinstance(shares_data, dict) else 0
+
+        impressions = reach = None
+        if insights is not None:
+            impressions = reach = 0
+            for item in insights:
+                value = item.get("values", [{}])[0].get("value", 0)
+                if item["name"] == "post_impressions":
+                    impressions = value
+                elif item["name"] == "post_impressions_unique":
+                    reach = value
+
+        # Calculate engagement rate
+        total_engagement = likes + comments + shares
+        if reach:
+            engagement_rate = round((total_engagement / reach) * 100, 2)
+        elif impressions:
+            engagement_rate = round((total_engagement / impressions) * 100, 2)
+        else:
+            engagement_rate = 0
+
+        return AnalyticsResult(
+            success=True,
+            metrics={
+                "likes": likes,
+                "comments": comments,
+                "shares": shares,
+                "impressions": impressions,
+                "reach": reach,
+                "engagement_rate": engagement_rate,
+            },
+        )
@@ -1,8 +1,9 @@
 import frappe
-import requests
 import time
 import os
-from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult
+from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult, TokenRefreshResult
+from frappe_social.frappe_social.providers.meta import GraphBatch, refresh_long_lived_token
+from frappe_social.frappe_social.utils import http
 
 
 class InstagramProvider(BaseProvider):
@@ -12,6 +13,8 @@ class InstagramProvider(BaseProvider):
     SUPPORTS_VIDEO = True
     MAX_IMAGES = 10
     DAILY_POST_LIMIT = 25
+    # Media containers: 400 per rolling 24h; Graph API insights: 200 calls per user per hour
+    RATE_LIMITS = {"media_upload": (400, 86400), "insights": (200, 3600)}
     ALLOWED_IMAGE_TYPES = ["image/jpeg"]
     MAX_IMAGE_SIZE = 8 * 1024 * 1024  # 8 MB
     ALLOWED_VIDEO_TYPES = ["video/mp4", "video/quicktime"]
@@ -26,6 +29,15 @@ class InstagramProvider(BaseProvider):
     REEL_MIN_DURATION = 3  # seconds
     REEL_MAX_DURATION = 90  # seconds
 
+    # Container status polling: first delay and time budget per media kind
+    IMAGE_POLL_DELAY = 2
+    VIDEO_POLL_DELAY = 5
+    POLL_BACKOFF = 1.5
+    MAX_POLL_DELAY = 30
+
+    # Carousel children are created in one Graph batch; failed ones are recreated up to this many times
+    CAROUSEL_ITEM_ATTEMPTS = 3
+
     def __init__(self, integration_name: str = None):
         super().__init__(integration_name)
         self.api_version = self.settings.meta_api_version or "v21.0"
@@ -104,19 +116,15 @@ class InstagramProvider(BaseProvider):
             "access_token": page_token,
         }
 
-        res = requests.post(f"{self.api_base}/{ig_user_id}/media", data=story_data, timeout=30)
+        res = http.post(f"{self.api_base}/{ig_user_id}/media", data=story_data, timeout=30)
 
         if res.status_code != 200:
             return self._handle_error(res, "Story container creation failed")
 
         container_id = res.json().get("id")
 
-        # Wait for image processing (even images need a moment)
-        if not self._wait_for_media_processing(container_id, page_token, max_retries=20, delay=2):
-            return PublishResult(success=False, error_message="Story image processing timeout")
-
-        # Publish the story
-        return self._publish_container(container_id, page_token, ig_user_id, "Story")
+        # Even images need a moment before they can be published
+        return self._await_container(container_id, "Story", "Story image", self.IMAGE_POLL_DELAY, 40)
 
     def _publish_video_story(self, file_url: str, page_token: str, ig_user_id: str) -> PublishResult:
         """Publish video story"""
@@ -137,19 +145,14 @@ class InstagramProvider(BaseProvider):
             "access_token": page_token,
         }
 
-        init_res = requests.post(f"{self.api_base}/{ig_user_id}/media", data=init_data, timeout=30)
+        init_res = http.post(f"{self.api_base}/{ig_user_id}/media", data=init_data, timeout=30)
 
         if init_res.status_code != 200:
             return self._handle_error(init_res, "Story video container creation failed")
 
         container_id = init_res.json().get("id")
 
-        # Wait for processing
-        if not self._wait_for_media_processing(container_id, page_token, max_retries=60, delay=5):
-            return PublishResult(success=False, error_message="Story video processing timeout")
-
-        # Publish the story
-        return self._publish_container(container_id, page_token, ig_user_id, "Story")
+        return self._await_container(container_id, "Story", "Story video", self.VIDEO_POLL_DELAY, 300)
 
     def _publish_reel(
         self, content: str, media_files: list, page_token: str, ig_user_id: str
@@ -190,19 +193,15 @@ class InstagramProvider(BaseProvider):
                 "access_token": page_token,
             }
 
-            init_res = requests.post(f"{self.api_base}/{ig_user_id}/media", data=init_data, timeout=60)
+            init_res = http.post(f"{self.api_base}/{ig_user_id}/media", data=init_data, timeout=60)
 
             if init_res.status_code != 200:
                 return self._handle_error(init_res, "Reel container creation failed")
 
             container_id = init_res.json().get("id")
 
-            # Wait for video processing (Reels take longer)
-            if not self._wait_for_media_processing(container_id, page_token, max_retries=120, delay=6):
-                return PublishResult(success=False, error_message="Reel processing timeout (>12 minutes)")
-
-            # Publish the reel
-            return self._publish_container(container_id, page_token, ig_user_id, "Reel")
+            # Reels take longer to process
+            return self._await_container(container_id, "Reel", "Reel", self.VIDEO_POLL_DELAY, 720)
 
         except Exception as e:
             return PublishResult(success=False, error_message=f"Reel creation failed: {str(e)}")
@@ -223,9 +222,9 @@ class InstagramProvider(BaseProvider):
 
             # CAROUSEL (Multiple Images)
             if is_carousel:
-                child_container_ids = []
+                children = []
 
-                for media_item in media_files:
+                for idx, media_item in enumerate(media_files, start=1):
                     file_url = media_item.file_url if hasattr(media_item, "file_url") else media_item
 
                     if not self._is_image(file_url):
@@ -236,48 +235,14 @@ class InstagramProvider(BaseProvider):
                     if file_url.lower().endswith(".png"):
                         file_url = self._convert_png_to_jpeg(file_url)
 
-                    public_url = self._get_public_url(file_url)
-
-                    item_data = {
-                        "image_url": public_url,
-                        "is_carousel_item": "true",
-                        "access_token": page_token,
-                    }
-
-                    res = requests.post(f"{self.api_base}/{ig_user_id}/media", data=item_data, timeout=60)
-
-                    if res.status_code != 200:
-                        return self._handle_error(res, "Carousel item creation failed")
-
-                    item_container_id = res.json().get("id")
-
-                    # Wait for each carousel item to be ready
-                    if not self._wait_for_media_processing(
-                        item_container_id, page_token, max_retries=15, delay=2
-                    ):
-                        return PublishResult(
-                            success=False,
-                            error_message=f"Carousel item {len(child_container_ids)+1} processing timeout",
-                        )
-
-                    child_container_ids.append(item_container_id)
+                    children.append({"item": idx, "image_url": self._get_public_url(file_url), "attempts": 0})
 
-                # Create carousel parent container
-                carousel_data = {
-                    "media_type": "CAROUSEL",
-                    "children": ",".join(child_container_ids),
-                    "caption": content or "",
-                    "access_token": page_token,
-                }
-
-                parent_res = requests.post(
-                    f"{self.api_base}/{ig_user_id}/media", data=carousel_data, timeout=60
-                )
+                self._create_carousel_children(children, page_token, ig_user_id)
 
-                if parent_res.status_code != 200:
-                    return self._handle_error(parent_res, "Carousel parent creation failed")
-
-                container_id = parent_res.json().get("id")
+                # The parent is created once every child has finished processing
+                state = self._new_poll_state("Post", "Carousel", self.IMAGE_POLL_DELAY, 30 * len(media_files))
+                state.update({"step": "children", "children": children, "caption": content or ""})
+                return self.resume_publish(state)
 
             # SINGLE MEDIA (Image or Video)
             else:
@@ -295,16 +260,14 @@ class InstagramProvider(BaseProvider):
                         "access_token": page_token,
                     }
 
-                    res = requests.post(f"{self.api_base}/{ig_user_id}/media", data=video_data, timeout=30)
+                    res = http.post(f"{self.api_base}/{ig_user_id}/media", data=video_data, timeout=30)
 
                     if res.status_code != 200:
                         return self._handle_error(res, "Video container creation failed")
 
-                    container_id = res.json().get("id")
-
-                    # Wait for video processing
-                    if not self._wait_for_media_processing(container_id, page_token, max_retries=60, delay=6):
-                        return PublishResult(success=False, error_message="Video processing timeout")
+                    return self._await_container(
+                        res.json().get("id"), "Post", "Video", self.VIDEO_POLL_DELAY, 360
+                    )
 
                 else:
                     # Single image post
@@ -319,7 +282,7 @@ class InstagramProvider(BaseProvider):
                         "access_token": page_token,
                     }
 
-                    res = requests.post(f"{self.api_base}/{ig_user_id}/media", data=image_data, timeout=30)
+                    res = http.post(f"{self.api_base}/{ig_user_id}/media", data=image_data, timeout=30)
 
                     if res.status_code != 200:
                         return self._handle_error(res, "Image container creation failed")
@@ -344,7 +307,7 @@ class InstagramProvider(BaseProvider):
             "access_token": page_token,
         }
 
-        publish_res = requests.post(
+        publish_res = http.post(
             f"{self.api_base}/{ig_user_id}/media_publish", data=publish_data, timeout=30
         )
 
@@ -368,73 +331,182 @@ class InstagramProvider(BaseProvider):
         """Check if file is an image"""
         return url.lower().endswith((".jpg", ".jpeg", ".png"))
 
-    def _wait_for_media_processing(self, container_id, access_token, max_retries=30, delay=5):
+    def _new_poll_state(self, content_type: str, label: str, base_delay: float, max_wait: float) -> dict:
+        return {
+            "content_type": content_type,
+            "label": label,
+            "base_delay": base_delay,
+            "max_wait": max_wait,
+            "started_at": time.time(),
+            "attempt": 0,
+        }
+
+    def _await_container(
+        self, container_id: str, content_type: str, label: str, base_delay: float, max_wait: float
+    ) -> PublishResult:
+        """Publish the container once Meta has processed it, checking right away and then in the background"""
+        state = self._new_poll_state(content_type, label, base_delay, max_wait)
+        state.update({"step": "processing", "container_id": container_id})
+        return self.resume_publish(state)
+
+    def resume_publish(self, state: dict) -> PublishResult:
         """
-        Wait for Instagram to process the video/media
-        Returns True when finished, False on error or timeout
+        Check a pending publish once and move it forward.
+
+        Never waits: if Meta is still processing, the state is handed back with the
+        delay before the next check, growing with each attempt.
         """
-        url = f"{self.api_base}/{container_id}"
-        params = {"fields": "status_code,status", "access_token": access_token}
-
-        for attempt in range(max_retries):
-            try:
-                res = requests.get(url, params=params, timeout=10)
-                if res.status_code == 200:
-                    data = res.json()
-                    code = data.get("status_code")
-                    status = data.get("status")
-
-                    frappe.logger().info(
-                        f"[Instagram] Media processing attempt {attempt + 1}/{max_retries}: "
-                        f"Container {container_id} - Status: {code} ({status})"
-                    )
+        page_token = self.integration.get_password("page_access_token") if self.integration else None
+        ig_user_id = self.integration.profile_id if self.integration else None
 
-                    if code == "FINISHED":
-                        frappe.logger().info(
-                            f"[Instagram] Media {container_id} processing completed successfully"
-                        )
-                        return True
+        if not page_token or not ig_user_id:
+            return PublishResult(success=False, error_message="Missing credentials")
 
+        if state.get("step") == "children":
+            children = state["children"]
+
+            # One request for every child still processing
+            polling = [c for c in children if c.get("container_id") and c.get("status") != "FINISHED"]
+            if polling:
+                statuses = self._get_container_statuses([c["container_id"] for c in polling], page_token)
+                for child in polling:
+                    code, status = statuses.get(child["container_id"], (None, None))
                     if code == "ERROR":
-                        error_msg = data.get("status", "Unknown error during processing")
-                        frappe.log_error(
-                            title="Instagram Media Processing Error",
-                            message=f"Container: {container_id}\n"
-                            f"Status: {status}\n"
-                            f"Error: {error_msg}\n"
-                            f"Response: {res.text}",
-                        )
-                        return False
+                        child.update({"container_id": None, "status": "ERROR", "error": status})
+                    elif code:
+                        child["status"] = code
+
+            failed = [c for c in children if not c.get("container_id")]
+            if any(c["attempts"] >= self.CAROUSEL_ITEM_ATTEMPTS for c in failed):
+                errors = "; ".join(f"item {c['item']}: {c.get('error')}" for c in failed)
+                return PublishResult(
+                    success=False,
+                    error_message=f"Carousel items failed: {errors}",
+                    raw_response={"children": children},
+                )
 
-                    # Status is still IN_PROGRESS or EXPIRED, continue waiting
-                    if code in ["IN_PROGRESS", "PUBLISHED"]:
-                        time.sleep(delay)
-                        continue
+            # Recreate only the children that failed; finished ones are kept
+            if failed:
+                self._create_carousel_children(failed, page_token, ig_user_id)
+                return self._poll_later(state)
 
-                    # Unknown status code
-                    frappe.logger().warning(
-                        f"[Instagram] Unknown status code '{code}' for container {container_id}"
-                    )
+            if any(c.get("status") != "FINISHED" for c in children):
+                return self._poll_later(state)
 
-                else:
-                    frappe.logger().warning(
-                        f"[Instagram] Status check failed: HTTP {res.status_code} - {res.text}"
-                    )
+            carousel_data = {
+                "media_type": "CAROUSEL",
+                "children": ",".join(c["container_id"] for c in children),
+                "caption": state.get("caption") or "",
+                "access_token": page_token,
+            }
 
-            except requests.exceptions.Timeout:
-                frappe.logger().error(f"[Instagram] Timeout checking status for {container_id}")
-            except Exception as e:
-                frappe.logger().error(f"[Instagram] Error checking media status: {str(e)}")
+            parent_res = http.post(f"{self.api_base}/{ig_user_id}/media", data=carousel_data, timeout=60)
 
-            time.sleep(delay)
+            if parent_res.status_code != 200:
+                return self._handle_error(parent_res, "Carousel parent creation failed")
 
-        # Timeout reached
-        frappe.log_error(
-            title="Instagram Processing Timeout",
-            message=f"Container {container_id} did not finish processing after "
-            f"{max_retries * delay} seconds ({max_retries} retries)",
-        )
-        return False
+            return self._publish_container(
+                parent_res.json().get("id"), page_token, ig_user_id, state["content_type"]
+            )
+
+        container_id = state["container_id"]
+        code, status = self._get_container_status(container_id, page_token)
+
+        if code == "FINISHED":
+            return self._publish_container(container_id, page_token, ig_user_id, state["content_type"])
+
+        if code == "ERROR":
+            return PublishResult(
+                success=False, error_message=f"{state['label']} processing failed: {status}"
+            )
+
+        return self._poll_later(state)
+
+    def _poll_later(self, state: dict) -> PublishResult:
+        """Hand the state back to be checked again after an adaptive delay, or give up"""
+        elapsed = time.time() - state["started_at"]
+        if elapsed > state["max_wait"]:
+            frappe.log_error(
+                title="Instagram Processing Timeout",
+                message=f"{state['label']} did not finish processing after {int(elapsed)} seconds\n"
+                f"State: {frappe.as_json(state)}",
+            )
+            return PublishResult(success=False, error_message=f"{state['label']} processing timeout")
+
+        delay = min(state["base_delay"] * self.POLL_BACKOFF ** state["attempt"], self.MAX_POLL_DELAY)
+        state["attempt"] += 1
+        return PublishResult(success=False, pending_state=state, retry_after=delay)
+
+    def _create_carousel_children(self, children: list, page_token: str, ig_user_id: str) -> None:
+        """
+        Create item containers for `children` in one Graph batch.
+        Sets container_id on success, or status ERROR and the error on failure
+        """
+        batch = GraphBatch(self.api_base, page_token)
+        for child in children:
+            batch.add(
+                "POST",
+                f"{ig_user_id}/media",
+                body={"image_url": child["image_url"], "is_carousel_item": "true"},
+            )
+
+        try:
+            responses = batch.execute()
+        except Exception as e:
+            responses = [frappe._dict(code=None, body={"error": {"message": str(e)}})] * len(children)
+
+        for child, res in zip(children, responses, strict=True):
+            container_id = res.body.get("id") if res.code == 200 else None
+            child["attempts"] += 1
+            child["container_id"] = container_id
+            child["status"] = "IN_PROGRESS" if container_id else "ERROR"
+            child["error"] = None
+            if not container_id:
+                child["error"] = res.body.get("error", {}).get("message") or f"HTTP {res.code}"
+
+    def _get_container_status(self, container_id, access_token):
+        """
+        Check a media container once.
+        Returns (status_code, status); status_code is None when the check itself failed
+        """
+        return self._get_container_statuses([container_id], access_token).get(container_id, (None, None))
+
+    def _get_container_statuses(self, container_ids: list, access_token: str) -> dict:
+        """
+        Check several media containers in one request.
+        Returns {container_id: (status_code, status)}; empty when the check itself failed
+        """
+        params = {
+            "ids": ",".join(container_ids),
+            "fields": "status_code,status",
+            "access_token": access_token,
+        }
+
+        try:
+            res = http.get(f"{self.api_base}/", params=params, timeout=10)
+        except Exception as e:
+            frappe.logger().error(f"[Instagram] Error checking media status: {str(e)}")
+            return {}
+
+        if res.status_code != 200:
+            frappe.logger().warning(f"[Instagram] Status check failed: HTTP {res.status_code} - {res.text}")
+            return {}
+
+        statuses = {}
+        for container_id, data in res.json().items():
+            code = data.get("status_code")
+            status = data.get("status")
+            statuses[container_id] = (code, status)
+
+            frappe.logger().info(f"[Instagram] Container {container_id} - Status: {code} ({status})")
+
+            if code == "ERROR":
+                frappe.log_error(
+                    title="Instagram Media Processing Error",
+                    message=f"Container: {container_id}\nStatus: {status}\nResponse: {frappe.as_json(data)}",
+                )
+
+        return statuses
 
     def _handle_error(self, response, context):
         """Handle API errors with detailed logging"""
@@ -518,3 +590,6 @@ class InstagramProvider(BaseProvider):
     def get_daily_limit(self) -> int:
         """Get daily posting limit"""
         return self.DAILY_POST_LIMIT
+
+    def refresh_token(self, integration_name: str = None) -> TokenRefreshResult:
+        return refresh_long_lived_token(self.api_base, self.settings, self.get_integration_doc(integration_name))
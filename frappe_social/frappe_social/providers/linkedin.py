@@ -7,9 +7,14 @@ Requirements:
 - 150 requests/day per member
 """
 
+import os
 import frappe
-import requests
-from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import quote
+from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult, TokenRefreshResult
+from frappe_social.frappe_social.utils import http
+from frappe_social.frappe_social.utils.media import normalize_file_type
+from frappe_social.frappe_social.utils.multipart import ChunkReader, FilePart
 
 
 class LinkedInProvider(BaseProvider):
@@ -17,6 +22,12 @@ class LinkedInProvider(BaseProvider):
     MAX_CONTENT_LENGTH = 3000
     SUPPORTS_IMAGES = True
     SUPPORTS_VIDEO = True
+    MAX_IMAGES = 20
+
+    API_BASE = "https://api.linkedin.com/rest"
+    UPLOAD_CONCURRENCY = 4
+    MAX_UPLOAD_FAILURES = 3
+    MAX_STATUS_CHECKS = 60
 
     def __init__(self, integration_name: str = None):
         super().__init__(integration_name)
@@ -35,18 +46,199 @@ class LinkedInProvider(BaseProvider):
         if not self.integration:
             return PublishResult(success=False, error_message="No integration configured")
         
+        try:
+            if media_files:
+                assets = []
+                for media in media_files:
+                    file_url = getattr(media, "file_url", None) or media
+                    is_video = (normalize_file_type(file_url) or "").startswith("video/")
+                    assets.append({"kind": "video" if is_video else "image", "path": self._get_full_path(file_url)})
+
+                # A post carries one video, or up to MAX_IMAGES images (multiImage)
+                if len(assets) > 1 and any(a["kind"] == "video" for a in assets):
+                    return PublishResult(
+                        success=False, error_message="LinkedIn posts take one video, without other media"
+                    )
+                if len(assets) > self.MAX_IMAGES:
+                    return PublishResult(
+                        success=False, error_message=f"LinkedIn posts take at most {self.MAX_IMAGES} images"
+                    )
+
+                state = {"step": "upload", "text": content or "", "assets": assets, "failures": 0, "checks": 0}
+                return self._continue_upload(state)
+
+            return self._create_post(content or "")
+        except Exception as e:
+            return PublishResult(success=False, error_message=str(e))
+
+    def resume_publish(self, state: dict) -> PublishResult:
+        if state.get("step") != "upload":
+            return super().resume_publish(state)
+        return self._continue_upload(state)
+
+    def _continue_upload(self, state: dict) -> PublishResult:
+        """
+        Initialize, upload and finalize every asset, wait for videos, then create the post.
+
+        Progress (asset URNs, part ETags) is checkpointed after each step, so a
+        resumed publish only uploads what is still missing.
+        """
+        assets = state["assets"]
         author = f"urn:li:person:{self.integration.profile_id}"
-        
+
+        for asset in assets:
+            if not asset.get("urn"):
+                self._initialize_upload(asset, author)
+                self.checkpoint(state)
+
+        errors = self._upload_parts(state)
+        if errors:
+            state["failures"] += 1
+            if state["failures"] >= self.MAX_UPLOAD_FAILURES:
+                return PublishResult(success=False, error_message=f"Media upload failed: {'; '.join(errors)}")
+            return PublishResult(success=False, error_message=f"Media upload interrupted: {'; '.join(errors)}",
+                pending_state=state, retry_after=15 * 2 ** state["failures"])
+
+        for asset in assets:
+            if asset["kind"] == "video" and not asset.get("finalized"):
+                self._finalize_video(asset)
+                self.checkpoint(state)
+
+        # Videos must finish processing before they can be attached
+        for asset in assets:
+            if asset["kind"] == "video" and asset.get("status") != "AVAILABLE":
+                response = http.get(f"{self.API_BASE}/videos/{quote(asset['urn'])}",
+                    headers=self._get_headers(), timeout=30)
+                if response.status_code == 200:
+                    asset["status"] = response.json().get("status")
+
+        if any(a.get("status") == "PROCESSING_FAILED" for a in assets):
+            return PublishResult(success=False, error_message="LinkedIn video processing failed")
+
+        if any(a["kind"] == "video" and a.get("status") != "AVAILABLE" for a in assets):
+            if state["checks"] >= self.MAX_STATUS_CHECKS:
+                return PublishResult(success=False, error_message="LinkedIn video processing timeout")
+            state["checks"] += 1
+            return PublishResult(success=False, pending_state=state, retry_after=min(5 * state["checks"], 60))
+
+        if len(assets) == 1:
+            media_content = {"media": {"id": assets[0]["urn"]}}
+        else:
+            media_content = {"multiImage": {"images": [{"id": a["urn"]} for a in assets]}}
+
+        return self._create_post(state["text"], media_content)
+
+    def _initialize_upload(self, asset: dict, author: str) -> None:
+        """Register an image or video with LinkedIn and record where its bytes go"""
+        if asset["kind"] == "image":
+            response = http.post(f"{self.API_BASE}/images?action=initializeUpload",
+                headers=self._get_headers(), json={"initializeUploadRequest": {"owner": author}}, timeout=30)
+            response.raise_for_status()
+            value = response.json()["value"]
+            asset.update(urn=value["image"], parts=[{
+                "url": value["uploadUrl"],
+                "first": 0,
+                "last": os.path.getsize(asset["path"]) - 1,
+                "etag": None,
+            }])
+            return
+
+        response = http.post(f"{self.API_BASE}/videos?action=initializeUpload", headers=self._get_headers(),
+            json={"initializeUploadRequest": {
+                "owner": author,
+                "fileSizeBytes": os.path.getsize(asset["path"]),
+                "uploadCaptions": False,
+                "uploadThumbnail": False,
+            }}, timeout=30)
+        response.raise_for_status()
+        value = response.json()["value"]
+        asset.update(urn=value["video"], upload_token=value.get("uploadToken", ""), parts=[
+            {"url": i["uploadUrl"], "first": i["firstByte"], "last": i["lastByte"], "etag": None}
+            for i in value["uploadInstructions"]
+        ])
+
+    def _upload_parts(self, state: dict) -> list:
+        """
+        PUT every part without an ETag, UPLOAD_CONCURRENCY at a time.
+        ETags are checkpointed as parts complete. Returns the errors of failed parts
+        """
+        token = self.integration.get_password("access_token")
+        parts = [(asset, part) for asset in state["assets"] for part in asset["parts"] if not part["etag"]]
+        if not parts:
+            return []
+
+        total = sum(p["last"] - p["first"] + 1 for a in state["assets"] for p in a["parts"])
+        done = sum(p["last"] - p["first"] + 1 for a in state["assets"] for p in a["parts"] if p["etag"])
+        sent = {}
+
+        # Build the pooled sessions here: the worker threads have no site context
+        for _, part in parts:
+            http.get_session(part["url"])
+
+        def upload(asset, part, key):
+            length = part["last"] - part["first"] + 1
+            # Image uploads need the token; video part URLs are pre-signed
+            headers = {"Content-Type": "application/octet-stream"}
+            if asset["kind"] == "image":
+                headers["Authorization"] = f"Bearer {token}"
+
+            with ChunkReader(FilePart(asset["path"], offset=part["first"], length=length),
+                    callback=lambda sent_bytes, _: sent.__setitem__(key, sent_bytes)) as body:
+                response = http.put(part["url"], data=body, headers=headers, timeout=300)
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            if not etag and asset["kind"] == "video":
+                # finalizeUpload needs every part's ETag: leave the part to be sent again
+                raise Exception("No ETag in upload response")
+            return etag or "uploaded"
+
+        errors = []
+        # Failures and token rejections in the workers are re-noted on this thread
+        notes = http.WorkerNotes()
+        with ThreadPoolExecutor(max_workers=min(self.UPLOAD_CONCURRENCY, len(parts))) as pool:
+            futures = {pool.submit(notes.wrap(upload), asset, part, i): (asset, part, i)
+                for i, (asset, part) in enumerate(parts)}
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    asset, part, key = futures[future]
+                    try:
+                        part["etag"] = future.result()
+                        done += part["last"] - part["first"] + 1
+                        sent.pop(key, None)
+                    except Exception as e:
+                        errors.append(f"{os.path.basename(asset['path'])} bytes {part['first']}-{part['last']}: {e}")
+                if finished:
+                    self.checkpoint(state)
+                self.report_progress(min(done + sum(sent.values()), total), total)
+        notes.apply()
+
+        return errors
+
+    def _finalize_video(self, asset: dict) -> None:
+        response = http.post(f"{self.API_BASE}/videos?action=finalizeUpload", headers=self._get_headers(),
+            json={"finalizeUploadRequest": {
+                "video": asset["urn"],
+                "uploadToken": asset.get("upload_token", ""),
+                "uploadedPartIds": [p["etag"] for p in asset["parts"]],
+            }}, timeout=60)
+        response.raise_for_status()
+        asset["finalized"] = True
+
+    def _create_post(self, content: str, media_content: dict = None) -> PublishResult:
         post_data = {
-            "author": author,
+            "author": f"urn:li:person:{self.integration.profile_id}",
             "lifecycleState": "PUBLISHED",
             "visibility": "PUBLIC",
-            "commentary": content or "",
+            "commentary": content,
             "distribution": {"feedDistribution": "MAIN_FEED"}
         }
+        if media_content:
+            post_data["content"] = media_content
         
         try:
-            response = requests.post("https://api.linkedin.com/rest/posts",
+            response = http.post(f"{self.API_BASE}/posts",
                 headers=self._get_headers(), json=post_data)
             
             if response.status_code in [200, 201]:
@@ -67,3 +259,23 @@ class LinkedInProvider(BaseProvider):
 
     def get_daily_limit(self) -> int:
         return 150
+
+    def refresh_token(self, integration_name: str = None) -> TokenRefreshResult:
+        """Programmatic refresh; LinkedIn only issues refresh tokens to approved apps"""
+        integration = self.get_integration_doc(integration_name)
+        refresh_token = integration.get_password("refresh_token", raise_exception=False)
+        if not refresh_token:
+            return TokenRefreshResult(success=False, error_message="No refresh token")
+
+        response = http.post("https://www.linkedin.com/oauth/v2/accessToken", data={
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": self.settings.linkedin_client_id,
+            "client_secret": self.settings.get_password("linkedin_client_secret"),
+        }, headers={"Content-Type": "application/x-www-form-urlencoded"}, timeout=30)
+        if response.status_code != 200:
+            return TokenRefreshResult(success=False, error_message=f"Refresh failed: {response.text}")
+
+        data = response.json()
+        return TokenRefreshResult(success=True, access_token=data.get("access_token"),
+            refresh_token=data.get("refresh_token"), expires_in=data.get("expires_in"))
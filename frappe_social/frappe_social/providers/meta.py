@@ -0,0 +1,171 @@
+"""
+Graph API batch requests shared by the Facebook and Instagram providers
+
+Up to 50 sub-requests go to Meta in one HTTP call. A named sub-request can feed
+later ones through a JSONPath reference, which Meta resolves server side:
+
+    batch = GraphBatch(api_base, page_token)
+    photo = batch.add("POST", f"{page_id}/photos", body={"published": "false"},
+                      file=FilePart(path), name="photo0")
+    batch.add("POST", f"{page_id}/feed",
+              body={"attached_media[0]": frappe.as_json({"media_fbid": batch.ref(photo)})})
+    photo_resp, post_resp = batch.execute()
+
+Each result is a frappe._dict(code=..., body=...), in the order the requests were added.
+"""
+
+import json
+from typing import Callable, Dict, List
+from urllib.parse import urlencode
+
+import frappe
+
+from frappe_social.frappe_social.providers.base import TokenRefreshResult
+from frappe_social.frappe_social.utils import http
+from frappe_social.frappe_social.utils.multipart import FilePart, MultipartEncoder
+
+# Kept unescaped in sub-request bodies so Meta can find and resolve {result=name:$.path}
+REFERENCE_SAFE_CHARS = "{}=:$"
+
+
+class GraphBatch:
+    MAX_REQUESTS = 50
+
+    def __init__(self, api_base: str, access_token: str):
+        self.api_base = api_base
+        self.access_token = access_token
+        self.requests: List[Dict] = []
+        self.files: Dict[str, FilePart] = {}
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def add(
+        self,
+        method: str,
+        relative_url: str,
+        params: Dict = None,
+        body: Dict = None,
+        name: str = None,
+        file: FilePart = None,
+    ) -> str:
+        """Queue a sub-request. Returns its name, for ref(); one is generated if not given"""
+        if len(self.requests) >= self.MAX_REQUESTS:
+            raise ValueError(f"A Graph batch holds at most {self.MAX_REQUESTS} requests")
+
+        name = name or f"req{len(self.requests)}"
+        request = {"method": method, "relative_url": relative_url, "name": name}
+        if params:
+            request["relative_url"] += ("&" if "?" in relative_url else "?") + urlencode(
+                params, safe=REFERENCE_SAFE_CHARS
+            )
+        if body:
+            request["body"] = urlencode(body, safe=REFERENCE_SAFE_CHARS)
+        if file:
+            field = f"file{len(self.files)}"
+            self.files[field] = file
+            request["attached_files"] = field
+        # Named results are dropped from the response once referenced unless asked for
+        request["omit_response_on_success"] = False
+
+        self.requests.append(request)
+        return name
+
+    @staticmethod
+    def ref(name: str, path: str = "$.id") -> str:
+        """JSONPath reference to the result of an earlier sub-request in the same batch"""
+        return f"{{result={name}:{path}}}"
+
+    def execute(self, timeout: int = 60, callback: Callable[[int, int], None] = None) -> List[frappe._dict]:
+        """
+        Send the batch. Returns one frappe._dict(code, body) per sub-request.
+        `callback(bytes_sent, total_bytes)` follows the upload of attached files.
+
+        If the batch call itself fails, every result carries that status and error.
+        Sub-requests Meta did not run (e.g. a dependency failed) come back with code None.
+        """
+        if not self.requests:
+            return []
+
+        fields = {
+            "access_token": self.access_token,
+            "batch": json.dumps(self.requests),
+            "include_headers": "false",
+        }
+        if self.files:
+            with MultipartEncoder(fields, self.files, callback=callback) as body:
+                response = http.post(
+                    f"{self.api_base}/",
+                    data=body,
+                    headers={"Content-Type": body.content_type},
+                    timeout=timeout,
+                    read_only=True,
+                )
+        else:
+            response = http.post(f"{self.api_base}/", data=fields, timeout=timeout, read_only=True)
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = {"error": {"message": response.text or f"HTTP {response.status_code}"}}
+
+        if response.status_code != 200 or not isinstance(data, list):
+            return [frappe._dict(code=response.status_code, body=data) for _ in self.requests]
+
+        results = []
+        for request, item in zip(self.requests, data, strict=False):
+            if not item:
+                results.append(frappe._dict(code=None, body={}))
+                continue
+            try:
+                body = json.loads(item.get("body") or "{}")
+            except ValueError:
+                body = {"error": {"message": item.get("body")}}
+            write = request["method"].upper() not in http.READ_METHODS
+            if (item.get("code") or 200) >= 400:
+                http.note_failure(item.get("code"), body, write=write)
+            elif write:
+                http.note_write()
+            if http.is_auth_rejection(item.get("code"), body=body):
+                http.mark_auth_failure()
+            results.append(frappe._dict(code=item.get("code"), body=body))
+        # A truncated response still gives every sub-request its (empty) result
+        results.extend(frappe._dict(code=None, body={}) for _ in self.requests[len(results):])
+        return results
+
+
+def refresh_long_lived_token(api_base: str, settings, integration) -> TokenRefreshResult:
+    """
+    Exchange the integration's long-lived user token for a fresh one, then re-read
+    the page token from it (page tokens derived from a long-lived user token do not
+    expire on their own, but are invalidated with it).
+    """
+    user_token = integration.get_password("access_token", raise_exception=False)
+    if not user_token:
+        return TokenRefreshResult(success=False, error_message="No access token")
+
+    response = http.get(
+        f"{api_base}/oauth/access_token",
+        params={
+            "grant_type": "fb_exchange_token",
+            "client_id": settings.meta_app_id,
+            "client_secret": settings.get_password("meta_app_secret"),
+            "fb_exchange_token": user_token,
+        },
+        timeout=30,
+    )
+    data = response.json() if response.text else {}
+    if response.status_code != 200 or not data.get("access_token"):
+        return TokenRefreshResult(success=False, error_message=f"Refresh failed: {response.text}")
+
+    result = TokenRefreshResult(
+        success=True, access_token=data["access_token"], expires_in=data.get("expires_in")
+    )
+    if integration.page_id:
+        page = http.get(
+            f"{api_base}/{integration.page_id}",
+            params={"fields": "access_token", "access_token": result.access_token},
+            timeout=30,
+        ).json()
+        result.page_access_token = page.get("access_token")
+    return result
@@ -8,9 +8,12 @@ Requirements:
 - Media: Images 5MB/4 per tweet, Videos 512MB/140s
 """
 
-import frappe
-import requests
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
 from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult, TokenRefreshResult
+from frappe_social.frappe_social.utils import http
+from frappe_social.frappe_social.utils.media import normalize_file_type
+from frappe_social.frappe_social.utils.multipart import FilePart, MultipartEncoder
 
 
 class TwitterProvider(BaseProvider):
@@ -22,6 +25,11 @@ class TwitterProvider(BaseProvider):
 
     TIER_LIMITS = {"Free": 17, "Basic": 100, "Pro": 1000, "Enterprise": 10000}
 
+    UPLOAD_URL = "https://upload.twitter.com/1.1/media/upload.json"
+    MAX_SEGMENT_SIZE = 5 * 1024 * 1024  # APPEND limit
+    MAX_STATUS_CHECKS = 60
+    ANALYTICS_BATCH_SIZE = 100  # /2/tweets?ids= limit
+
     def __init__(self, integration_name: str = None):
         super().__init__(integration_name)
         self.client_id = self.settings.twitter_client_id
@@ -35,27 +43,184 @@ class TwitterProvider(BaseProvider):
         if not access_token:
             return PublishResult(success=False, error_message="No access token")
         
-        # Check rate limit
-        if not self._check_rate_limit():
-            return PublishResult(success=False, error_message="Daily tweet limit reached")
-        
-        tweet_data = {"text": content or ""}
-        
-        # TODO: Media upload requires OAuth 1.0a - not implemented yet
-        # if media_files:
-        #     media_ids = self._upload_media(media_files)
-        #     if media_ids:
-        #         tweet_data["media"] = {"media_ids": media_ids}
-        
         try:
-            response = requests.post("https://api.twitter.com/2/tweets",
+            if media_files:
+                # A tweet carries one video or GIF, or up to MAX_IMAGES images
+                types = [normalize_file_type(getattr(m, "file_url", None) or m) or "" for m in media_files]
+                if len(types) > 1 and any(t.startswith("video/") or t == "image/gif" for t in types):
+                    return PublishResult(success=False,
+                        error_message="A tweet takes one video or GIF, without other media")
+                if len(types) > self.MAX_IMAGES:
+                    return PublishResult(success=False,
+                        error_message=f"A tweet takes at most {self.MAX_IMAGES} images")
+
+                auth = self._get_oauth1()
+                if not auth:
+                    return PublishResult(success=False,
+                        error_message="Media upload needs the OAuth 1.0a API key/secret in Social Settings "
+                        "and an OAuth 1.0a token on the integration")
+
+                media, error = self._upload_media(media_files, auth)
+                if error:
+                    return PublishResult(success=False, error_message=error)
+
+                # Videos may still be processing; the tweet is created once they are ready
+                return self.resume_publish({"step": "processing", "text": content or "", "media": media, "checks": 0})
+
+            return self._create_tweet(access_token, {"text": content or ""})
+        except Exception as e:
+            return PublishResult(success=False, error_message=str(e))
+
+    def resume_publish(self, state: dict) -> PublishResult:
+        """Check media still being processed and tweet once all of it is ready"""
+        if state.get("step") != "processing":
+            return super().resume_publish(state)
+
+        access_token = self.integration.get_password("access_token") if self.integration else None
+        if not access_token:
+            return PublishResult(success=False, error_message="No access token")
+
+        processing = [m for m in state["media"] if m["state"] in ("pending", "in_progress")]
+        if processing and state["checks"]:
+            auth = self._get_oauth1()
+            for item in processing:
+                response = http.get(self.UPLOAD_URL,
+                    params={"command": "STATUS", "media_id": item["media_id"]}, auth=auth, timeout=30)
+                if response.status_code == 200:
+                    item.update(self._media_entry(item["media_id"], response.json().get("processing_info")))
+
+        failed = [m for m in state["media"] if m["state"] == "failed"]
+        if failed:
+            errors = "; ".join(f"{m['media_id']}: {m.get('error')}" for m in failed)
+            return PublishResult(success=False, error_message=f"Media processing failed: {errors}")
+
+        processing = [m for m in state["media"] if m["state"] != "succeeded"]
+        if processing:
+            if state["checks"] >= self.MAX_STATUS_CHECKS:
+                return PublishResult(success=False, error_message="Media processing timeout")
+            state["checks"] += 1
+            return PublishResult(success=False, pending_state=state,
+                retry_after=max(min(m.get("check_after") or 5 for m in processing), 1))
+
+        return self._create_tweet(access_token,
+            {"text": state["text"], "media": {"media_ids": [m["media_id"] for m in state["media"]]}})
+
+    def _get_oauth1(self):
+        """OAuth 1.0a signer for the v1.1 media endpoints, or None if not configured"""
+        from requests_oauthlib import OAuth1
+
+        api_key = self.settings.twitter_api_key
+        api_secret = self.settings.get_password("twitter_api_secret", raise_exception=False)
+        token = self.integration.get_oauth_1_token()
+        token_secret = self.integration.get_oauth_1_secret()
+
+        if not (api_key and api_secret and token and token_secret):
+            return None
+        return OAuth1(api_key, api_secret, token, token_secret)
+
+    def _upload_media(self, media_files: list, auth) -> tuple:
+        """
+        Upload all files in parallel through INIT/APPEND/FINALIZE.
+        Returns (media entries in file order, error message)
+        """
+        files = []
+        for media in media_files:
+            file_url = getattr(media, "file_url", None) or media
+            path = self._get_full_path(file_url)
+            files.append({
+                "path": path,
+                "size": os.path.getsize(path),
+                "media_type": normalize_file_type(file_url) or "application/octet-stream",
+            })
+
+        total = sum(f["size"] for f in files)
+        sent = [0] * len(files)
+        segment_size = min(self.get_upload_chunk_size(), self.MAX_SEGMENT_SIZE)
+
+        # Build the pooled session here: the worker threads have no site context
+        http.get_session(self.UPLOAD_URL)
+
+        def on_progress(idx):
+            return lambda sent_bytes: sent.__setitem__(idx, sent_bytes)
+
+        # Failures and token rejections in the workers are re-noted on this thread
+        notes = http.WorkerNotes()
+        with ThreadPoolExecutor(max_workers=len(files)) as pool:
+            futures = [pool.submit(notes.wrap(self._upload_file), f, auth, segment_size, on_progress(i))
+                for i, f in enumerate(files)]
+
+            # Progress is written from this thread, which has the site context
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=1)
+                self.report_progress(min(sum(sent), total), total)
+        notes.apply()
+
+        media, errors = [], []
+        for f, future in zip(files, futures, strict=True):
+            try:
+                media.append(future.result())
+            except Exception as e:
+                errors.append(f"{os.path.basename(f['path'])}: {e}")
+
+        return media, "; ".join(errors) or None
+
+    def _upload_file(self, file: dict, auth, segment_size: int, on_progress) -> dict:
+        """Upload one file in segments streamed from disk (runs in a worker thread, no frappe calls)"""
+        media_type = file["media_type"]
+        if media_type.startswith("video/"):
+            category = "tweet_video"
+        elif media_type == "image/gif":
+            category = "tweet_gif"
+        else:
+            category = "tweet_image"
+
+        init = http.post(self.UPLOAD_URL, auth=auth, timeout=30, data={
+            "command": "INIT",
+            "total_bytes": file["size"],
+            "media_type": media_type,
+            "media_category": category,
+        })
+        if init.status_code not in (200, 201, 202):
+            raise Exception(f"INIT failed: {init.status_code} {init.text}")
+        media_id = init.json()["media_id_string"]
+
+        for index, offset in enumerate(range(0, file["size"], segment_size)):
+            part = FilePart(file["path"], offset=offset, length=min(segment_size, file["size"] - offset))
+            fields = {"command": "APPEND", "media_id": media_id, "segment_index": index}
+            with MultipartEncoder(fields, {"media": part},
+                    callback=lambda sent_bytes, _, start=offset: on_progress(start + sent_bytes)) as body:
+                append = http.post(self.UPLOAD_URL, data=body, auth=auth, timeout=300,
+                    headers={"Content-Type": body.content_type})
+            if append.status_code not in (200, 201, 202, 204):
+                raise Exception(f"APPEND segment {index} failed: {append.status_code} {append.text}")
+
+        finalize = http.post(self.UPLOAD_URL, data={"command": "FINALIZE", "media_id": media_id},
+            auth=auth, timeout=60)
+        if finalize.status_code not in (200, 201, 202):
+            raise Exception(f"FINALIZE failed: {finalize.status_code} {finalize.text}")
+
+        return self._media_entry(media_id, finalize.json().get("processing_info"))
+
+    def _media_entry(self, media_id: str, processing_info: dict = None) -> dict:
+        if not processing_info:
+            return {"media_id": media_id, "state": "succeeded"}
+        return {
+            "media_id": media_id,
+            "state": processing_info.get("state"),
+            "check_after": processing_info.get("check_after_secs"),
+            "error": (processing_info.get("error") or {}).get("message"),
+        }
+
+    def _create_tweet(self, access_token: str, tweet_data: dict) -> PublishResult:
+        try:
+            response = http.post("https://api.twitter.com/2/tweets",
                 headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
                 json=tweet_data)
             
             if response.status_code in [200, 201]:
                 data = response.json().get("data", {})
                 tweet_id = data.get("id")
-                self._increment_rate_limit()
                 return PublishResult(success=True, post_id=tweet_id, post_url=f"https://twitter.com/i/web/status/{tweet_id}")
             else:
                 error = response.json()
@@ -63,35 +228,23 @@ class TwitterProvider(BaseProvider):
         except Exception as e:
             return PublishResult(success=False, error_message=str(e))
 
-    def _check_rate_limit(self) -> bool:
-        settings = frappe.get_single("Social Settings")
-        limit = self.TIER_LIMITS.get(settings.twitter_tier or "Free", 17)
-        return (settings.twitter_posts_today or 0) < limit
-
-    def _increment_rate_limit(self):
-        settings = frappe.get_single("Social Settings")
-        settings.twitter_posts_today = (settings.twitter_posts_today or 0) + 1
-        settings.save(ignore_permissions=True)
-
     def refresh_token(self, integration_name: str = None) -> TokenRefreshResult:
         integration = self.get_integration_doc(integration_name)
-        refresh_token = integration.get_password("refresh_token")
+        refresh_token = integration.get_password("refresh_token", raise_exception=False)
         
         if not refresh_token:
             return TokenRefreshResult(success=False, error_message="No refresh token")
         
         try:
-            response = requests.post("https://api.twitter.com/2/oauth2/token",
+            response = http.post("https://api.twitter.com/2/oauth2/token",
                 data={"grant_type": "refresh_token", "refresh_token": refresh_token, "client_id": self.client_id},
                 auth=(self.client_id, self.client_secret))
             
             if response.status_code == 200:
                 data = response.json()
-                integration.access_token = data.get("access_token")
-                if data.get("refresh_token"):
-                    integration.refresh_token = data.get("refresh_token")
-                integration.save(ignore_permissions=True)
-                return TokenRefreshResult(success=True, access_token=data.get("access_token"), expires_in=data.get("expires_in"))
+                # Twitter rotates the refresh token on every use
+                return TokenRefreshResult(success=True, access_token=data.get("access_token"),
+                    refresh_token=data.get("refresh_token"), expires_in=data.get("expires_in"))
             return TokenRefreshResult(success=False, error_message=f"Refresh failed: {response.text}")
         except Exception as e:
             return TokenRefreshResult(success=False, error_message=str(e))
@@ -101,7 +254,7 @@ class TwitterProvider(BaseProvider):
         access_token = integration.get_password("access_token")
         
         try:
-            response = requests.get(f"https://api.twitter.com/2/users/{integration.profile_id}",
+            response = http.get(f"https://api.twitter.com/2/users/{integration.profile_id}",
                 params={"user.fields": "public_metrics"},
                 headers={"Authorization": f"Bearer {access_token}"})
             
@@ -118,25 +271,33 @@ class TwitterProvider(BaseProvider):
 
     def fetch_post_analytics(self, post_id: str, integration_name: str = None) -> AnalyticsResult:
         """Note: Non-public metrics require Twitter Pro tier"""
+        return self.fetch_posts_analytics([post_id], integration_name)[post_id]
+
+    def fetch_posts_analytics(self, post_ids: list, integration_name: str = None) -> dict:
+        """Public metrics for up to 100 tweets in one /2/tweets?ids= lookup"""
         integration = self.get_integration_doc(integration_name)
         access_token = integration.get_password("access_token")
         
         try:
-            response = requests.get(f"https://api.twitter.com/2/tweets/{post_id}",
-                params={"tweet.fields": "public_metrics"},
+            response = http.get("https://api.twitter.com/2/tweets",
+                params={"ids": ",".join(post_ids), "tweet.fields": "public_metrics"},
                 headers={"Authorization": f"Bearer {access_token}"})
             
-            if response.status_code == 200:
-                metrics = response.json().get("data", {}).get("public_metrics", {})
-                return AnalyticsResult(success=True, metrics={
+            if response.status_code != 200:
+                return {i: AnalyticsResult(success=False, error_message="Failed to fetch") for i in post_ids}
+
+            results = {i: AnalyticsResult(success=False, error_message="Tweet not found") for i in post_ids}
+            for tweet in response.json().get("data", []):
+                metrics = tweet.get("public_metrics", {})
+                results[tweet["id"]] = AnalyticsResult(success=True, metrics={
                     "likes": metrics.get("like_count", 0),
                     "comments": metrics.get("reply_count", 0),
                     "shares": metrics.get("retweet_count", 0),
                     "impressions": metrics.get("impression_count", 0)
                 })
-            return AnalyticsResult(success=False, error_message="Failed to fetch")
+            return results
         except Exception as e:
-            return AnalyticsResult(success=False, error_message=str(e))
+            return {i: AnalyticsResult(success=False, error_message=str(e)) for i in post_ids}
 
     def get_daily_limit(self) -> int:
         tier = self.settings.twitter_tier or "Free"
@@ -7,9 +7,13 @@ Quota: 10,000 units/day default
 - Shorts: Use 9:16 aspect ratio + ≤60s + #Shorts tag
 """
 
+import os
+import re
+import time
 import frappe
-import requests
-from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult
+from frappe_social.frappe_social.providers.base import BaseProvider, PublishResult, AnalyticsResult, TokenRefreshResult
+from frappe_social.frappe_social.utils import http
+from frappe_social.frappe_social.utils.multipart import ChunkReader, FilePart
 
 
 class YouTubeProvider(BaseProvider):
@@ -17,6 +21,11 @@ class YouTubeProvider(BaseProvider):
     MAX_CONTENT_LENGTH = 5000  # Description limit
     SUPPORTS_VIDEO = True
     UPLOAD_QUOTA_COST = 1600
+    UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+    # Chunks must be a multiple of 256 KiB (except the last one)
+    CHUNK_GRANULARITY = 256 * 1024
+    MAX_CHUNK_FAILURES = 5
+    ANALYTICS_BATCH_SIZE = 50  # videos.list id limit
 
     def __init__(self, integration_name: str = None):
         super().__init__(integration_name)
@@ -61,8 +70,8 @@ class YouTubeProvider(BaseProvider):
             }
             
             # Initiate resumable upload
-            init_response = requests.post(
-                "https://www.googleapis.com/upload/youtube/v3/videos",
+            init_response = http.post(
+                self.UPLOAD_URL,
                 params={"uploadType": "resumable", "part": "snippet,status"},
                 headers={
                     "Authorization": f"Bearer {access_token}",
@@ -75,30 +84,124 @@ class YouTubeProvider(BaseProvider):
             if init_response.status_code != 200:
                 return PublishResult(success=False, error_message=f"Init failed: {init_response.text}")
             
-            upload_url = init_response.headers.get("Location")
-            
-            # Upload video file
-            with open(full_path, "rb") as video_file:
-                upload_response = requests.put(upload_url,
-                    headers={"Authorization": f"Bearer {access_token}"},
-                    data=video_file)
-            
-            if upload_response.status_code == 200:
-                video_data = upload_response.json()
-                video_id = video_data.get("id")
-                self._update_quota(self.UPLOAD_QUOTA_COST)
-                return PublishResult(success=True, post_id=video_id, post_url=f"https://www.youtube.com/watch?v={video_id}")
-            else:
-                return PublishResult(success=False, error_message=f"Upload failed: {upload_response.text}")
+            # The session URI is kept on the post, so an interrupted upload can continue
+            state = {
+                "step": "upload",
+                "upload_url": init_response.headers.get("Location"),
+                "path": full_path,
+                "file_size": os.path.getsize(full_path),
+                "offset": 0,
+                "failures": 0,
+            }
+            self.checkpoint(state)
+            return self._continue_upload(state, access_token)
                 
         except Exception as e:
             return PublishResult(success=False, error_message=str(e))
 
+    def resume_publish(self, state: dict) -> PublishResult:
+        """Ask YouTube how much of the video it has, then upload the rest"""
+        if state.get("step") != "upload":
+            return super().resume_publish(state)
+
+        access_token = self.integration.get_password("access_token") if self.integration else None
+        if not access_token:
+            return PublishResult(success=False, error_message="No integration configured")
+
+        try:
+            response = http.put(state["upload_url"],
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "Content-Range": f"bytes */{state['file_size']}",
+                    "Content-Length": "0",
+                },
+                timeout=60)
+            return self._handle_upload_response(response, state, access_token)
+        except Exception as e:
+            return self._chunk_failed(state, str(e))
+
+    def _continue_upload(self, state: dict, access_token: str) -> PublishResult:
+        """
+        Send Content-Range chunks from state["offset"].
+
+        Each acknowledged offset is checkpointed on the post. After UPLOAD_SLICE_SECONDS
+        the state is handed back so the rest is sent by a fresh job.
+        """
+        file_size = state["file_size"]
+        chunk_size = max(self.get_upload_chunk_size() // self.CHUNK_GRANULARITY, 1) * self.CHUNK_GRANULARITY
+        deadline = time.monotonic() + self.UPLOAD_SLICE_SECONDS
+
+        while True:
+            if time.monotonic() > deadline:
+                return PublishResult(success=False, pending_state=state, retry_after=0)
+
+            start = state["offset"]
+            length = min(chunk_size, file_size - start)
+
+            def on_sent(sent, _, start=start):
+                self.report_progress(start + sent, file_size)
+
+            try:
+                part = FilePart(state["path"], offset=start, length=length)
+                with ChunkReader(part, callback=on_sent) as body:
+                    response = http.put(state["upload_url"],
+                        headers={
+                            "Authorization": f"Bearer {access_token}",
+                            "Content-Length": str(length),
+                            "Content-Range": f"bytes {start}-{start + length - 1}/{file_size}",
+                        },
+                        data=body,
+                        timeout=300,
+                        retry=False)
+            except Exception as e:
+                return self._chunk_failed(state, str(e))
+
+            if response.status_code != 308:
+                return self._handle_upload_response(response, state, access_token)
+
+            state.update(offset=self._next_offset(response), failures=0)
+            self.checkpoint(state)
+
+    def _handle_upload_response(self, response, state: dict, access_token: str) -> PublishResult:
+        """Act on YouTube's answer to a chunk or to an upload status query"""
+        if response.status_code in (200, 201):
+            video_id = response.json().get("id")
+            self._update_quota(self.UPLOAD_QUOTA_COST)
+            return PublishResult(success=True, post_id=video_id, post_url=f"https://www.youtube.com/watch?v={video_id}")
+
+        if response.status_code == 308:
+            state.update(offset=self._next_offset(response), failures=0)
+            self.checkpoint(state)
+            return self._continue_upload(state, access_token)
+
+        if response.status_code in (404, 410):
+            return PublishResult(success=False, error_message=f"Upload session expired: {response.text}")
+
+        if response.status_code >= 500 or response.status_code == 429:
+            return self._chunk_failed(state, f"HTTP {response.status_code}")
+
+        return PublishResult(success=False, error_message=f"Upload failed: {response.text}")
+
+    def _chunk_failed(self, state: dict, error: str) -> PublishResult:
+        """Resume later (asking YouTube for its offset first), or give up after MAX_CHUNK_FAILURES"""
+        state["failures"] += 1
+        if state["failures"] >= self.MAX_CHUNK_FAILURES:
+            return PublishResult(success=False, error_message=f"Upload failed at byte {state['offset']}: {error}")
+
+        return PublishResult(success=False, error_message=f"Upload interrupted: {error}; resuming",
+            pending_state=state, retry_after=15 * 2 ** state["failures"])
+
+    def _next_offset(self, response) -> int:
+        """First byte YouTube still needs, from the Range header of a 308 response"""
+        match = re.match(r"bytes=\d+-(\d+)", response.headers.get("Range") or "")
+        return int(match.group(1)) + 1 if match else 0
+
     def _check_quota(self) -> bool:
-        settings = frappe.get_single("Social Settings")
-        return (settings.youtube_quota_used or 0) + self.UPLOAD_QUOTA_COST <= (settings.youtube_quota_limit or 10000)
+        used = self.settings.youtube_quota_used or 0
+        return used + self.UPLOAD_QUOTA_COST <= (self.settings.youtube_quota_limit or 10000)
 
     def _update_quota(self, cost: int):
+        # Writes need the current row; saving refreshes the cached settings everywhere
         settings = frappe.get_single("Social Settings")
         settings.youtube_quota_used = (settings.youtube_quota_used or 0) + cost
         settings.save(ignore_permissions=True)
@@ -108,7 +211,7 @@ class YouTubeProvider(BaseProvider):
         access_token = integration.get_password("access_token")
         
         try:
-            response = requests.get("https://www.googleapis.com/youtube/v3/channels",
+            response = http.get("https://www.googleapis.com/youtube/v3/channels",
                 params={"access_token": access_token, "part": "statistics", "mine": "true"})
             
             if response.status_code == 200:
@@ -125,25 +228,50 @@ class YouTubeProvider(BaseProvider):
             return AnalyticsResult(success=False, error_message=str(e))
 
     def fetch_post_analytics(self, post_id: str, integration_name: str = None) -> AnalyticsResult:
+        return self.fetch_posts_analytics([post_id], integration_name)[post_id]
+
+    def fetch_posts_analytics(self, post_ids: list, integration_name: str = None) -> dict:
+        """Statistics for up to 50 videos in one videos.list call (1 quota unit)"""
         integration = self.get_integration_doc(integration_name)
         access_token = integration.get_password("access_token")
         
         try:
-            response = requests.get("https://www.googleapis.com/youtube/v3/videos",
-                params={"access_token": access_token, "part": "statistics", "id": post_id})
+            response = http.get("https://www.googleapis.com/youtube/v3/videos",
+                params={"access_token": access_token, "part": "statistics", "id": ",".join(post_ids),
+                    "maxResults": len(post_ids)})
             
+            results = {i: AnalyticsResult(success=False, error_message="Video not found") for i in post_ids}
             if response.status_code == 200:
-                videos = response.json().get("items", [])
-                if videos:
-                    stats = videos[0].get("statistics", {})
-                    return AnalyticsResult(success=True, metrics={
+                for video in response.json().get("items", []):
+                    stats = video.get("statistics", {})
+                    results[video["id"]] = AnalyticsResult(success=True, metrics={
                         "video_views": int(stats.get("viewCount", 0)),
                         "likes": int(stats.get("likeCount", 0)),
                         "comments": int(stats.get("commentCount", 0))
                     })
-            return AnalyticsResult(success=False, error_message="Video not found")
+            return results
         except Exception as e:
-            return AnalyticsResult(success=False, error_message=str(e))
+            return {i: AnalyticsResult(success=False, error_message=str(e)) for i in post_ids}
 
     def get_daily_limit(self) -> int:
         return 6  # ~6 video uploads with 10,000 quota
+
+    def refresh_token(self, integration_name: str = None) -> TokenRefreshResult:
+        """Google access tokens last an hour; the refresh token does not rotate"""
+        integration = self.get_integration_doc(integration_name)
+        refresh_token = integration.get_password("refresh_token", raise_exception=False)
+        if not refresh_token:
+            return TokenRefreshResult(success=False, error_message="No refresh token")
+
+        response = http.post("https://oauth2.googleapis.com/token", data={
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": self.settings.youtube_client_id,
+            "client_secret": self.settings.get_password("youtube_client_secret"),
+        }, timeout=30)
+        if response.status_code != 200:
+            return TokenRefreshResult(success=False, error_message=f"Refresh failed: {response.text}")
+
+        data = response.json()
+        return TokenRefreshResult(success=True, access_token=data.get("access_token"),
+            refresh_token=data.get("refresh_token"), expires_in=data.get("expires_in"))
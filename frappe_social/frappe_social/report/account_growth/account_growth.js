@@ -15,6 +15,14 @@ frappe.query_reports["Account Growth"] = {
             "fieldtype": "Link",
             "options": "Social Integration"
         },
+        {
+            "fieldname": "period",
+            "label": __("Period"),
+            "fieldtype": "Select",
+            "options": "Day\nWeek\nMonth",
+            "default": "Day",
+            "reqd": 1
+        },
         {
             "fieldname": "from_date",
             "label": __("From Date"),
@@ -4,9 +4,11 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, add_days
+from frappe_social.frappe_social.services.analytics_rollup import period_start
 
 
 def execute(filters=None):
+    filters = frappe._dict(filters or {})
     columns = get_columns()
     data = get_data(filters)
     chart = get_chart(data, filters)
@@ -19,7 +21,7 @@ def get_columns():
     return [
         {
             "fieldname": "date",
-            "label": _("Date"),
+            "label": _("Period"),
             "fieldtype": "Date",
             "width": 120
         },
@@ -100,27 +102,29 @@ def get_columns():
 
 
 def get_data(filters):
+    # Read from the pre-aggregated rollups; one row per account and period
+    filters.setdefault("period", "Day")
     conditions = get_conditions(filters)
     
     data = frappe.db.sql("""
         SELECT 
-            sa.date,
-            sa.integration,
-            sa.platform,
-            sa.followers_count,
-            sa.followers_gained,
-            sa.followers_lost,
-            (COALESCE(sa.followers_gained, 0) - COALESCE(sa.followers_lost, 0)) as net_change,
-            sa.impressions,
-            sa.reach,
-            sa.engagement_rate,
-            sa.likes,
-            sa.comments,
-            sa.shares
-        FROM `tabSocial Analytics` sa
-        WHERE 1=1
+            r.period_start as date,
+            r.integration,
+            r.platform,
+            r.followers_count,
+            r.followers_gained,
+            r.followers_lost,
+            (COALESCE(r.followers_gained, 0) - COALESCE(r.followers_lost, 0)) as net_change,
+            r.impressions,
+            r.reach,
+            r.engagement_rate,
+            r.likes,
+            r.comments,
+            r.shares
+        FROM `tabSocial Analytics Rollup` r
+        WHERE r.period = %(period)s
         {conditions}
-        ORDER BY sa.date DESC, sa.integration
+        ORDER BY r.period_start DESC, r.integration
     """.format(conditions=conditions), filters, as_dict=1)
     
     return data
@@ -130,16 +134,18 @@ def get_conditions(filters):
     conditions = []
     
     if filters.get("platform"):
-        conditions.append("AND sa.platform = %(platform)s")
+        conditions.append("AND r.platform = %(platform)s")
     
     if filters.get("integration"):
-        conditions.append("AND sa.integration = %(integration)s")
+        conditions.append("AND r.integration = %(integration)s")
     
     if filters.get("from_date"):
-        conditions.append("AND sa.date >= %(from_date)s")
+        # Include the week or month the start date falls in
+        filters["from_date"] = period_start(filters["from_date"], filters["period"])
+        conditions.append("AND r.period_start >= %(from_date)s")
     
     if filters.get("to_date"):
-        conditions.append("AND sa.date <= %(to_date)s")
+        conditions.append("AND r.period_start <= %(to_date)s")
     
     return " ".join(conditions)
 
@@ -148,7 +154,7 @@ def get_chart(data, filters):
     if not data:
         return None
     
-    # Group by date for chart
+    # Group by period for chart
     date_data = {}
     for row in data:
         date_str = str(row.get("date"))
@@ -169,7 +175,7 @@ def get_chart(data, filters):
     
     return {
         "data": {
-            "labels": sorted_dates[-30:],  # Last 30 days
+            "labels": sorted_dates[-30:],  # Last 30 periods
             "datasets": [
                 {
                     "name": "Followers",
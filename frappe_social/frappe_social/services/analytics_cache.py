@@ -0,0 +1,36 @@
+"""
+Analytics Cache - Redis cache for aggregated analytics responses
+
+Entries are keyed by a version stamp. AnalyticsService.ingest() bumps the stamp
+when it writes account analytics, and Social Integration bumps it on save (an
+account connected, disconnected or renamed), so every cached response is
+invalidated at once without scanning keys. Superseded entries expire on their TTL.
+"""
+
+import frappe
+from typing import Any, Callable
+
+
+class AnalyticsCache:
+    KEY_PREFIX = "social_analytics_cache"
+    VERSION_KEY = "social_analytics_cache_version"
+    # Upper bound on staleness should an invalidation be missed
+    TTL = 60 * 60
+
+    @classmethod
+    def _version(cls) -> int:
+        return int(frappe.cache.get(frappe.cache.make_key(cls.VERSION_KEY)) or 0)
+
+    @classmethod
+    def get_or_build(cls, name: str, builder: Callable[[], Any]) -> Any:
+        """Cached value of `name` (e.g. "compare_platforms:30"), built by `builder` on a miss"""
+        key = f"{cls.KEY_PREFIX}:{cls._version()}:{name}"
+        value = frappe.cache.get_value(key)
+        if value is None:
+            value = builder()
+            frappe.cache.set_value(key, value, expires_in_sec=cls.TTL)
+        return value
+
+    @classmethod
+    def invalidate(cls) -> None:
+        frappe.cache.incr(frappe.cache.make_key(cls.VERSION_KEY))
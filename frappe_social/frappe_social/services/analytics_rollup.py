@@ -0,0 +1,146 @@
+"""
+Analytics Rollup - Social Analytics pre-aggregated per account and period
+
+Reports and dashboards read Social Analytics Rollup instead of summing daily
+Social Analytics rows, so their cost depends on the number of periods shown, not
+on how much history is stored. Each account has one row per day, week (starting
+Monday) and month:
+
+    followers_start / followers_count   first / last snapshot of the period
+    followers_gained, impressions, ...  sums over the period's days
+    engagement_rate                     (likes + comments + shares + saves) / reach,
+                                        or / impressions without reach
+
+refresh() recomputes the periods that cover a date range from Social Analytics
+with one INSERT ... SELECT ... ON DUPLICATE KEY UPDATE per period type, so it is
+idempotent: AnalyticsService.ingest() calls it for the days it wrote, and the
+backfill task calls it over the whole history.
+"""
+
+import frappe
+from frappe.utils import add_days, add_months, getdate, now_datetime
+from typing import Iterable, List
+
+PERIODS = ("Day", "Week", "Month")
+
+# Social Analytics columns summed into each period
+SUM_FIELDS = (
+    "followers_gained",
+    "followers_lost",
+    "impressions",
+    "reach",
+    "likes",
+    "comments",
+    "shares",
+    "saves",
+    "video_views",
+)
+
+# SQL expression for the first day of the period containing sa.date
+_PERIOD_START_SQL = {
+    "Day": "sa.date",
+    "Week": "DATE_SUB(sa.date, INTERVAL WEEKDAY(sa.date) DAY)",
+    "Month": "DATE_SUB(sa.date, INTERVAL DAYOFMONTH(sa.date) - 1 DAY)",
+}
+
+
+def period_start(date, period: str):
+    """First day of the `period` that contains `date`"""
+    date = getdate(date)
+    if period == "Week":
+        return add_days(date, -date.weekday())
+    if period == "Month":
+        return date.replace(day=1)
+    return date
+
+
+def period_end(date, period: str):
+    """Last day of the `period` that contains `date`"""
+    start = period_start(date, period)
+    if period == "Week":
+        return add_days(start, 6)
+    if period == "Month":
+        return add_days(add_months(start, 1), -1)
+    return start
+
+
+class AnalyticsRollup:
+    @staticmethod
+    def refresh(integrations: Iterable[str] = None, from_date=None, to_date=None) -> None:
+        """
+        Rebuild the rollups of every period overlapping `from_date`..`to_date`.
+        `integrations` limits it to those accounts; no bounds means all history.
+        """
+        integrations = list(integrations or [])
+        for period in PERIODS:
+            AnalyticsRollup._refresh_period(period, integrations, from_date, to_date)
+
+    @staticmethod
+    def _refresh_period(period: str, integrations: List[str], from_date, to_date) -> None:
+        # Widen the range to whole periods so partial weeks and months are never written
+        conditions = []
+        params = {"period": period, "now": now_datetime(), "user": frappe.session.user}
+        if integrations:
+            conditions.append("sa.integration IN %(integrations)s")
+            params["integrations"] = integrations
+        if from_date:
+            conditions.append("sa.date >= %(from_date)s")
+            params["from_date"] = period_start(from_date, period)
+        if to_date:
+            conditions.append("sa.date <= %(to_date)s")
+            params["to_date"] = period_end(to_date, period)
+
+        start = _PERIOD_START_SQL[period]
+        sums = ",\n                ".join(f"SUM(COALESCE(sa.{f}, 0))" for f in SUM_FIELDS)
+        engagement = "SUM({})".format(
+            " + ".join(f"COALESCE(sa.{f}, 0)" for f in ("likes", "comments", "shares", "saves"))
+        )
+        columns = ["followers_start", "followers_count", *SUM_FIELDS, "engagement_rate", "days", "platform"]
+
+        frappe.db.sql(
+            f"""
+            INSERT INTO `tabSocial Analytics Rollup` (
+                name, creation, modified, owner, modified_by, docstatus,
+                integration, period, period_start, {", ".join(columns)}
+            )
+            SELECT
+                CONCAT(sa.integration, '-', %(period)s, '-', {start}),
+                %(now)s, %(now)s, %(user)s, %(user)s, 0,
+                sa.integration,
+                %(period)s,
+                {start} AS bucket,
+                CAST(SUBSTRING_INDEX(
+                    GROUP_CONCAT(COALESCE(sa.followers_count, 0) ORDER BY sa.date ASC), ',', 1
+                ) AS SIGNED),
+                CAST(SUBSTRING_INDEX(
+                    GROUP_CONCAT(COALESCE(sa.followers_count, 0) ORDER BY sa.date DESC), ',', 1
+                ) AS SIGNED),
+                {sums},
+                CASE
+                    WHEN SUM(COALESCE(sa.reach, 0)) > 0
+                        THEN ROUND({engagement} * 100 / SUM(sa.reach), 2)
+                    WHEN SUM(COALESCE(sa.impressions, 0)) > 0
+                        THEN ROUND({engagement} * 100 / SUM(sa.impressions), 2)
+                    ELSE 0
+                END,
+                COUNT(*),
+                MAX(sa.platform)
+            FROM `tabSocial Analytics` sa
+            WHERE {" AND ".join(conditions) or "1=1"}
+            GROUP BY sa.integration, bucket
+            ON DUPLICATE KEY UPDATE
+                {", ".join(f"`{c}` = VALUES(`{c}`)" for c in columns)},
+                modified = VALUES(modified),
+                modified_by = VALUES(modified_by)
+            """,
+            params,
+        )
+
+    @staticmethod
+    def backfill(batch_size: int = 20) -> int:
+        """Build the rollups of every account from its full history, committing per batch"""
+        integrations = frappe.get_all("Social Analytics", distinct=True, pluck="integration")
+        for start in range(0, len(integrations), batch_size):
+            AnalyticsRollup.refresh(integrations[start : start + batch_size])
+            frappe.db.commit()
+        return len(integrations)
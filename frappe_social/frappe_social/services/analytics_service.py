@@ -1,12 +1,42 @@
+from functools import partial
+
 import frappe
-from datetime import datetime
-from frappe.utils import now_datetime, today, add_days, getdate
+from frappe.utils import now_datetime, today, add_days, add_to_date, get_datetime, getdate, flt
 from typing import Dict, Any, List
-from frappe_social.frappe_social.providers import get_provider
+from frappe_social.frappe_social.doctype.social_post_analytics.social_post_analytics import (
+    calculate_engagement_rate,
+)
+from frappe_social.frappe_social.providers.base import AnalyticsResult
+from frappe_social.frappe_social.services.analytics_cache import AnalyticsCache
+from frappe_social.frappe_social.services.analytics_rollup import AnalyticsRollup
+from frappe_social.frappe_social.services.metric_series import MetricSeries
+from frappe_social.frappe_social.services.post_leaderboard import PostLeaderboard
+from frappe_social.frappe_social.services.provider_cache import ProviderCache
+from frappe_social.frappe_social.services.token_service import TokenService
+from frappe_social.frappe_social.utils.db import bulk_upsert
+
+# Social Analytics columns filled from provider metrics
+ACCOUNT_METRIC_FIELDS = (
+    "followers_count",
+    "following_count",
+    "posts_count",
+    "impressions",
+    "reach",
+    "likes",
+    "comments",
+    "shares",
+    "saves",
+    "video_views",
+)
+# Social Post Analytics columns filled from provider metrics
+POST_METRIC_FIELDS = ("impressions", "reach", "likes", "comments", "shares", "saves", "clicks", "video_views")
 
 
 class AnalyticsService:
-    POST_ANALYTICS_LOOKBACK_DAYS = 7
+    # Posts older than this are no longer refreshed
+    POST_ANALYTICS_MAX_AGE_DAYS = 90
+    # Post analytics refresh tiers: (post age up to, in hours; minutes between fetches)
+    POST_REFRESH_TIERS = ((6, 15), (48, 60), (30 * 24, 24 * 60), (None, 7 * 24 * 60))
 
     @staticmethod
     def fetch_account_analytics(integration_name: str) -> Dict[str, Any]:
@@ -20,69 +50,53 @@ class AnalyticsService:
             return {"success": False, "error_message": "Not enabled or connected"}
 
         try:
-            provider = get_provider(integration.platform)(integration_name)
-            result = provider.fetch_account_analytics()
+            provider = ProviderCache.get(integration.platform, integration_name)
+            wait = provider.acquire_rate_limit({"insights": 2})
+            if wait:
+                # Leave it for the next scheduled run instead of burning a failed call
+                return {"success": False, "error_message": "Rate limited", "retry_after": wait}
+
+            result = TokenService.call_with_refresh(provider, provider.fetch_account_analytics)
             if not result.success:
                 return {"success": False, "error_message": result.error_message}
 
-            # Get or create analytics doc for today
-            existing = frappe.db.exists(
-                "Social Analytics", {"integration": integration_name, "date": today()}
-            )
-            if existing:
-                analytics = frappe.get_doc("Social Analytics", existing)
-                # Clear existing metrics to prevent duplicates
-                analytics.metrics = []
-            else:
-                analytics = frappe.new_doc("Social Analytics")
-            analytics.integration = integration_name
-            analytics.platform = integration.platform
-            analytics.date = today()
+            row = {"integration": integration_name, "platform": integration.platform, "date": today()}
 
             # Get previous day's data for change calculation
             previous = AnalyticsService._get_previous_analytics(integration_name)
 
             # Update standard metric fields
-            for field in [
-                "followers_count",
-                "following_count",
-                "posts_count",
-                "impressions",
-                "reach",
-                "likes",
-                "comments",
-                "shares",
-                "saves",
-                "video_views",
-            ]:
+            for field in ACCOUNT_METRIC_FIELDS:
                 if field in result.metrics:
-                    setattr(analytics, field, result.metrics[field])
+                    row[field] = result.metrics[field]
 
             # Store all metrics in detailed metrics table with change tracking
+            row["metrics"] = []
             for metric_name, value in result.metrics.items():
+                if not isinstance(value, (int, float)):
+                    continue
                 prev_value = previous.get(metric_name, 0) if previous else 0
                 change = value - prev_value
                 change_percent = (change / prev_value * 100) if prev_value != 0 else 0
-                analytics.append(
-                    "metrics",
+                row["metrics"].append(
                     {
                         "metric_name": metric_name,
                         "metric_value": value,
                         "previous_value": prev_value,
                         "change": change,
                         "change_percent": round(change_percent, 2),
-                    },
+                    }
                 )
 
-            analytics.save(ignore_permissions=True)
+            AnalyticsService.ingest(account_rows=[row])
 
             # Update integration followers
-            if result.metrics.get("followers_count"):
-                integration.followers_count = result.metrics["followers_count"]
-                integration.save(ignore_permissions=True)
+            followers = result.metrics.get("followers_count")
+            if followers:
+                frappe.db.set_value("Social Integration", integration_name, "followers_count", followers)
+                frappe.db.commit()
 
-            frappe.db.commit()
-            return {"success": True, "analytics_doc": analytics.name, "metrics": result.metrics}
+            return {"success": True, "analytics_doc": row["name"], "metrics": result.metrics}
         except Exception as e:
             frappe.log_error(
                 message=f"Integration: {integration_name}\nError: {str(e)}", title="Analytics Fetch Error"
@@ -93,32 +107,116 @@ class AnalyticsService:
     def _get_previous_analytics(integration_name: str) -> Dict[str, Any]:
         """Get previous day's analytics for change calculation"""
         yesterday = add_days(today(), -1)
-        existing = frappe.db.exists("Social Analytics", {"integration": integration_name, "date": yesterday})
-        if not existing:
+        previous = frappe.db.get_value(
+            "Social Analytics",
+            {"integration": integration_name, "date": yesterday},
+            ["name", *ACCOUNT_METRIC_FIELDS],
+            as_dict=True,
+        )
+        if not previous:
             return {}
-        prev_doc = frappe.get_doc("Social Analytics", existing)
         result = {}
         # Get values from child table
-        for row in prev_doc.metrics:
-            result[row.metric_name] = row.metric_value
+        for metric_name, metric_value in frappe.get_all(
+            "Social Analytics Metric",
+            filters={"parent": previous.name, "parenttype": "Social Analytics"},
+            fields=["metric_name", "metric_value"],
+            as_list=True,
+        ):
+            result[metric_name] = metric_value
         # Also get from main fields
-        for field in [
-            "followers_count",
-            "following_count",
-            "posts_count",
-            "impressions",
-            "reach",
-            "likes",
-            "comments",
-            "shares",
-            "saves",
-            "video_views",
-        ]:
-            val = getattr(prev_doc, field, None)
-            if val:
-                result[field] = val
+        for field in ACCOUNT_METRIC_FIELDS:
+            if previous.get(field):
+                result[field] = previous[field]
         return result
 
+    @staticmethod
+    def ingest(account_rows: List[Dict] = None, post_rows: List[Dict] = None) -> None:
+        """
+        Bulk-write a batch of analytics in one transaction, without loading documents.
+
+        account_rows: Social Analytics values (integration, platform, date, metric fields),
+            with their Social Analytics Metric rows as a "metrics" list. Upserted on
+            (integration, date); an account's metric rows are replaced by the new set, and
+            its day/week/month rollups covering those dates are recomputed and cached
+            analytics responses are invalidated.
+        post_rows: Social Post Analytics values, upserted on (social_post, platform, bucket).
+            `bucket` defaults to the date of `fetched_at`. Each row is also appended to
+            the post's metric series, and the post is re-ranked on the leaderboards.
+
+        Account rows get a "name" key with the Social Analytics name.
+        """
+        now = now_datetime()
+        try:
+            if account_rows:
+                for row in account_rows:
+                    # Same as the DocType's autoname: {integration}-{date}
+                    row["name"] = f"{row['integration']}-{getdate(row['date'])}"
+
+                bulk_upsert(
+                    "Social Analytics", [{k: v for k, v in r.items() if k != "metrics"} for r in account_rows]
+                )
+                # Rows that already existed keep their name; read back the real parents
+                parents = {
+                    (r.integration, str(r.date)): r.name
+                    for r in frappe.get_all(
+                        "Social Analytics",
+                        filters={
+                            "integration": ["in", list({row["integration"] for row in account_rows})],
+                            "date": ["in", list({str(getdate(row["date"])) for row in account_rows})],
+                        },
+                        fields=["name", "integration", "date"],
+                    )
+                }
+
+                metric_rows = []
+                for row in account_rows:
+                    row["name"] = parents.get((row["integration"], str(getdate(row["date"]))), row["name"])
+                    for idx, metric in enumerate(row.get("metrics") or [], start=1):
+                        metric_rows.append(
+                            {
+                                **metric,
+                                "parent": row["name"],
+                                "parenttype": "Social Analytics",
+                                "parentfield": "metrics",
+                                "idx": idx,
+                                "modified": now,
+                            }
+                        )
+                bulk_upsert("Social Analytics Metric", metric_rows)
+                # Metrics the platform stopped reporting are dropped, as a re-save would
+                frappe.db.delete(
+                    "Social Analytics Metric",
+                    {
+                        "parent": ["in", [row["name"] for row in account_rows]],
+                        "parenttype": "Social Analytics",
+                        "modified": ["<", now],
+                    },
+                )
+                dates = [getdate(row["date"]) for row in account_rows]
+                AnalyticsRollup.refresh(
+                    {row["integration"] for row in account_rows}, min(dates), max(dates)
+                )
+
+            if post_rows:
+                for row in post_rows:
+                    row.setdefault("bucket", getdate(row["fetched_at"]))
+                bulk_upsert("Social Post Analytics", post_rows)
+                MetricSeries.append(
+                    {row["social_post"]: row for row in post_rows},
+                    max(get_datetime(row["fetched_at"]) for row in post_rows),
+                )
+
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            raise
+
+        if account_rows:
+            AnalyticsCache.invalidate()
+        if post_rows:
+            PostLeaderboard.update(list({row["social_post"] for row in post_rows}))
+
     @staticmethod
     def fetch_post_analytics(post_name: str, platform: str = None) -> Dict[str, Any]:
         """Fetch and store analytics for a single post (no child table needed)"""
@@ -150,49 +248,21 @@ class AnalyticsService:
         integration_name = integrations[0]
 
         try:
-            provider = get_provider(platform)(integration_name)
-            result = provider.fetch_post_analytics(post.post_id)
+            provider = ProviderCache.get(platform, integration_name)
+            wait = provider.acquire_rate_limit({"insights": 2})
+            if wait:
+                return {"success": False, "error_message": "Rate limited", "retry_after": wait}
+
+            result = TokenService.call_with_refresh(provider, lambda: provider.fetch_post_analytics(post.post_id))
 
             if not result.success:
                 return {"success": False, "error_message": result.error_message or "API failed"}
 
-            # Prevent duplicate fetch today
-            today_start = datetime.combine(getdate(today()), datetime.min.time())
-
-            existing = frappe.db.exists(
-                "Social Post Analytics", {"social_post": post_name, "fetched_at": [">=", today_start]}
-            )
-
-            if existing:
-                analytics = frappe.get_doc("Social Post Analytics", existing)
-            else:
-                analytics = frappe.new_doc("Social Post Analytics")
-
-            analytics.social_post = post_name
-            analytics.platform = platform
-            analytics.integration = integration_name
-            analytics.post_id = post.post_id
-            analytics.fetched_at = now_datetime()
-
-            # Update metrics
-            metrics_map = {
-                "impressions": "impressions",
-                "reach": "reach",
-                "likes": "likes",
-                "comments": "comments",
-                "shares": "shares",
-                "saves": "saves",
-                "clicks": "clicks",
-                "video_views": "video_views",
-                "engagement_rate": "engagement_rate",
-            }
-
-            for src, dest in metrics_map.items():
-                if src in result.metrics:
-                    setattr(analytics, dest, result.metrics[src])
-
-            analytics.save(ignore_permissions=True)
-            frappe.db.commit()
+            results = {post.post_id: result}
+            AnalyticsService._store_post_analytics(integration_name, platform, [post], results)
+            result = results[post.post_id]
+            if not result.success:
+                return {"success": False, "error_message": result.error_message}
 
             return {"success": True, "metrics": result.metrics}
 
@@ -201,50 +271,268 @@ class AnalyticsService:
             return {"success": False, "error_message": str(e)}
 
     @staticmethod
-    def get_recent_posts_for_analytics() -> List[Dict[str, Any]]:
-        """Get recently published posts for scheduled analytics fetch (no child table)"""
-        cutoff = add_days(today(), -AnalyticsService.POST_ANALYTICS_LOOKBACK_DAYS)
+    def fetch_integration_post_analytics(integration_name: str, post_names: List[str]) -> Dict[str, Any]:
+        """
+        Fetch analytics for many posts of one integration.
+
+        Post IDs are sent ANALYTICS_BATCH_SIZE at a time to the platform's multi-ID
+        endpoint, and the results are written back in bulk.
+        """
+        try:
+            integration = frappe.get_doc("Social Integration", integration_name)
+        except frappe.DoesNotExistError:
+            return {"success": False, "error_message": "Integration not found"}
+
+        if not integration.enabled or integration.connection_status != "Connected":
+            return {"success": False, "error_message": "Not enabled or connected"}
 
         posts = frappe.get_all(
             "Social Post",
-            filters={
-                "status": "Published",
-                "published_time": [">=", cutoff],
-                "post_id": ["!=", ""],  # Has post_id
-            },
-            fields=["name", "platform"],
+            filters={"name": ["in", post_names], "status": "Published", "post_id": ["is", "set"]},
+            fields=[
+                "name",
+                "post_id",
+                "published_time",
+                "analytics_next_fetch",
+                "analytics_tier",
+                "analytics_last_total",
+            ],
+        )
+        if not posts:
+            return {"success": True, "fetched": 0}
+
+        try:
+            provider = ProviderCache.get(integration.platform, integration_name)
+            batch_size = max(provider.ANALYTICS_BATCH_SIZE, 1)
+            post_ids = list(dict.fromkeys(post.post_id for post in posts))
+
+            results = {}
+            for start in range(0, len(post_ids), batch_size):
+                if provider.acquire_rate_limit({"insights": 2}):
+                    # Out of budget; the remaining posts are picked up by the next run
+                    break
+                batch = post_ids[start : start + batch_size]
+                results.update(
+                    TokenService.call_with_refresh(provider, partial(provider.fetch_posts_analytics, batch))
+                )
+
+            fetched = AnalyticsService._store_post_analytics(
+                integration_name, integration.platform, posts, results
+            )
+            AnalyticsService._schedule_next_fetch(posts, results)
+            frappe.db.commit()
+            return {"success": True, "fetched": fetched, "requested": len(posts)}
+        except Exception as e:
+            frappe.log_error(
+                message=f"Integration: {integration_name}\nError: {str(e)}",
+                title="Post Analytics Fetch Error",
+            )
+            return {"success": False, "error_message": str(e)}
+
+    @staticmethod
+    def _store_post_analytics(integration_name: str, platform: str, posts: List, results: Dict) -> int:
+        """
+        Write today's Social Post Analytics rows for `posts` from {post_id: AnalyticsResult}
+        through ingest(). Returns the number of posts stored.
+        """
+        AnalyticsService._fill_missing_metrics(posts, results)
+
+        now = now_datetime()
+        rows = []
+        for post in posts:
+            result = results.get(post.post_id)
+            if not result or not result.success:
+                continue
+
+            values = {
+                "social_post": post.name,
+                "platform": platform,
+                "integration": integration_name,
+                "post_id": post.post_id,
+            }
+            values.update({f: result.metrics[f] for f in POST_METRIC_FIELDS if f in result.metrics})
+            values["engagement_rate"] = calculate_engagement_rate(values)
+            values["fetched_at"] = now
+            rows.append(values)
+
+        AnalyticsService.ingest(post_rows=rows)
+        return len(rows)
+
+    @staticmethod
+    def _fill_missing_metrics(posts: List, results: Dict) -> None:
+        """
+        A provider returns None for a metric it could not fetch (e.g. Facebook insights).
+        Such a metric keeps the post's last stored value; a post with nothing stored yet
+        counts as not fetched, so no made-up 0 reaches the series, rollups or leaderboards.
+        """
+        missing = {}
+        for post in posts:
+            result = results.get(post.post_id)
+            if result and result.success and any(v is None for v in result.metrics.values()):
+                missing[post.name] = post.post_id
+        if not missing:
+            return
+
+        latest = MetricSeries.get_latest_many(list(missing))
+        for post_name, post_id in missing.items():
+            result = results[post_id]
+            unknown = [f for f, v in result.metrics.items() if v is None]
+            previous = latest.get(post_name) or {}
+            if any(previous.get(f) is None for f in unknown):
+                results[post_id] = AnalyticsResult(
+                    success=False, error_message=f"Metrics not available yet: {', '.join(unknown)}"
+                )
+                continue
+            result.metrics.update({f: previous[f] for f in unknown})
+
+    @staticmethod
+    def _schedule_next_fetch(posts: List, results: Dict) -> None:
+        """
+        Set when each fetched post is next refreshed.
+
+        The tier follows the post's age (POST_REFRESH_TIERS). A post whose metrics moved
+        less than the Social Settings change threshold since the last fetch drops one tier
+        below that, and further on each quiet fetch, until it starts moving again.
+        Posts whose fetch failed wait one interval of their current tier.
+        """
+        threshold = flt(frappe.db.get_single_value("Social Settings", "analytics_change_threshold"))
+        now = now_datetime()
+        last_tier = len(AnalyticsService.POST_REFRESH_TIERS) - 1
+
+        for post in posts:
+            if post.post_id not in results:
+                # Not attempted (out of rate limit budget); stays due
+                continue
+
+            age_hours = (now - (post.published_time or now)).total_seconds() / 3600
+            tier = next(
+                i for i, (max_age, _) in enumerate(AnalyticsService.POST_REFRESH_TIERS)
+                if max_age is None or age_hours < max_age
+            )
+            values = {}
+
+            result = results[post.post_id]
+            if not result.success:
+                tier = max(tier, post.analytics_tier or 0)
+            else:
+                total = sum(flt(result.metrics.get(f)) for f in POST_METRIC_FIELDS)
+                previous = flt(post.analytics_last_total)
+                change = abs(total - previous) / max(previous, 1) * 100
+                # The first fetch has nothing to compare against
+                if post.analytics_next_fetch and change < threshold:
+                    tier = min(max(tier, post.analytics_tier or 0) + 1, last_tier)
+                values["analytics_last_total"] = total
+
+            interval = AnalyticsService.POST_REFRESH_TIERS[tier][1]
+            values.update(analytics_tier=tier, analytics_next_fetch=add_to_date(now, minutes=interval))
+            frappe.db.set_value("Social Post", post.name, values, update_modified=False)
+
+    @staticmethod
+    def get_due_posts_for_analytics() -> List[Dict[str, Any]]:
+        """Get published posts whose next analytics refresh is due"""
+        cutoff = add_days(today(), -AnalyticsService.POST_ANALYTICS_MAX_AGE_DAYS)
+
+        posts = frappe.db.sql(
+            """
+            SELECT name, platform, account
+            FROM `tabSocial Post`
+            WHERE status = 'Published'
+                AND published_time >= %(cutoff)s
+                AND IFNULL(post_id, '') != ''
+                AND (analytics_next_fetch IS NULL OR analytics_next_fetch <= %(now)s)
+            ORDER BY analytics_next_fetch
+            """,
+            {"cutoff": cutoff, "now": now_datetime()},
+            as_dict=True,
         )
 
         result = []
         for post in posts:
-            result.append({"post_name": post.name, "platform": post.platform})
+            result.append({"post_name": post.name, "platform": post.platform, "account": post.account})
         return result
 
     @staticmethod
     def get_analytics_summary(integration_name: str, days: int = 30) -> Dict[str, Any]:
-        """Get analytics summary"""
+        """Get analytics summary, aggregated from the account's daily rollups"""
         start_date = add_days(today(), -days)
-        data = frappe.get_all(
-            "Social Analytics",
-            filters={"integration": integration_name, "date": [">=", start_date]},
-            fields=["*"],
-            order_by="date asc",
-        )
-        if not data:
+        data = frappe.db.sql(
+            """
+            SELECT
+                COUNT(*) AS data_points,
+                SUM(impressions) AS impressions,
+                SUM(likes) AS likes,
+                SUM(comments) AS comments,
+                SUM(shares) AS shares,
+                CAST(SUBSTRING_INDEX(
+                    GROUP_CONCAT(followers_count ORDER BY period_start ASC), ',', 1
+                ) AS SIGNED) AS followers_start,
+                CAST(SUBSTRING_INDEX(
+                    GROUP_CONCAT(followers_count ORDER BY period_start DESC), ',', 1
+                ) AS SIGNED) AS followers_end
+            FROM `tabSocial Analytics Rollup`
+            WHERE integration = %(integration)s
+                AND period = 'Day'
+                AND period_start >= %(start_date)s
+            """,
+            {"integration": integration_name, "start_date": start_date},
+            as_dict=True,
+        )[0]
+        if not data.data_points:
             return {"has_data": False}
         return {
             "has_data": True,
             "period_days": days,
-            "data_points": len(data),
+            "data_points": data.data_points,
             "totals": {
-                "impressions": sum(d.get("impressions") or 0 for d in data),
-                "likes": sum(d.get("likes") or 0 for d in data),
-                "comments": sum(d.get("comments") or 0 for d in data),
-                "shares": sum(d.get("shares") or 0 for d in data),
+                "impressions": int(data.impressions or 0),
+                "likes": int(data.likes or 0),
+                "comments": int(data.comments or 0),
+                "shares": int(data.shares or 0),
             },
             "followers": {
-                "start": data[0].get("followers_count") or 0,
-                "end": data[-1].get("followers_count") or 0,
-                "change": (data[-1].get("followers_count") or 0) - (data[0].get("followers_count") or 0),
+                "start": data.followers_start or 0,
+                "end": data.followers_end or 0,
+                "change": (data.followers_end or 0) - (data.followers_start or 0),
             },
         }
+
+    @staticmethod
+    def compare_platforms(days: int = 30) -> Dict[str, Dict[str, Any]]:
+        """
+        Followers, impressions and engagement of every connected integration over
+        the last `days`, keyed by integration. One aggregate over the daily rollups.
+        """
+        rows = frappe.db.sql(
+            """
+            SELECT
+                si.name,
+                si.platform,
+                si.profile_name,
+                CAST(SUBSTRING_INDEX(
+                    GROUP_CONCAT(r.followers_count ORDER BY r.period_start DESC), ',', 1
+                ) AS SIGNED) AS followers,
+                SUM(r.impressions) AS total_impressions,
+                SUM(r.likes + r.comments + r.shares) AS total_engagement
+            FROM `tabSocial Integration` si
+            JOIN `tabSocial Analytics Rollup` r
+                ON r.integration = si.name
+                AND r.period = 'Day'
+                AND r.period_start >= %(start_date)s
+            WHERE si.enabled = 1
+                AND si.connection_status = 'Connected'
+            GROUP BY si.name, si.platform, si.profile_name
+            """,
+            {"start_date": add_days(today(), -days)},
+            as_dict=True,
+        )
+
+        return {
+            row.name: {
+                "platform": row.platform,
+                "profile_name": row.profile_name,
+                "followers": row.followers or 0,
+                "total_impressions": int(row.total_impressions or 0),
+                "total_engagement": int(row.total_engagement or 0),
+            }
+            for row in rows
+        }
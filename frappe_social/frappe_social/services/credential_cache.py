@@ -0,0 +1,59 @@
+"""
+Credential Cache - decrypted integration tokens, in process memory only
+
+Reading a password field is an __Auth query plus a Fernet decryption, and
+publishes and analytics sweeps read the same tokens over and over. Decrypted
+values are kept for TTL seconds in a bounded LRU, keyed by (site, integration,
+field, modified): a saved integration has a new `modified`, so a changed token
+is never served from an old entry. Entries of an integration are also dropped
+as soon as it is saved (token refresh, disconnect), here, and in other processes
+when ProviderCache next sees its version stamp move.
+
+Nothing is written to Redis or disk.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import frappe
+from typing import Callable, Optional
+
+
+class CredentialCache:
+    TTL = 300
+    MAX_ENTRIES = 512
+
+    # (site, integration, field, modified) -> (expires_at, value)
+    _entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, integration: str, field: str, modified, load: Callable[[], Optional[str]]) -> Optional[str]:
+        """Decrypted `field` of `integration` as of `modified`; `load` decrypts it on a miss"""
+        key = (frappe.local.site, integration, field, str(modified))
+        now = time.monotonic()
+
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry and entry[0] > now:
+                cls._entries.move_to_end(key)
+                return entry[1]
+
+        value = load()
+        # Missing credentials are not cached, so a newly connected token is seen at once
+        if value:
+            with cls._lock:
+                cls._entries[key] = (now + cls.TTL, value)
+                cls._entries.move_to_end(key)
+                while len(cls._entries) > cls.MAX_ENTRIES:
+                    cls._entries.popitem(last=False)
+        return value
+
+    @classmethod
+    def evict(cls, integration: str) -> None:
+        """Drop every cached credential of an integration"""
+        site = frappe.local.site
+        with cls._lock:
+            for key in [k for k in cls._entries if k[0] == site and k[1] == integration]:
+                del cls._entries[key]
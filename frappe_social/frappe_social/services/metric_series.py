@@ -0,0 +1,187 @@
+"""
+Metric Series - append-only time series of post metrics
+
+Every analytics fetch appends one Social Post Metric Point per post; nothing is
+overwritten, so intra-day curves are kept. Social Post.latest_metric_point
+points at the newest point, making current values a primary-key read.
+
+Metrics are running totals, so downsampling keeps the last point of each
+bucket: raw points older than RAW_RETENTION_DAYS become one point per hour,
+and hourly points older than HOURLY_RETENTION_DAYS one point per day.
+"""
+
+import frappe
+from frappe.utils import add_days, now_datetime
+from typing import Any, Dict, List
+
+DOCTYPE = "Social Post Metric Point"
+
+# Metric vector stored with every point
+METRIC_FIELDS = (
+    "impressions",
+    "reach",
+    "likes",
+    "comments",
+    "shares",
+    "saves",
+    "clicks",
+    "video_views",
+    "engagement_rate",
+)
+
+
+class MetricSeries:
+    RAW_RETENTION_DAYS = 7
+    HOURLY_RETENTION_DAYS = 90
+    DELETE_BATCH_SIZE = 1000
+
+    @staticmethod
+    def append(points: Dict[str, Dict[str, Any]], ts=None) -> None:
+        """
+        Append one point per post from {post_name: metrics} with a single insert,
+        then point each post's latest_metric_point at it
+        """
+        if not points:
+            return
+
+        ts = ts or now_datetime()
+        user = frappe.session.user
+        frappe.db.bulk_insert(
+            DOCTYPE,
+            fields=[
+                "name",
+                "creation",
+                "modified",
+                "owner",
+                "modified_by",
+                "docstatus",
+                "social_post",
+                "ts",
+                "resolution",
+                *METRIC_FIELDS,
+            ],
+            values=[
+                (
+                    frappe.generate_hash(length=10),
+                    ts,
+                    ts,
+                    user,
+                    user,
+                    0,
+                    post_name,
+                    ts,
+                    "Raw",
+                    *(metrics.get(f) or 0 for f in METRIC_FIELDS),
+                )
+                for post_name, metrics in points.items()
+            ],
+        )
+
+        frappe.db.sql(
+            """
+            UPDATE `tabSocial Post` sp
+            JOIN `tabSocial Post Metric Point` mp ON mp.social_post = sp.name AND mp.ts = %(ts)s
+            SET sp.latest_metric_point = mp.name
+            WHERE sp.name IN %(posts)s
+            """,
+            {"ts": ts, "posts": list(points)},
+        )
+
+    @staticmethod
+    def get_latest(post_name: str) -> Dict[str, Any]:
+        """Current metrics of a post, read through its latest_metric_point"""
+        point = frappe.db.get_value("Social Post", post_name, "latest_metric_point")
+        if not point:
+            return {}
+        return frappe.db.get_value(DOCTYPE, point, ["ts", *METRIC_FIELDS], as_dict=True) or {}
+
+    @staticmethod
+    def get_latest_many(post_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Current metrics of many posts, {post_name: metrics}; posts without points are left out"""
+        points = frappe.get_all(
+            "Social Post",
+            filters={"name": ["in", post_names], "latest_metric_point": ["is", "set"]},
+            pluck="latest_metric_point",
+        )
+        if not points:
+            return {}
+        rows = frappe.get_all(
+            DOCTYPE, filters={"name": ["in", points]}, fields=["social_post", "ts", *METRIC_FIELDS]
+        )
+        return {row.social_post: row for row in rows}
+
+    @staticmethod
+    def get_series(
+        post_names: List[str], start=None, end=None, metrics: List[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Metric points of each post between `start` and `end`, oldest first.
+        Returns {post_name: [{"ts", "resolution", <metric>...}]}; `metrics` limits the columns
+        """
+        fields = [f for f in (metrics or METRIC_FIELDS) if f in METRIC_FIELDS]
+        filters = [["social_post", "in", post_names]]
+        if start:
+            filters.append(["ts", ">=", start])
+        if end:
+            filters.append(["ts", "<=", end])
+
+        series = {post_name: [] for post_name in post_names}
+        for row in frappe.get_all(
+            DOCTYPE,
+            filters=filters,
+            fields=["social_post", "ts", "resolution", *fields],
+            order_by="ts asc",
+        ):
+            series[row.pop("social_post")].append(row)
+        return series
+
+    @staticmethod
+    def downsample() -> None:
+        """Apply the retention rules: raw points to hourly, then hourly points to daily"""
+        now = now_datetime()
+        MetricSeries._downsample(
+            "Raw", "Hourly", "%Y-%m-%d %H", add_days(now, -MetricSeries.RAW_RETENTION_DAYS)
+        )
+        MetricSeries._downsample(
+            "Hourly", "Daily", "%Y-%m-%d", add_days(now, -MetricSeries.HOURLY_RETENTION_DAYS)
+        )
+
+    @staticmethod
+    def _downsample(source: str, target: str, bucket_format: str, cutoff) -> None:
+        """Keep only the last `source` point per post and bucket before `cutoff`, relabelled `target`"""
+        params = {"source": source, "bucket": bucket_format, "cutoff": cutoff}
+        superseded = frappe.db.sql(
+            """
+            SELECT mp.name
+            FROM `tabSocial Post Metric Point` mp
+            JOIN (
+                SELECT social_post, DATE_FORMAT(ts, %(bucket)s) AS bucket, MAX(ts) AS last_ts
+                FROM `tabSocial Post Metric Point`
+                WHERE resolution = %(source)s AND ts < %(cutoff)s
+                GROUP BY social_post, bucket
+            ) last_point
+                ON last_point.social_post = mp.social_post
+                AND last_point.bucket = DATE_FORMAT(mp.ts, %(bucket)s)
+            WHERE mp.resolution = %(source)s
+                AND mp.ts < %(cutoff)s
+                AND mp.ts < last_point.last_ts
+            """,
+            params,
+            pluck=True,
+        )
+
+        for start in range(0, len(superseded), MetricSeries.DELETE_BATCH_SIZE):
+            frappe.db.delete(
+                DOCTYPE, {"name": ["in", superseded[start : start + MetricSeries.DELETE_BATCH_SIZE]]}
+            )
+            frappe.db.commit()
+
+        frappe.db.sql(
+            """
+            UPDATE `tabSocial Post Metric Point`
+            SET resolution = %(target)s
+            WHERE resolution = %(source)s AND ts < %(cutoff)s
+            """,
+            {**params, "target": target},
+        )
+        frappe.db.commit()
@@ -0,0 +1,164 @@
+"""
+Post Leaderboard - Redis sorted sets of published posts ranked by engagement
+
+Each post is scored by the engagement rate of its latest metrics. There is one
+set per window (posts published in the last 7, 30 or 90 days), platform and
+organization, plus "all" sets across platforms and organizations, so any
+combination of filters is a single ZREVRANGE:
+
+    social_post_leaderboard:30:Instagram:all
+
+AnalyticsService.ingest() updates the sets as post analytics arrive. rebuild()
+recomputes them from the database (hourly and after migrate), which is also
+what drops posts that have aged out of a window or were deleted.
+"""
+
+import frappe
+from frappe.utils import add_days, get_datetime, now_datetime
+from typing import Any, Dict, Iterable, List
+
+
+class PostLeaderboard:
+    KEY_PREFIX = "social_post_leaderboard"
+    # Registry of every leaderboard key, so rebuild() can drop the ones left empty
+    KEYS_KEY = "social_post_leaderboard_keys"
+    BUILT_KEY = "social_post_leaderboard_built"
+    WINDOWS = (7, 30, 90)
+
+    @classmethod
+    def _key(cls, window: int, platform: str = None, organization: str = None) -> str:
+        return frappe.cache.make_key(
+            f"{cls.KEY_PREFIX}:{window}:{platform or 'all'}:{organization or 'all'}"
+        )
+
+    @classmethod
+    def window_for(cls, days: int) -> int:
+        """Smallest window covering `days`, capped at the largest"""
+        return next((w for w in cls.WINDOWS if w >= days), cls.WINDOWS[-1])
+
+    @classmethod
+    def _memberships(cls, post, now) -> Iterable[str]:
+        """Every leaderboard key `post` (name, platform, organization, published_time) belongs to"""
+        age_days = (now - get_datetime(post.published_time)).total_seconds() / 86400
+        for window in cls.WINDOWS:
+            if age_days > window:
+                continue
+            # None is the "all" set of that dimension
+            for platform in {None, post.platform}:
+                for organization in {None, post.organization}:
+                    yield cls._key(window, platform, organization)
+
+    @classmethod
+    def _published_posts(cls, post_names: List[str] = None) -> List[frappe._dict]:
+        conditions = ["sp.status = 'Published'", "sp.published_time >= %(cutoff)s"]
+        params = {"cutoff": add_days(now_datetime(), -cls.WINDOWS[-1])}
+        if post_names is not None:
+            conditions.append("sp.name IN %(posts)s")
+            params["posts"] = post_names
+
+        return frappe.db.sql(
+            f"""
+            SELECT sp.name, sp.platform, sp.organization, sp.published_time, mp.engagement_rate
+            FROM `tabSocial Post` sp
+            JOIN `tabSocial Post Metric Point` mp ON mp.name = sp.latest_metric_point
+            WHERE {" AND ".join(conditions)}
+            """,
+            params,
+            as_dict=True,
+        )
+
+    @classmethod
+    def update(cls, post_names: List[str]) -> None:
+        """Re-score `post_names` from their latest metric points"""
+        if not post_names:
+            return
+
+        now = now_datetime()
+        pipe = frappe.cache.pipeline()
+        keys = set()
+        for post in cls._published_posts(post_names):
+            for key in cls._memberships(post, now):
+                pipe.zadd(key, {post.name: post.engagement_rate or 0})
+                keys.add(key)
+        if keys:
+            pipe.sadd(frappe.cache.make_key(cls.KEYS_KEY), *keys)
+        pipe.execute()
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Recompute every leaderboard from the database. Returns the number of posts ranked"""
+        now = now_datetime()
+        posts = cls._published_posts()
+
+        boards: Dict[str, Dict[str, float]] = {}
+        for post in posts:
+            for key in cls._memberships(post, now):
+                boards.setdefault(key, {})[post.name] = post.engagement_rate or 0
+
+        registry = frappe.cache.make_key(cls.KEYS_KEY)
+        stale = {k.decode() if isinstance(k, bytes) else k for k in frappe.cache.smembers(registry)}
+        suffix = frappe.generate_hash(length=8)
+
+        # Build under staging names, then swap each set in atomically
+        pipe = frappe.cache.pipeline()
+        for key, members in boards.items():
+            pipe.zadd(f"{key}:rebuild:{suffix}", members)
+            pipe.rename(f"{key}:rebuild:{suffix}", key)
+        for key in stale - set(boards):
+            pipe.delete(key)
+        pipe.delete(registry)
+        if boards:
+            pipe.sadd(registry, *boards)
+        pipe.set(frappe.cache.make_key(cls.BUILT_KEY), 1)
+        pipe.execute()
+
+        return len(posts)
+
+    @classmethod
+    def ensure_built(cls) -> None:
+        """Rebuild if the leaderboards were never built or Redis lost them"""
+        if not frappe.cache.exists(frappe.cache.make_key(cls.BUILT_KEY)):
+            cls.rebuild()
+
+    @classmethod
+    def get_top(
+        cls, days: int = 30, limit: int = 10, start: int = 0, platform: str = None, organization: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Posts `start` to `start + limit` of the leaderboard for the window covering
+        `days`, best first, with their latest metrics
+        """
+        cls.ensure_built()
+        key = cls._key(cls.window_for(days), platform, organization)
+        ranked = [
+            m.decode() if isinstance(m, bytes) else m
+            for m in frappe.cache.zrevrange(key, start, start + limit - 1)
+        ]
+        if not ranked:
+            return []
+
+        posts = {
+            post.name: post
+            for post in frappe.db.sql(
+                """
+                SELECT
+                    sp.name,
+                    sp.content,
+                    sp.published_time,
+                    sp.platform,
+                    mp.impressions,
+                    mp.reach,
+                    mp.likes,
+                    mp.comments,
+                    mp.shares,
+                    mp.engagement_rate
+                FROM `tabSocial Post` sp
+                JOIN `tabSocial Post Metric Point` mp ON mp.name = sp.latest_metric_point
+                WHERE sp.name IN %(posts)s AND sp.status = 'Published'
+                """,
+                {"posts": ranked},
+                as_dict=True,
+            )
+        }
+        # Posts deleted since the last rebuild are skipped
+        return [posts[name] for name in ranked if name in posts]
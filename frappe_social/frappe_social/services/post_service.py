@@ -3,11 +3,17 @@ Post Service - Handles publishing workflow
 """
 
 import re
+import json
+import math
+import time
 import frappe
-from typing import Dict, Any
-from frappe_social.frappe_social.providers import get_provider
+from typing import Dict, Any, List, Tuple
 from frappe_social.frappe_social.providers.base import PublishResult
-from frappe.utils import now_datetime
+from frappe_social.frappe_social.services.provider_cache import ProviderCache
+from frappe_social.frappe_social.services.publish_retry import PublishRetry
+from frappe_social.frappe_social.services.token_service import TokenService
+from frappe.utils import now_datetime, add_to_date, get_datetime, cint
+from frappe_social.frappe_social.utils import http
 
 
 def strip_html(html_content: str) -> str:
@@ -35,10 +41,340 @@ def strip_html(html_content: str) -> str:
 
 
 class PostService:
+    # Automatic retries when Social Settings has no default_retry_count
     MAX_RETRIES = 3
+    CLAIM_BATCH_SIZE = 50
+    MAX_CLAIM_BATCHES = 20
+    CLAIM_TIMEOUT_MINUTES = 10
+    DISPATCHER_LOCK = "social_post_dispatcher"
+    # A loop hands over while its own job still runs, so successive loops alternate job ids
+    DISPATCHER_JOB_IDS = ("social_post_dispatcher:a", "social_post_dispatcher:b")
+    DISPATCHER_LIFETIME_SECONDS = 300
+    DISPATCHER_MAX_IDLE_SECONDS = 30
+    PROGRESS_INTERVAL_SECONDS = 2
 
     @staticmethod
-    def publish_post(post_name: str) -> Dict[str, Any]:
+    def start_dispatcher(handover_from: str = None) -> None:
+        """
+        Make sure a precise dispatcher loop is running or queued (called by the minute
+        sweep, and by a finishing loop with its own job id as `handover_from`)
+        """
+        from frappe.utils.background_jobs import is_job_enqueued
+
+        if frappe.cache.exists(frappe.cache.make_key(PostService.DISPATCHER_LOCK)):
+            return
+
+        # While the long queue is backlogged, one queued loop is enough
+        job_ids = [job_id for job_id in PostService.DISPATCHER_JOB_IDS if job_id != handover_from]
+        if any(is_job_enqueued(job_id) for job_id in job_ids):
+            return
+
+        frappe.enqueue(
+            PostService.run_dispatcher,
+            queue="long",
+            timeout=PostService.DISPATCHER_LIFETIME_SECONDS + 120,
+            job_name="social_post_dispatcher",
+            job_id=job_ids[0],
+            deduplicate=True,
+            dispatcher_job_id=job_ids[0],
+        )
+
+    @staticmethod
+    def run_dispatcher(dispatcher_job_id: str = None) -> None:
+        """
+        Dispatch scheduled posts at their exact scheduled_time.
+
+        Sleeps until the earliest entry in the schedule index is due, waking early
+        when a post is scheduled sooner. Only one loop runs per site (Redis lock);
+        at the end of its lifetime it hands over to a fresh job. The minute sweep
+        restarts the loop if the chain ever breaks.
+        """
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        lock = frappe.cache.lock(
+            frappe.cache.make_key(PostService.DISPATCHER_LOCK),
+            timeout=PostService.DISPATCHER_LIFETIME_SECONDS + 60,
+            blocking_timeout=5,
+        )
+        if not lock.acquire():
+            return
+
+        deadline = time.monotonic() + PostService.DISPATCHER_LIFETIME_SECONDS
+        try:
+            while time.monotonic() < deadline:
+                PostService.dispatch_due_posts()
+
+                wait = PostService.DISPATCHER_MAX_IDLE_SECONDS
+                next_due = ScheduleIndex.next_due()
+                if next_due is not None:
+                    wait = min(wait, next_due - now_datetime().timestamp())
+                wait = min(wait, deadline - time.monotonic())
+
+                if wait > 0:
+                    ScheduleIndex.wait_for_change(wait)
+        finally:
+            lock.release()
+
+        PostService.start_dispatcher(handover_from=dispatcher_job_id)
+
+    @staticmethod
+    def dispatch_due_posts() -> int:
+        """Take due posts from the schedule index, claim them and enqueue their publish jobs"""
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        ScheduleIndex.ensure_built()
+        dispatched = 0
+
+        for _ in range(PostService.MAX_CLAIM_BATCHES):
+            due = ScheduleIndex.due(limit=PostService.CLAIM_BATCH_SIZE)
+            if not due:
+                break
+
+            scheduled, pending = ScheduleIndex.split(due)
+            jobs = [(PostService.publish_post, "publish", *PostService.claim_due_posts(scheduled))]
+            jobs.append((PostService.resume_publish, "resume", *PostService.claim_continuations(pending)))
+
+            for method, prefix, claim_token, posts in jobs:
+                for name in posts:
+                    try:
+                        frappe.enqueue(
+                            method,
+                            post_name=name,
+                            claim_token=claim_token,
+                            queue="short",
+                            job_name=f"{prefix}_{name}",
+                            # Per claim: the previous step of the same post may still be finishing
+                            job_id=f"{prefix}_post:{name}:{claim_token}",
+                            deduplicate=True,
+                        )
+                        dispatched += 1
+                    except Exception as e:
+                        # The claim is released by release_stale_claims on a later run
+                        frappe.log_error(f"Failed to enqueue {name}: {e}", "Social Post Scheduler")
+
+            # Nothing claimable (rows locked by another writer): leave the rest for the next pass
+            if len(due) < PostService.CLAIM_BATCH_SIZE or not any(posts for *_, posts in jobs):
+                break
+
+        return dispatched
+
+    @staticmethod
+    def claim_due_posts(names: List[str]) -> Tuple[str, List[str]]:
+        """
+        Claim the given due posts for this dispatcher.
+
+        Rows are locked with SKIP LOCKED so concurrent schedulers pick disjoint
+        sets, then moved to Publishing and stamped with a claim token in one
+        conditional UPDATE. Only the returned names may be dispatched.
+        """
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        if not names:
+            return None, []
+
+        now = now_datetime()
+        claimed = frappe.db.sql_list(
+            """
+            SELECT name
+            FROM `tabSocial Post`
+            WHERE name IN %s
+              AND status = 'Scheduled'
+              AND scheduled_time <= %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (tuple(names), now),
+        )
+
+        claim_token = None
+        if claimed:
+            claim_token = frappe.generate_hash(length=16)
+            frappe.db.sql(
+                """
+                UPDATE `tabSocial Post`
+                SET status = 'Publishing', claim_token = %s, claimed_at = %s
+                WHERE name IN %s
+                  AND status = 'Scheduled'
+                """,
+                (claim_token, now, tuple(claimed)),
+            )
+        frappe.db.commit()
+
+        # Only now, with the claim committed, do the posts leave the index. Posts not
+        # claimed (locked by another writer, or rescheduled in the meantime) stay in
+        # it with their current time if they are still Scheduled
+        skipped = set(names) - set(claimed)
+        still_scheduled = set()
+        if skipped:
+            for post in frappe.get_all(
+                "Social Post",
+                filters={"name": ["in", list(skipped)], "status": "Scheduled"},
+                fields=["name", "scheduled_time"],
+            ):
+                ScheduleIndex.add(post.name, post.scheduled_time)
+                still_scheduled.add(post.name)
+        ScheduleIndex.remove_members([name for name in names if name not in still_scheduled])
+
+        return claim_token, claimed
+
+    @staticmethod
+    def claim_continuations(names: List[str]) -> Tuple[str, List[str]]:
+        """Claim pending publishes whose next check is due, like claim_due_posts"""
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        if not names:
+            return None, []
+
+        claimed = frappe.db.sql_list(
+            """
+            SELECT name
+            FROM `tabSocial Post`
+            WHERE name IN %s
+              AND status = 'Publishing'
+              AND publish_state IS NOT NULL
+              AND claim_token IS NULL
+              AND claimed_at IS NULL
+            FOR UPDATE SKIP LOCKED
+            """,
+            (tuple(names),),
+        )
+
+        claim_token = None
+        if claimed:
+            claim_token = frappe.generate_hash(length=16)
+            frappe.db.sql(
+                """
+                UPDATE `tabSocial Post`
+                SET claim_token = %s, claimed_at = %s
+                WHERE name IN %s
+                  AND claim_token IS NULL
+                """,
+                (claim_token, now_datetime(), tuple(claimed)),
+            )
+        frappe.db.commit()
+
+        skipped = set(names) - set(claimed)
+        still_pending = set()
+        if skipped:
+            still_pending = set(
+                frappe.get_all(
+                    "Social Post",
+                    filters={
+                        "name": ["in", list(skipped)],
+                        "status": "Publishing",
+                        "publish_state": ["is", "set"],
+                        "claimed_at": ["is", "not set"],
+                    },
+                    pluck="name",
+                )
+            )
+            for name in still_pending:
+                ScheduleIndex.add_continuation(name, now_datetime())
+        ScheduleIndex.remove_members(
+            [f"{ScheduleIndex.RESUME_PREFIX}{name}" for name in names if name not in still_pending]
+        )
+
+        return claim_token, claimed
+
+    @staticmethod
+    def release_stale_claims() -> None:
+        """
+        Release claims whose job never started, and pending publishes whose job died.
+
+        Posts go back to Scheduled; pending publishes stay in Publishing and are
+        resumed right away from their last checkpoint.
+        """
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        cutoff = add_to_date(now_datetime(), minutes=-PostService.CLAIM_TIMEOUT_MINUTES)
+        PostService._release_dead_jobs(cutoff)
+
+        stale = frappe.get_all(
+            "Social Post",
+            filters={"status": "Publishing", "claim_token": ["is", "set"], "claimed_at": ["<", cutoff]},
+            fields=["name", "scheduled_time", "publish_state"],
+        )
+        if not stale:
+            return
+
+        frappe.db.sql(
+            """
+            UPDATE `tabSocial Post`
+            SET status = CASE WHEN publish_state IS NULL THEN 'Scheduled' ELSE status END,
+                claim_token = NULL,
+                claimed_at = NULL
+            WHERE name IN %s
+              AND status = 'Publishing'
+              AND claim_token IS NOT NULL
+            """,
+            (tuple(p.name for p in stale),),
+        )
+        frappe.db.commit()
+
+        for post in stale:
+            if post.publish_state:
+                ScheduleIndex.add_continuation(post.name, now_datetime())
+            else:
+                ScheduleIndex.add(post.name, post.scheduled_time)
+
+    @staticmethod
+    def _release_dead_jobs(cutoff) -> None:
+        """Resume pending publishes whose job stopped checkpointing (e.g. killed mid-upload)"""
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        dead = frappe.get_all(
+            "Social Post",
+            filters={
+                "status": "Publishing",
+                "publish_state": ["is", "set"],
+                "claim_token": ["is", "not set"],
+                "claimed_at": ["<", cutoff],
+            },
+            pluck="name",
+        )
+        if not dead:
+            return
+
+        frappe.db.sql(
+            """
+            UPDATE `tabSocial Post`
+            SET claimed_at = NULL
+            WHERE name IN %s
+              AND claim_token IS NULL
+              AND claimed_at < %s
+            """,
+            (tuple(dead), cutoff),
+        )
+        frappe.db.commit()
+
+        for name in dead:
+            ScheduleIndex.add_continuation(name, now_datetime())
+
+    @staticmethod
+    def _accept_claim(post_name: str, claim_token: str) -> bool:
+        """Take ownership of a claimed post; False if the claim was lost or released"""
+        current = frappe.db.get_value(
+            "Social Post", post_name, ["status", "claim_token"], as_dict=True, for_update=True
+        )
+        if not current or current.status != "Publishing" or current.claim_token != claim_token:
+            frappe.db.rollback()
+            return False
+
+        # The job has started, so the claim must no longer look stale. From here on
+        # claimed_at marks the running job; checkpoints keep it fresh.
+        frappe.db.set_value(
+            "Social Post",
+            post_name,
+            {"claim_token": None, "claimed_at": now_datetime()},
+            update_modified=False,
+        )
+        frappe.db.commit()
+        return True
+
+    @staticmethod
+    def publish_post(post_name: str, claim_token: str = None) -> Dict[str, Any]:
+        if claim_token and not PostService._accept_claim(post_name, claim_token):
+            return {"success": False, "error": "Post is no longer claimed by this dispatch"}
+
         post = frappe.get_doc("Social Post", post_name)
 
         if post.status not in ["Draft", "Scheduled", "Failed", "Cancelled", "Publishing"]:
@@ -46,83 +382,311 @@ class PostService:
 
         # Move to publishing
         if post.status != "Publishing":
-            post.db_set("status", "Publishing")
+            values = {"status": "Publishing"}
+            if post.retry_count:
+                values["last_retry_time"] = now_datetime()
+            post.db_set(values)
             frappe.db.commit()
 
+        http.reset_failure()
         try:
             if not post.platform or not post.account:
                 raise Exception("Platform or Account missing")
 
             result = PostService._publish_to_platform(post, post.platform, post.account)
+            return PostService._apply_result(post, result)
 
-            # 🔥 SAFETY CHECK (fixes your crash)
-            if not isinstance(result, PublishResult):
-                raise Exception("Provider returned invalid response")
+        except Exception as e:
+            return PostService._fail_publish(post, e)
 
-            if result.success:
-                post.db_set({"status": "Published", "error_log": None})
-            else:
-                post.db_set({"status": "Failed", "error_log": result.error_message})
+    @staticmethod
+    def resume_publish(post_name: str, claim_token: str = None) -> Dict[str, Any]:
+        """Continue a publish that was waiting on the platform (see PublishResult.pending_state)"""
+        if claim_token and not PostService._accept_claim(post_name, claim_token):
+            return {"success": False, "error": "Post is no longer claimed by this dispatch"}
 
-            frappe.db.commit()
+        post = frappe.get_doc("Social Post", post_name)
 
-            return {
-                "success": result.success,
-                "status": post.status,
-                "results": {
-                    post.platform: {
-                        "success": result.success,
-                        "post_id": result.post_id,
-                        "post_url": result.post_url,
-                        "error": result.error_message,
-                    }
-                },
-            }
+        if post.status != "Publishing" or not post.publish_state:
+            return {"success": False, "error": "Post has no pending publish"}
+
+        http.reset_failure()
+        try:
+            state = post.publish_state
+            if isinstance(state, str):
+                state = json.loads(state)
+
+            provider = ProviderCache.get(post.platform, post.account)
+            provider.progress_callback = PostService._progress_reporter(post.name)
+            saver = PostService._checkpoint_saver(post.name, frappe.as_json(state))
+            provider.checkpoint_callback = saver
+            result = TokenService.call_with_refresh(
+                provider,
+                lambda: provider.resume_publish(state),
+                PostService._checkpoint_continuation(provider, saver),
+            )
+            return PostService._apply_result(post, result)
 
         except Exception as e:
-            post.db_set({"status": "Failed", "error_log": str(e)})
+            return PostService._fail_publish(post, e)
+
+    @staticmethod
+    def _apply_result(post, result: PublishResult) -> Dict[str, Any]:
+        """Record a provider's publish result on the post"""
+        # 🔥 SAFETY CHECK (fixes your crash)
+        if not isinstance(result, PublishResult):
+            raise Exception("Provider returned invalid response")
+
+        if result.pending_state:
+            PostService._await_platform(post, result.pending_state, result.retry_after)
+            return {"success": False, "status": post.status, "pending": True}
+
+        if result.retry_after:
+            PostService._defer_post(post, result.retry_after, result.error_message)
+            PublishRetry.record(post, "Deferred", result.error_message, next_retry_at=post.scheduled_time)
             frappe.db.commit()
+            return {"success": False, "status": post.status, "deferred_until": str(post.scheduled_time)}
+
+        if result.success:
+            published_time = now_datetime()
+            lateness = None
+            if post.scheduled_time:
+                lateness = (published_time - get_datetime(post.scheduled_time)).total_seconds()
 
-            frappe.log_error(
-                title=f"Social Post Publish Error: {post_name}",
-                message=str(e),
+            post.db_set(
+                {
+                    "status": "Published",
+                    "post_id": result.post_id,
+                    "error_log": None,
+                    "publish_state": None,
+                    "claimed_at": None,
+                    "published_time": published_time,
+                    "publish_lateness": lateness,
+                }
             )
+            PublishRetry.record(post, "Published")
+            frappe.db.commit()
+        else:
+            PostService._handle_failure(post, result.error_message or "Unknown error")
+
+        return {
+            "success": result.success,
+            "status": post.status,
+            "results": {
+                post.platform: {
+                    "success": result.success,
+                    "post_id": result.post_id,
+                    "post_url": result.post_url,
+                    "error": result.error_message,
+                }
+            },
+        }
+
+    @staticmethod
+    def _fail_publish(post, error: Exception) -> Dict[str, Any]:
+        # Whatever the failed publish left uncommitted
+        frappe.db.rollback()
+        PostService._handle_failure(post, str(error), error)
+
+        frappe.log_error(
+            title=f"Social Post Publish Error: {post.name}",
+            message=str(error),
+        )
 
-            return {
-                "success": False,
-                "status": "Failed",
-                "error": str(e),
+        return {
+            "success": False,
+            "status": post.status,
+            "error": str(error),
+            "retry_at": str(post.scheduled_time) if post.status == "Scheduled" else None,
+        }
+
+    @staticmethod
+    def _handle_failure(post, message: str, error: Exception = None) -> None:
+        """Put a failed publish back on the schedule if it is worth retrying, else mark it Failed"""
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        error_class, retryable = PublishRetry.classify(error)
+        settings = ProviderCache.get_settings()
+        max_retries = settings.default_retry_count
+        max_retries = PostService.MAX_RETRIES if max_retries is None else cint(max_retries)
+        retry_count = cint(post.retry_count)
+
+        if PublishRetry.needs_review(error):
+            message = f"{message} (the platform may have published it; check before posting again)"
+            PublishRetry.record(post, "Needs Review", message, error_class)
+            post.db_set({"status": "Failed", "error_log": message, "publish_state": None, "claimed_at": None})
+            frappe.db.commit()
+            return
+
+        wait = PublishRetry.retry_after(error)
+        if wait:
+            # The platform named its own wait (Retry-After longer than http sleeps through):
+            # come back then, without spending a retry
+            PostService._defer_post(post, wait, message)
+            PublishRetry.record(post, "Deferred", message, error_class, retryable, post.scheduled_time)
+            frappe.db.commit()
+            return
+
+        if not retryable or retry_count >= max_retries:
+            PublishRetry.record(post, "Failed", message, error_class, retryable)
+            post.db_set({"status": "Failed", "error_log": message, "publish_state": None, "claimed_at": None})
+            frappe.db.commit()
+            return
+
+        delay = PublishRetry.backoff_seconds(retry_count, cint(settings.retry_interval_minutes))
+        next_time = add_to_date(now_datetime(), seconds=math.ceil(delay))
+        PublishRetry.record(post, "Retry Scheduled", message, error_class, retryable, next_time)
+        post.db_set(
+            {
+                "status": "Scheduled",
+                "scheduled_time": next_time,
+                "retry_count": retry_count + 1,
+                "error_log": f"Retry {retry_count + 1} of {max_retries} at {next_time}: {message}",
+                "publish_state": None,
+                "claimed_at": None,
             }
+        )
+        frappe.db.commit()
+
+        ScheduleIndex.add(post.name, next_time)
+
+    @staticmethod
+    def _await_platform(post, state: Dict[str, Any], delay_seconds: float) -> None:
+        """Save a pending publish and have the dispatcher resume it after `delay_seconds`"""
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        poll_at = add_to_date(now_datetime(), seconds=max(math.ceil(delay_seconds or 0), 1))
+        state["poll_at"] = poll_at.timestamp()
+
+        post.db_set({"publish_state": frappe.as_json(state), "claimed_at": None}, update_modified=False)
+        frappe.db.commit()
+
+        ScheduleIndex.add_continuation(post.name, poll_at)
+
+    @staticmethod
+    def _defer_post(post, delay_seconds: float, reason: str = None) -> None:
+        """Put a post back on the schedule `delay_seconds` from now instead of failing it"""
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        next_time = add_to_date(now_datetime(), seconds=max(int(delay_seconds) + 1, 1))
+        # Starts over then: any checkpointed progress is stale by that time
+        post.db_set(
+            {
+                "status": "Scheduled",
+                "scheduled_time": next_time,
+                "error_log": reason,
+                "publish_state": None,
+                "claimed_at": None,
+            }
+        )
+        frappe.db.commit()
+
+        ScheduleIndex.add(post.name, next_time)
 
     @staticmethod
     def _publish_to_platform(post, platform, account):
-        provider = get_provider(platform)(account)
+        provider = ProviderCache.get(platform, account)
         media_files = [row.file for row in post.media] if post.media else []
 
+        # Shared per-account buckets; out of tokens means "later", not "failed"
+        wait = provider.acquire_rate_limit({"publish": 1, "media_upload": len(media_files)})
+        if wait:
+            return PublishResult(
+                success=False,
+                error_message=f"{platform} rate limit reached for {account}; deferred {int(wait)}s",
+                retry_after=wait,
+            )
+
+        provider.progress_callback = PostService._progress_reporter(post.name)
+        saver = PostService._checkpoint_saver(post.name)
+        provider.checkpoint_callback = saver
         plain_content = strip_html(post.content)
 
-        result = provider.publish_post(
-            content=plain_content,
-            media_files=media_files,
-            is_post=post.is_post,
-            is_story=post.is_story,
-            is_reel=post.is_reel,
-            link=post.link,
-            cta=post.cta,
+        return TokenService.call_with_refresh(
+            provider,
+            lambda: provider.publish_post(
+                content=plain_content,
+                media_files=media_files,
+                is_post=post.is_post,
+                is_story=post.is_story,
+                is_reel=post.is_reel,
+                link=post.link,
+                cta=post.cta,
+            ),
+            PostService._checkpoint_continuation(provider, saver),
         )
 
-        if result.success and result.post_id:
-            post.db_set(
-                {
-                    "post_id": result.post_id,
-                    "status": "Published",
-                    "error_log": None,
-                }
+    @staticmethod
+    def _checkpoint_saver(post_name: str, state: str = None):
+        """
+        Callback that saves a provider's in-progress publish_state, so a killed job can resume.
+        The last state saved (or the `state` resumed from) stays on the callback as `.state`
+        """
+
+        def save(state: Dict[str, Any]) -> None:
+            save.state = frappe.as_json(state)
+            frappe.db.set_value(
+                "Social Post",
+                post_name,
+                {"publish_state": save.state, "claimed_at": now_datetime()},
+                update_modified=False,
             )
-        else:
-            post.db_set({"status": "Failed", "error_log": result.error_message or "Unknown error"})
+            frappe.db.commit()
 
-        return result
+        save.state = state
+        return save
+
+    @staticmethod
+    def _checkpoint_continuation(provider, saver):
+        """For TokenService.call_with_refresh: carry on from the last checkpoint, as a resumed job would"""
+
+        def continuation():
+            if not saver.state:
+                return None
+            state = json.loads(saver.state)
+            return lambda: provider.resume_publish(state)
+
+        return continuation
+
+    @staticmethod
+    def _progress_reporter(post_name: str):
+        """
+        Callback recording upload progress and throughput on the post and pushing them to the desk.
+
+        Writes at most every PROGRESS_INTERVAL_SECONDS; must run in the job's own thread.
+        """
+        last = {"at": 0, "percent": None, "start": None}
+
+        def report(sent: int, total: int) -> None:
+            now = time.monotonic()
+            # Throughput counts from the first report of this job, so resumed uploads are not inflated
+            if last["start"] is None:
+                last["start"] = (now, sent)
+
+            percent = round(sent * 100 / total, 1) if total else 100
+            if percent == last["percent"]:
+                return
+            if percent < 100 and now - last["at"] < PostService.PROGRESS_INTERVAL_SECONDS:
+                return
+
+            started_at, started_bytes = last["start"]
+            elapsed = now - started_at
+            throughput = round((sent - started_bytes) / elapsed / (1024 * 1024), 2) if elapsed > 0 else None
+
+            last.update(at=now, percent=percent)
+            values = {"upload_progress": percent}
+            if throughput is not None:
+                values["upload_throughput"] = throughput
+            frappe.db.set_value("Social Post", post_name, values, update_modified=False)
+            frappe.db.commit()
+            frappe.publish_realtime(
+                "social_post_upload_progress",
+                {"post": post_name, "percent": percent, "throughput": throughput},
+                doctype="Social Post",
+                docname=post_name,
+            )
+
+        return report
 
     @staticmethod
     def _publish_instagram_content(provider, post, plain_content: str, media_files: list) -> PublishResult:
@@ -197,4 +761,8 @@ class PostService:
         post.db_set("status", "Cancelled")
         frappe.db.commit()
 
+        from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+        ScheduleIndex.remove(post_name)
+
         return {"success": True}
@@ -0,0 +1,101 @@
+"""
+Provider Cache - process-local provider instances and Social Settings
+
+Building a provider reads Social Settings and the Social Integration, and some
+providers decrypt app secrets in __init__. Jobs that touch the same account over
+and over (analytics sweeps, the dispatcher loop, multi-step publishes) reuse one
+instance per integration instead.
+
+Entries live for TTL seconds and carry version stamps kept in a Redis hash:
+saving a Social Integration or Social Settings drops the entries of this process
+at once and, after commit, bumps the stamp that every other process compares
+against on its next get(). An entry built from an older stamp is rebuilt (and,
+for an integration, its decrypted credentials are evicted from CredentialCache).
+
+RQ forks a work-horse per job, so in background workers the cache only lives as
+long as one job; that is still where it pays, since a sweep job asks for the
+same provider many times. Web workers keep it across requests. Nothing here
+runs in the background, so a forked job pays no more than the stamp lookups.
+"""
+
+import threading
+import time
+
+import frappe
+from typing import Dict, Tuple
+from frappe_social.frappe_social.services.credential_cache import CredentialCache
+
+# Version scope of Social Settings; integrations use their name
+SETTINGS = "Social Settings"
+
+
+class ProviderCache:
+    VERSIONS_KEY = "social_provider_cache_versions"
+    TTL = 300
+
+    # (site, integration) -> (expires_at, settings version, integration version, provider)
+    _providers: Dict[Tuple[str, str], Tuple] = {}
+    # (site, settings) -> (expires_at, settings version, doc)
+    _settings: Dict[Tuple[str, str], Tuple] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, platform: str, integration_name: str):
+        """Provider for `integration_name`, built once per process and reused until invalidated"""
+        from frappe_social.frappe_social.providers import get_provider
+
+        site = frappe.local.site
+        versions = cls._versions(SETTINGS, integration_name)
+
+        entry = cls._providers.get((site, integration_name))
+        if entry and entry[0] > time.monotonic() and entry[1:3] == versions:
+            provider = entry[3]
+        else:
+            if entry and entry[2] != versions[1]:
+                # Saved in another process: its tokens may have changed too
+                CredentialCache.evict(integration_name)
+            provider = get_provider(platform)(integration_name)
+            cls._providers[(site, integration_name)] = (time.monotonic() + cls.TTL, *versions, provider)
+
+        # Per-call hooks are set by each caller; never inherit a previous caller's
+        provider.progress_callback = None
+        provider.checkpoint_callback = None
+        return provider
+
+    @classmethod
+    def get_settings(cls):
+        """Social Settings, shared by every provider in this process. Treat as read-only"""
+        site = frappe.local.site
+        (version,) = cls._versions(SETTINGS)
+
+        entry = cls._settings.get((site, SETTINGS))
+        if entry and entry[0] > time.monotonic() and entry[1] == version:
+            return entry[2]
+
+        settings = frappe.get_single("Social Settings")
+        cls._settings[(site, SETTINGS)] = (time.monotonic() + cls.TTL, version, settings)
+        return settings
+
+    @classmethod
+    def invalidate(cls, scope: str) -> None:
+        """
+        Drop cached state for an integration name, or for SETTINGS (every provider).
+        Other processes see the new stamp once the current transaction commits.
+        """
+        site = frappe.local.site
+        with cls._lock:
+            if scope == SETTINGS:
+                cls._settings.pop((site, SETTINGS), None)
+                for key in [k for k in cls._providers if k[0] == site]:
+                    del cls._providers[key]
+            else:
+                cls._providers.pop((site, scope), None)
+
+        key = frappe.cache.make_key(cls.VERSIONS_KEY)
+        frappe.db.after_commit.add(lambda: frappe.cache.hincrby(key, scope, 1))
+
+    @classmethod
+    def _versions(cls, *scopes: str) -> Tuple[int, ...]:
+        """Current stamps of `scopes`, in one round trip"""
+        values = frappe.cache.hmget(frappe.cache.make_key(cls.VERSIONS_KEY), scopes)
+        return tuple(int(value or 0) for value in values)
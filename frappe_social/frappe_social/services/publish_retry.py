@@ -0,0 +1,152 @@
+"""
+Publish Retry - whether a failed publish is worth trying again, and when
+
+A failure is retryable when the platform (or the network) was temporarily
+unable to act: HTTP 408/429/5xx, a Graph API error marked transient or one
+of its throttling codes, a connection that could not be made, or a database
+deadlock on our side. Everything else is terminal: the platform rejected the
+content or the credentials (a rejected token was already refreshed once, see
+TokenService), or the post failed validation before reaching the platform.
+Retrying those only adds load.
+
+Failures are classified from the last failed request of the publish
+(utils.http.last_failure()), or from the response of a raised HTTPError. A write
+(POST/PUT/DELETE) that timed out while waiting for the answer, or came back 502
+or 504 from a gateway, may still have been carried out by the platform, so it is
+not retried: the post is marked Failed with a "Needs Review" attempt, to be
+checked on the platform before it is posted again. The same errors on a read
+are retried.
+
+Retries are spaced by exponential backoff from Social Settings'
+retry_interval_minutes with equal jitter, so posts that failed together (e.g. in
+a platform outage) do not all come back at the same moment. A response with a
+Retry-After too long for utils.http to sleep through defers the post by that
+much instead, without counting as a retry. Every attempt is recorded as a
+Social Publish Attempt.
+"""
+
+import random
+
+import frappe
+import requests
+from frappe.utils import now_datetime
+from typing import Tuple
+from frappe_social.frappe_social.utils import http
+
+RETRYABLE_STATUSES = frozenset([408, 429, 500, 502, 503, 504])
+# Gateway errors: the platform may have acted on the request before the gateway gave up
+AMBIGUOUS_STATUSES = frozenset([502, 504])
+# Graph API codes for temporary errors and throttling
+META_TRANSIENT_CODES = frozenset([1, 2, 4, 17, 32, 341, 613])
+
+
+class PublishRetry:
+    # Used when Social Settings has no retry interval
+    DEFAULT_INTERVAL_MINUTES = 5
+    MAX_DELAY_SECONDS = 24 * 3600
+
+    @staticmethod
+    def classify(error: Exception = None) -> Tuple[str, bool]:
+        """
+        (error class, retryable) of a failed publish, from the exception it raised
+        (if any) and the last failed request on this thread
+        """
+        if isinstance(error, (frappe.QueryDeadlockError, frappe.QueryTimeoutError)):
+            return type(error).__name__, True
+
+        failure = PublishRetry._failure(error)
+        if failure is None:
+            # Never reached the platform: validation, missing media or credentials
+            return (type(error).__name__ if error else "Rejected"), False
+        if failure.exception is not None:
+            # ConnectionError includes connect timeouts; a read timeout is only retried for a read
+            error = failure.exception
+            retryable = isinstance(error, requests.ConnectionError) or (
+                isinstance(error, requests.Timeout) and not failure.write
+            )
+            return type(error).__name__, retryable
+
+        retryable = failure.status_code in RETRYABLE_STATUSES and not PublishRetry.needs_review(error)
+        if failure.error_code is not None:
+            retryable = retryable or failure.is_transient or failure.error_code in META_TRANSIENT_CODES
+            return f"HTTP {failure.status_code} / Graph {failure.error_code}", retryable
+        return f"HTTP {failure.status_code}", retryable
+
+    @staticmethod
+    def needs_review(error: Exception = None) -> bool:
+        """Whether the failed write may have gone through anyway (read timeout, 502/504)"""
+        failure = PublishRetry._failure(error)
+        if failure is None or not failure.write:
+            return False
+        if failure.exception is not None:
+            return isinstance(failure.exception, requests.Timeout) and not isinstance(
+                failure.exception, requests.ConnectionError
+            )
+        return failure.status_code in AMBIGUOUS_STATUSES
+
+    @staticmethod
+    def retry_after(error: Exception = None) -> float:
+        """Seconds the failed request was asked to wait before trying again (Retry-After), or 0"""
+        failure = PublishRetry._failure(error)
+        if failure is None or failure.status_code not in RETRYABLE_STATUSES:
+            return 0
+        if PublishRetry.needs_review(error):
+            return 0
+        return failure.retry_after or 0
+
+    @staticmethod
+    def _failure(error: Exception = None):
+        """
+        The failed request behind a publish failure: the last one noted on this thread,
+        unless `error` is a requests exception that was not (e.g. raised elsewhere)
+        """
+        failure = http.last_failure()
+        if not isinstance(error, requests.RequestException):
+            return failure
+
+        response = error.response
+        if failure is not None and failure.exception is error:
+            return failure
+        if failure is not None and response is not None and failure.status_code == response.status_code:
+            return failure
+
+        method = (error.request.method or "") if error.request is not None else ""
+        write = method.upper() not in http.READ_METHODS
+        if response is not None:
+            return http.failure_note(
+                response.status_code, write=write, retry_after=http.retry_after(response)
+            )
+        return http.failure_note(exception=error, write=write)
+
+    @staticmethod
+    def backoff_seconds(retry_count: int, interval_minutes: int = None) -> float:
+        """Delay before retry number `retry_count + 1`: interval * 2^retry_count, half of it jittered"""
+        interval = (interval_minutes or PublishRetry.DEFAULT_INTERVAL_MINUTES) * 60
+        step = min(interval * 2**retry_count, PublishRetry.MAX_DELAY_SECONDS)
+        return step / 2 + random.uniform(0, step / 2)
+
+    @staticmethod
+    def record(
+        post,
+        outcome: str,
+        error_message: str = None,
+        error_class: str = None,
+        retryable: bool = False,
+        next_retry_at=None,
+    ) -> None:
+        """Add a Social Publish Attempt for the post's current attempt (retry_count + 1)"""
+        frappe.get_doc(
+            {
+                "doctype": "Social Publish Attempt",
+                "social_post": post.name,
+                "platform": post.platform,
+                "account": post.account,
+                "attempt": (post.retry_count or 0) + 1,
+                "attempted_at": now_datetime(),
+                "outcome": outcome,
+                "error_class": error_class,
+                "error_message": error_message,
+                "retryable": int(retryable),
+                "next_retry_at": next_retry_at,
+            }
+        ).insert(ignore_permissions=True)
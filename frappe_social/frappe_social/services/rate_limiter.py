@@ -0,0 +1,125 @@
+"""
+Rate Limiter - Redis token buckets shared by all workers
+
+One bucket per (integration, endpoint class), e.g. publish, media_upload or
+insights. A bucket holds up to `limit` tokens and refills continuously at
+limit/period. Tokens are taken atomically in Lua, so concurrent workers never
+lose counts, and one account never uses up another account's quota.
+
+Publishes are also counted per platform and day, for the Social Settings
+dashboard.
+"""
+
+import frappe
+from frappe.utils import today
+from typing import Dict, Tuple
+
+# KEYS: bucket keys. ARGV: (capacity, period, cost) for each key.
+# Takes `cost` tokens from every bucket, or from none. Returns the seconds to
+# wait before all buckets can cover their cost ("0" when the tokens were taken).
+_ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local wait = 0
+local levels = {}
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[(i - 1) * 3 + 1])
+    local period = tonumber(ARGV[(i - 1) * 3 + 2])
+    local cost = tonumber(ARGV[(i - 1) * 3 + 3])
+    local rate = capacity / period
+
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+    levels[i] = tokens
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+
+for i, key in ipairs(KEYS) do
+    local period = tonumber(ARGV[(i - 1) * 3 + 2])
+    local cost = tonumber(ARGV[(i - 1) * 3 + 3])
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(period * 2))
+end
+return '0'
+"""
+
+
+class RateLimiter:
+    KEY_PREFIX = "social_rate_limit"
+    POSTS_KEY_PREFIX = "social_posts_today"
+
+    _acquire_script = None
+
+    @classmethod
+    def _key(cls, integration: str, endpoint: str) -> str:
+        return frappe.cache.make_key(f"{cls.KEY_PREFIX}:{integration}:{endpoint}")
+
+    @classmethod
+    def acquire(
+        cls, integration: str, costs: Dict[str, int], limits: Dict[str, Tuple[int, int]], platform: str = None
+    ) -> float:
+        """
+        Take tokens for every endpoint in `costs` at once.
+
+        `limits` maps endpoint class -> (requests, period in seconds). Returns 0
+        when the tokens were taken. Otherwise returns the seconds until they will
+        be available, and takes nothing. Granted publishes count towards
+        posts_today(`platform`).
+        """
+        wait = cls._take(integration, costs, limits)
+        if not wait and platform and costs.get("publish"):
+            key = cls._posts_key(platform)
+            pipe = frappe.cache.pipeline()
+            pipe.incrby(key, costs["publish"])
+            pipe.expire(key, 2 * 86400)
+            pipe.execute()
+        return wait
+
+    @classmethod
+    def _take(cls, integration: str, costs: Dict[str, int], limits: Dict[str, Tuple[int, int]]) -> float:
+        keys, args = [], []
+        for endpoint, cost in costs.items():
+            if not cost or endpoint not in limits:
+                continue
+            capacity, period = limits[endpoint]
+            if not capacity or capacity <= 0:
+                continue
+            keys.append(cls._key(integration, endpoint))
+            # A request larger than the bucket can never fit; let it through at full bucket
+            args.extend([capacity, period, min(cost, capacity)])
+
+        if not keys:
+            return 0
+
+        if cls._acquire_script is None:
+            cls._acquire_script = frappe.cache.register_script(_ACQUIRE_SCRIPT)
+
+        return float(cls._acquire_script(keys=keys, args=args))
+
+    @classmethod
+    def _posts_key(cls, platform: str, date: str = None) -> str:
+        return frappe.cache.make_key(f"{cls.POSTS_KEY_PREFIX}:{platform}:{date or today()}")
+
+    @classmethod
+    def posts_today(cls, platform: str) -> int:
+        """Publishes granted for `platform` today (site time zone)"""
+        return int(frappe.cache.get(cls._posts_key(platform)) or 0)
+
+    @classmethod
+    def reset(cls, integration: str = None) -> None:
+        """Refill buckets for one integration, or all of them (which also clears today's counts)"""
+        if integration:
+            frappe.cache.delete_keys(f"{cls.KEY_PREFIX}:{integration}:")
+            return
+        frappe.cache.delete_keys(f"{cls.KEY_PREFIX}:")
+        frappe.cache.delete_keys(f"{cls.POSTS_KEY_PREFIX}:")
@@ -0,0 +1,190 @@
+"""
+Schedule Index - Redis sorted set of Scheduled posts scored by scheduled_time
+
+The Social Post table stays the source of truth. The index only tells the
+dispatcher which posts are due, so it can skip scanning the table every minute.
+rebuild() reconciles the two. Due posts stay in the index until they are claimed
+(see PostService.claim_due_posts), so a dispatcher that dies in between loses none.
+
+Every change to the index is also noted, with its time, in a journal. rebuild()
+replays the changes made while it read the table onto the new set before
+swapping it in, so a post scheduled during a rebuild is not dropped.
+
+Publishes waiting on the platform (publish_state set) are kept in the same set
+as "resume:<post>" members, scored by when they should next be checked.
+"""
+
+import json
+import time
+import frappe
+from frappe.utils import get_datetime, now_datetime
+from typing import List, Optional, Tuple
+
+# Swap a rebuilt index (KEYS[2]) in for the live one (KEYS[1]). Members changed in
+# the live index since ARGV[1] (per the journal, KEYS[3]) take their live state,
+# which is newer than the table snapshot the rebuild was made from.
+_SWAP_SCRIPT = """
+local changed = redis.call('ZRANGEBYSCORE', KEYS[3], ARGV[1], '+inf')
+for _, member in ipairs(changed) do
+    local score = redis.call('ZSCORE', KEYS[1], member)
+    if score then
+        redis.call('ZADD', KEYS[2], score, member)
+    else
+        redis.call('ZREM', KEYS[2], member)
+    end
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('RENAME', KEYS[2], KEYS[1])
+    redis.call('PERSIST', KEYS[1])
+else
+    redis.call('DEL', KEYS[1])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', '(' .. ARGV[1])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+class ScheduleIndex:
+    KEY = "social_post_schedule"
+    BUILT_KEY = "social_post_schedule_built"
+    WAKE_KEY = "social_post_schedule_wake"
+    # member -> time of its last change in the index
+    JOURNAL_KEY = "social_post_schedule_journal"
+    RESUME_PREFIX = "resume:"
+    # Changes this long before a rebuild started are replayed too, for clock skew between hosts
+    JOURNAL_MARGIN_SECONDS = 60
+
+    _swap_script = None
+
+    @classmethod
+    def _key(cls) -> str:
+        return frappe.cache.make_key(cls.KEY)
+
+    @staticmethod
+    def _score(scheduled_time) -> float:
+        return get_datetime(scheduled_time).timestamp()
+
+    @classmethod
+    def add(cls, post_name: str, scheduled_time) -> None:
+        """Add or move a post in the index and wake the dispatcher so it can re-plan"""
+        wake_key = frappe.cache.make_key(cls.WAKE_KEY)
+
+        pipe = frappe.cache.pipeline()
+        pipe.zadd(cls._key(), {post_name: cls._score(scheduled_time)})
+        pipe.zadd(frappe.cache.make_key(cls.JOURNAL_KEY), {post_name: time.time()})
+        pipe.lpush(wake_key, 1)
+        pipe.ltrim(wake_key, 0, 0)
+        pipe.execute()
+
+    @classmethod
+    def remove(cls, post_name: str) -> None:
+        cls.remove_members([post_name])
+
+    @classmethod
+    def remove_members(cls, members: List[str]) -> None:
+        """Drop index members (post names or "resume:<post>")"""
+        if not members:
+            return
+        now = time.time()
+        pipe = frappe.cache.pipeline()
+        pipe.zrem(cls._key(), *members)
+        pipe.zadd(frappe.cache.make_key(cls.JOURNAL_KEY), dict.fromkeys(members, now))
+        pipe.execute()
+
+    @classmethod
+    def add_continuation(cls, post_name: str, poll_at) -> None:
+        """Check a pending publish again at `poll_at`"""
+        cls.add(f"{cls.RESUME_PREFIX}{post_name}", poll_at)
+
+    @classmethod
+    def remove_continuation(cls, post_name: str) -> None:
+        cls.remove_members([f"{cls.RESUME_PREFIX}{post_name}"])
+
+    @classmethod
+    def split(cls, members: List[str]) -> Tuple[List[str], List[str]]:
+        """Split due members into (posts to publish, posts to resume)"""
+        scheduled, resume = [], []
+        for member in members:
+            if member.startswith(cls.RESUME_PREFIX):
+                resume.append(member[len(cls.RESUME_PREFIX) :])
+            else:
+                scheduled.append(member)
+        return scheduled, resume
+
+    @classmethod
+    def due(cls, now=None, limit: int = 100) -> List[str]:
+        """
+        Up to `limit` members due at or before `now`, earliest first. They stay in the
+        index: the caller removes them once claimed (remove_members)
+        """
+        now = get_datetime(now) if now else now_datetime()
+        due = frappe.cache.zrangebyscore(cls._key(), "-inf", cls._score(now), start=0, num=limit)
+        return [frappe.safe_decode(name) for name in due or []]
+
+    @classmethod
+    def next_due(cls) -> Optional[float]:
+        """Timestamp of the earliest scheduled post, or None if the index is empty"""
+        first = frappe.cache.zrange(cls._key(), 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    @classmethod
+    def wait_for_change(cls, timeout: float) -> bool:
+        """Block for up to `timeout` seconds or until a post is added; True if woken early"""
+        return bool(frappe.cache.blpop(frappe.cache.make_key(cls.WAKE_KEY), timeout=timeout))
+
+    @classmethod
+    def sync_post(cls, post) -> None:
+        """Mirror a post's current status into the index"""
+        if post.status == "Scheduled" and post.scheduled_time and post.docstatus < 2:
+            cls.add(post.name, post.scheduled_time)
+        else:
+            cls.remove(post.name)
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Rebuild the index from the table and atomically swap it in"""
+        started = time.time() - cls.JOURNAL_MARGIN_SECONDS
+        posts = frappe.get_all(
+            "Social Post",
+            filters={"status": "Scheduled", "scheduled_time": ["is", "set"], "docstatus": ["<", 2]},
+            fields=["name", "scheduled_time"],
+        )
+        members = {p.name: cls._score(p.scheduled_time) for p in posts}
+
+        pending = frappe.get_all(
+            "Social Post",
+            filters={
+                "status": "Publishing",
+                "publish_state": ["is", "set"],
+                "claimed_at": ["is", "not set"],
+            },
+            fields=["name", "publish_state"],
+        )
+        now = now_datetime().timestamp()
+        for p in pending:
+            state = json.loads(p.publish_state) if isinstance(p.publish_state, str) else p.publish_state
+            members[f"{cls.RESUME_PREFIX}{p.name}"] = (state or {}).get("poll_at") or now
+
+        key = cls._key()
+        staging_key = f"{key}:rebuild:{frappe.generate_hash(length=8)}"
+        if cls._swap_script is None:
+            cls._swap_script = frappe.cache.register_script(_SWAP_SCRIPT)
+
+        if members:
+            pipe = frappe.cache.pipeline()
+            pipe.zadd(staging_key, members)
+            # Cleaned up by itself should this process die before the swap
+            pipe.expire(staging_key, 600)
+            pipe.execute()
+        count = cls._swap_script(
+            keys=[key, staging_key, frappe.cache.make_key(cls.JOURNAL_KEY)], args=[started]
+        )
+        frappe.cache.set(frappe.cache.make_key(cls.BUILT_KEY), 1)
+
+        return count
+
+    @classmethod
+    def ensure_built(cls) -> None:
+        """Rebuild if the index was never built or Redis lost it (e.g. after a flush)"""
+        if not frappe.cache.exists(frappe.cache.make_key(cls.BUILT_KEY)):
+            cls.rebuild()
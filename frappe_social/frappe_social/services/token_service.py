@@ -1,36 +1,85 @@
 """
 Token Service - Handles OAuth token refresh
+
+Refreshes are single-flight per integration: a Redis lock serialises them, and a
+caller holding an expiring or rejected token only refreshes if nobody replaced that
+token while it waited. Platforms that rotate refresh tokens (Twitter) invalidate the
+old one on use, so two workers refreshing at once would leave one holding a dead token.
+
+call_with_refresh() wraps a provider operation: the token is refreshed up front if
+it is about to expire, and if the platform rejects it anyway (401 / Meta error 190,
+see utils.http) it is refreshed and the operation continued once. The rejected
+request itself did nothing, but earlier steps of the operation (uploads, media
+containers) may have, so:
+
+- if nothing was written before the rejection, the operation is repeated;
+- otherwise it is continued from where it stopped (e.g. from the publish's
+  checkpointed state) when the caller can, and not repeated at all when it cannot;
+  the token is refreshed either way.
 """
 
 import frappe
-from frappe.utils import now_datetime, add_to_date
-from typing import Dict, Any
-from frappe_social.frappe_social.providers import get_provider
+from frappe.utils import now_datetime, add_to_date, get_datetime
+from typing import Dict, Any, Callable, Optional
+from frappe_social.frappe_social.services.provider_cache import ProviderCache
+from frappe_social.frappe_social.utils import http
 
 
 class TokenService:
-    
+    LOCK_KEY = "social_token_refresh"
+    # Held across the platform call; refresh endpoints answer well within this
+    LOCK_TIMEOUT = 60
+    # Refresh before use when the token expires within this many seconds
+    REFRESH_MARGIN = 300
+
     @staticmethod
-    def refresh_token(integration_name: str) -> Dict[str, Any]:
-        """Refresh OAuth token for an integration"""
+    def refresh_token(integration_name: str, stale_token: str = None) -> Dict[str, Any]:
+        """
+        Refresh OAuth token for an integration.
+
+        With `stale_token` (the token a request was rejected with), nothing is done
+        if the integration already holds a different token: another worker refreshed it.
+        """
+        lock = frappe.cache.lock(
+            frappe.cache.make_key(f"{TokenService.LOCK_KEY}:{integration_name}"),
+            timeout=TokenService.LOCK_TIMEOUT,
+            blocking_timeout=TokenService.LOCK_TIMEOUT,
+        )
+        if not lock.acquire():
+            return {'success': False, 'error_message': 'Token refresh already in progress'}
+
+        try:
+            return TokenService._refresh_locked(integration_name, stale_token)
+        finally:
+            lock.release()
+
+    @staticmethod
+    def _refresh_locked(integration_name: str, stale_token: str = None) -> Dict[str, Any]:
+        # Re-read under the lock: the worker we waited for may have stored new tokens
         integration = frappe.get_doc("Social Integration", integration_name)
-        
+
         if not integration.enabled:
             return {'success': False, 'error_message': 'Integration disabled'}
-        
+
+        if stale_token and integration.get_password("access_token", raise_exception=False) != stale_token:
+            return {'success': True, 'refreshed_elsewhere': True}
+
         try:
-            provider = get_provider(integration.platform)(integration_name)
+            provider = ProviderCache.get(integration.platform, integration_name)
             result = provider.refresh_token(integration_name)
-            
+
             if result.success:
                 integration.access_token = result.access_token
                 if result.refresh_token:
                     integration.refresh_token = result.refresh_token
+                if result.page_access_token:
+                    integration.page_access_token = result.page_access_token
                 if result.expires_in:
                     integration.token_expiry = add_to_date(now_datetime(), seconds=result.expires_in)
                 integration.connection_status = "Connected"
                 integration.last_error = None
                 integration.save(ignore_permissions=True)
+                # Commit before the lock is released, so the next holder sees the new token
                 frappe.db.commit()
                 return {'success': True}
             else:
@@ -40,23 +89,74 @@ class TokenService:
                 integration.save(ignore_permissions=True)
                 frappe.db.commit()
                 return {'success': False, 'error_message': result.error_message}
-                
+
         except Exception as e:
             frappe.log_error(f"Token refresh failed for {integration_name}: {e}", "Token Refresh Error")
             return {'success': False, 'error_message': str(e)}
-    
+
+    @staticmethod
+    def ensure_fresh(integration_name: str) -> bool:
+        """Refresh the integration's token if it expires within REFRESH_MARGIN. True if it was replaced"""
+        token_expiry = frappe.db.get_value("Social Integration", integration_name, "token_expiry")
+        margin = add_to_date(now_datetime(), seconds=TokenService.REFRESH_MARGIN)
+        if not token_expiry or get_datetime(token_expiry) > margin:
+            return False
+
+        # Callers that queued on the lock behind the first refresh find the token replaced and stop there
+        integration = frappe.get_doc("Social Integration", integration_name)
+        token = integration.get_password("access_token", raise_exception=False)
+        return bool(TokenService.refresh_token(integration_name, stale_token=token).get("success"))
+
+    @staticmethod
+    def call_with_refresh(
+        provider, operation: Callable[[], Any], continuation: Callable[[], Optional[Callable]] = None
+    ) -> Any:
+        """
+        Run `operation` (a call on `provider`), refreshing the token first if it is
+        about to expire, and once more if the platform rejects it.
+
+        `continuation()` returns the call that carries on a partly done operation
+        (or None if there is nothing to carry on from); it is used instead of
+        repeating `operation` when the platform already accepted writes.
+        """
+        if not provider.integration_name:
+            return operation()
+
+        if TokenService.ensure_fresh(provider.integration_name):
+            provider.reload_integration()
+        token = provider.integration.get_password("access_token", raise_exception=False)
+
+        http.reset_auth_failure()
+        result = operation()
+        if not http.auth_failed():
+            return result
+
+        if not http.auth_failed_after_write():
+            repeat = operation
+        else:
+            repeat = continuation() if continuation else None
+
+        refreshed = TokenService.refresh_token(provider.integration_name, stale_token=token)
+        if not refreshed.get("success") or repeat is None:
+            return result
+
+        provider.reload_integration()
+        http.reset_auth_failure()
+        http.reset_failure()
+        return repeat()
+
     @staticmethod
     def check_token_validity(integration_name: str) -> Dict[str, Any]:
         """Check if token is valid and not expired"""
         integration = frappe.get_doc("Social Integration", integration_name)
-        
+
         is_expired = integration.is_token_expired()
         days_until_expiry = None
-        
+
         if integration.token_expiry:
             delta = integration.token_expiry - now_datetime()
             days_until_expiry = delta.days
-        
+
         return {
             'valid': not is_expired,
             'expires_in_days': days_until_expiry,
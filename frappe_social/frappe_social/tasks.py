@@ -5,13 +5,16 @@ Configured in hooks.py:
 scheduler_events = {
     "cron": {
         "* * * * *": ["frappe_social.frappe_social.tasks.publish_scheduled_posts"],
+        "*/15 * * * *": ["frappe_social.frappe_social.tasks.fetch_post_analytics"],
         "0 0 * * *": ["frappe_social.frappe_social.tasks.reset_rate_limit_counters"],
     },
     "hourly": [
+        "frappe_social.frappe_social.tasks.rebuild_schedule_index",
+        "frappe_social.frappe_social.tasks.rebuild_post_leaderboards",
         "frappe_social.frappe_social.tasks.refresh_expiring_tokens",
         "frappe_social.frappe_social.tasks.fetch_daily_analytics",
-        "frappe_social.frappe_social.tasks.fetch_post_analytics"
     ],
+    "daily": ["frappe_social.frappe_social.tasks.downsample_post_metrics"],
 }
 """
 
@@ -20,25 +23,36 @@ from frappe.utils import now_datetime, add_days
 
 
 def publish_scheduled_posts():
-    """Publish posts that are scheduled and due (runs every minute)"""
+    """Safety-net sweep behind the precise dispatcher (runs every minute)
+
+    Claims anything already due, then makes sure the second-accurate
+    dispatcher loop (PostService.run_dispatcher) is running.
+    """
     from frappe_social.frappe_social.services.post_service import PostService
 
-    posts = frappe.get_all(
-        "Social Post", filters={"status": "Scheduled", "scheduled_time": ["<=", now_datetime()]}, pluck="name"
-    )
+    PostService.release_stale_claims()
+    PostService.dispatch_due_posts()
+    PostService.start_dispatcher()
+
+
+def rebuild_schedule_index():
+    """Reconcile the Redis schedule index with the Social Post table (runs hourly, after migrate)
+
+    Can also be run by hand:
+    bench --site <site> execute frappe_social.frappe_social.tasks.rebuild_schedule_index
+    """
+    from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+    count = ScheduleIndex.rebuild()
+    frappe.logger().info(f"Social post schedule index rebuilt with {count} entries")
 
-    for name in posts:
-        try:
-            frappe.enqueue(
-                PostService.publish_post,
-                post_name=name,
-                queue="short",
-                job_name=f"publish_{name}",
-                job_id=f"publish_post:{name}",
-                deduplicate=True,
-            )
-        except Exception as e:
-            frappe.log_error(f"Failed to enqueue {name}: {e}", "Social Post Scheduler")
+
+def rebuild_post_leaderboards():
+    """Recompute the top-posts leaderboards, dropping posts past their window (runs hourly, after migrate)"""
+    from frappe_social.frappe_social.services.post_leaderboard import PostLeaderboard
+
+    count = PostLeaderboard.rebuild()
+    frappe.logger().info(f"Social post leaderboards rebuilt with {count} posts")
 
 
 def refresh_expiring_tokens():
@@ -91,24 +105,50 @@ def fetch_daily_analytics():
 
 
 def fetch_post_analytics():
-    """Fetch analytics for recent posts (runs hourly)"""
+    """Fetch analytics for posts due a refresh, one batched job per integration (runs every 15 minutes)"""
     from frappe_social.frappe_social.services.analytics_service import AnalyticsService
 
-    posts = AnalyticsService.get_recent_posts_for_analytics()
+    posts_by_account = {}
+    for info in AnalyticsService.get_due_posts_for_analytics():
+        posts_by_account.setdefault(info["account"], []).append(info["post_name"])
 
-    for info in posts:
+    for account, post_names in posts_by_account.items():
         try:
             frappe.enqueue(
-                AnalyticsService.fetch_post_analytics,
-                post_name=info["post_name"],
-                platform=info["platform"],
+                AnalyticsService.fetch_integration_post_analytics,
+                integration_name=account,
+                post_names=post_names,
                 queue="long",
-                job_name=f"post_analytics_{info['post_name']}_{info['platform']}",
-                job_id=f"post_analytics_fetch:{info['post_name']}:{info['platform']}",
+                job_name=f"post_analytics_{account}",
+                job_id=f"post_analytics_fetch:{account}",
                 deduplicate=True,
             )
         except Exception as e:
-            frappe.log_error(f"Post analytics failed: {e}", "Post Analytics Fetch")
+            frappe.log_error(f"Post analytics failed {account}: {e}", "Post Analytics Fetch")
+
+
+def downsample_post_metrics():
+    """Apply the post metric series retention rules (runs daily)"""
+    from frappe_social.frappe_social.services.metric_series import MetricSeries
+
+    try:
+        MetricSeries.downsample()
+    except Exception as e:
+        frappe.log_error(f"Post metric downsampling failed: {e}", "Post Metric Retention")
+
+
+def backfill_analytics_rollups():
+    """Build the account rollups from all stored Social Analytics (not scheduled)
+
+    Ingest keeps the rollups current; run this once for history written before them:
+    bench --site <site> execute frappe_social.frappe_social.tasks.backfill_analytics_rollups
+    """
+    from frappe_social.frappe_social.services.analytics_cache import AnalyticsCache
+    from frappe_social.frappe_social.services.analytics_rollup import AnalyticsRollup
+
+    count = AnalyticsRollup.backfill()
+    AnalyticsCache.invalidate()
+    frappe.logger().info(f"Social analytics rollups rebuilt for {count} accounts")
 
 
 def reset_rate_limit_counters():
@@ -117,16 +157,11 @@ def reset_rate_limit_counters():
     Note: Function name must match hooks.py scheduler_events
     Previously named reset_daily_counters which caused import errors
     """
-    # Clear cache-based rate limits
-    for platform in ["twitter", "linkedin", "instagram", "facebook", "youtube"]:
-        frappe.cache.delete_value(f"social_rate_limit_{platform}")
-
-    # Reset database counters in Social Settings
+    # Per-account token buckets refill continuously and posts are counted per day
+    # (services/rate_limiter.py), so only the YouTube quota tracking needs a reset
     try:
         settings = frappe.get_single("Social Settings")
         settings.youtube_quota_used = 0
-        settings.twitter_posts_today = 0
-        settings.instagram_posts_today = 0
         settings.save(ignore_permissions=True)
         frappe.db.commit()
 
@@ -0,0 +1,314 @@
+# Copyright (c) 2025, Macrobian and Contributors
+# See license.txt
+
+"""
+Query-plan checks for the scheduler, analytics and report queries.
+
+A synthetic dataset (200 active accounts among 2,200, a year of daily snapshots,
+20k posts) is loaded, every SELECT the code paths below issue (including the
+SELECT feeding an INSERT ... SELECT) is captured, and each is run through
+EXPLAIN. A plan that reads a table (or a whole index) end to end for more than
+FULL_SCAN_TOLERANCE rows fails the test, so every table is made larger than that.
+
+ANALYZE TABLE commits, so the synthetic rows are removed explicitly afterwards.
+"""
+
+import re
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, add_to_date, getdate, now_datetime, today
+
+PREFIX = "qp-"
+INTEGRATIONS = 200
+# Disabled accounts without data, so the integration table outgrows FULL_SCAN_TOLERANCE
+SPARE_INTEGRATIONS = 2000
+SNAPSHOT_DAYS = 365
+POSTS = 20000
+FULL_SCAN_TOLERANCE = 500
+
+TABLES = (
+	"Social Integration",
+	"Social Post",
+	"Social Post Metric Point",
+	"Social Post Analytics",
+	"Social Analytics",
+	"Social Analytics Rollup",
+)
+
+
+class TestQueryPlans(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.remove_synthetic_rows()
+		cls.create_synthetic_rows()
+		for doctype in TABLES:
+			frappe.db.sql(f"ANALYZE TABLE `tab{doctype}`")
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.remove_synthetic_rows()
+		super().tearDownClass()
+
+	@classmethod
+	def remove_synthetic_rows(cls):
+		for doctype in TABLES:
+			frappe.db.delete(doctype, {"name": ["like", f"{PREFIX}%"]})
+		frappe.db.commit()
+
+	@classmethod
+	def create_synthetic_rows(cls):
+		from frappe_social.frappe_social.services.analytics_rollup import AnalyticsRollup
+
+		now = now_datetime()
+		user = frappe.session.user
+
+		def standard(ts):
+			return (ts, ts, user, user)
+
+		standard_fields = ["creation", "modified", "owner", "modified_by"]
+		platforms = ("Facebook", "Instagram", "YouTube", "Twitter", "LinkedIn")
+
+		cls.integrations = [f"{PREFIX}int-{i}" for i in range(INTEGRATIONS)]
+		spares = [f"{PREFIX}spare-{i}" for i in range(SPARE_INTEGRATIONS)]
+		frappe.db.bulk_insert(
+			"Social Integration",
+			fields=[
+				"name",
+				*standard_fields,
+				"platform",
+				"profile_id",
+				"profile_name",
+				"enabled",
+				"connection_status",
+			],
+			values=[
+				(
+					name,
+					*standard(now),
+					platforms[i % 5],
+					f"{PREFIX}{i}",
+					name,
+					int(i < INTEGRATIONS),
+					"Connected" if i < INTEGRATIONS else "Not Connected",
+				)
+				for i, name in enumerate(cls.integrations + spares)
+			],
+		)
+
+		snapshots = []
+		for i, integration in enumerate(cls.integrations):
+			for day in range(SNAPSHOT_DAYS):
+				date = getdate(add_days(today(), -day))
+				snapshots.append(
+					(
+						f"{PREFIX}{integration}-{date}",
+						*standard(now),
+						integration,
+						platforms[i % 5],
+						date,
+						10000 - day,
+						day % 7,
+						day % 3,
+						day * 10,
+						day * 8,
+						day,
+						day % 5,
+						day % 4,
+					)
+				)
+		frappe.db.bulk_insert(
+			"Social Analytics",
+			fields=[
+				"name",
+				*standard_fields,
+				"integration",
+				"platform",
+				"date",
+				"followers_count",
+				"followers_gained",
+				"followers_lost",
+				"impressions",
+				"reach",
+				"likes",
+				"comments",
+				"shares",
+			],
+			values=snapshots,
+		)
+		AnalyticsRollup.refresh(cls.integrations)
+
+		posts, points, post_analytics = [], [], []
+		statuses = ("Published",) * 7 + ("Scheduled", "Draft", "Failed")
+		for i in range(POSTS):
+			name = f"{PREFIX}post-{i}"
+			status = statuses[i % len(statuses)]
+			# Spread over three years so a recent window is a small slice of history
+			ts = add_to_date(now, hours=-(i * 53 % (3 * 365 * 24)))
+			published = status == "Published"
+			posts.append(
+				(
+					name,
+					*standard(ts),
+					cls.integrations[i % INTEGRATIONS],
+					platforms[i % 5],
+					"synthetic",
+					status,
+					1 if published else 0,
+					add_to_date(now, minutes=i) if status == "Scheduled" else ts,
+					ts if published else None,
+					f"{PREFIX}{i}" if published else None,
+					f"{PREFIX}mp-{i}" if published else None,
+				)
+			)
+			if published:
+				points.append((f"{PREFIX}mp-{i}", *standard(now), name, now, "Raw", i % 100, i % 13))
+				post_analytics.append(
+					(f"{PREFIX}spa-{i}", *standard(now), name, platforms[i % 5], now, getdate(now), i % 100)
+				)
+
+		frappe.db.bulk_insert(
+			"Social Post",
+			fields=[
+				"name",
+				*standard_fields,
+				"account",
+				"platform",
+				"content",
+				"status",
+				"docstatus",
+				"scheduled_time",
+				"published_time",
+				"post_id",
+				"latest_metric_point",
+			],
+			values=posts,
+		)
+		frappe.db.bulk_insert(
+			"Social Post Metric Point",
+			fields=[
+				"name",
+				*standard_fields,
+				"social_post",
+				"ts",
+				"resolution",
+				"impressions",
+				"engagement_rate",
+			],
+			values=points,
+		)
+		frappe.db.bulk_insert(
+			"Social Post Analytics",
+			fields=[
+				"name",
+				*standard_fields,
+				"social_post",
+				"platform",
+				"fetched_at",
+				"bucket",
+				"impressions",
+			],
+			values=post_analytics,
+		)
+		frappe.db.commit()
+
+	def capture_selects(self, fn, *args, **kwargs):
+		"""
+		Run fn and return the (query, values) of every SELECT it issued, as EXPLAIN takes it:
+		the SELECT of an INSERT ... SELECT, without a FOR UPDATE [SKIP LOCKED] (same plan)
+		"""
+		original = frappe.db.sql
+		captured = []
+
+		def record(query, values=(), *a, **kw):
+			sql = str(query).strip()
+			if sql.upper().startswith("INSERT"):
+				select = re.search(r"\bSELECT\b.*?(?=\bON DUPLICATE KEY UPDATE\b|$)", sql, re.S | re.I)
+				if select:
+					captured.append((select.group(0), values))
+			elif sql.upper().startswith("SELECT"):
+				captured.append((re.sub(r"\s+FOR UPDATE(\s+SKIP LOCKED)?\s*$", "", sql, flags=re.I), values))
+			return original(query, values, *a, **kw)
+
+		with patch.object(frappe.db, "sql", side_effect=record):
+			fn(*args, **kwargs)
+		return captured
+
+	def assert_no_full_scans(self, label, fn, *args, **kwargs):
+		selects = self.capture_selects(fn, *args, **kwargs)
+		self.assertTrue(selects, f"{label} issued no SELECT")
+		for query, values in selects:
+			for step in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True):
+				full_scan = step.get("type") in ("ALL", "index")
+				self.assertFalse(
+					full_scan and (step.get("rows") or 0) > FULL_SCAN_TOLERANCE,
+					f"{label}: full scan of {step.get('table')} ({step.get('rows')} rows)\n{query}",
+				)
+
+	def test_tables_outgrow_tolerance(self):
+		# A table no larger than FULL_SCAN_TOLERANCE would pass even when scanned
+		for doctype in TABLES:
+			rows = frappe.db.count(doctype, {"name": ["like", f"{PREFIX}%"]})
+			self.assertGreater(rows, FULL_SCAN_TOLERANCE, doctype)
+
+	def test_scheduler_queries(self):
+		from frappe_social.frappe_social.services.post_service import PostService
+		from frappe_social.frappe_social.services.schedule_index import ScheduleIndex
+
+		self.assert_no_full_scans("release_stale_claims", PostService.release_stale_claims)
+		self.assert_no_full_scans("schedule index rebuild", ScheduleIndex.rebuild)
+
+		# Not yet due, so nothing is claimed; the locking SELECTs still run
+		scheduled = frappe.get_all(
+			"Social Post",
+			filters={"name": ["like", f"{PREFIX}%"], "status": "Scheduled"},
+			limit=PostService.CLAIM_BATCH_SIZE,
+			pluck="name",
+		)
+		try:
+			self.assert_no_full_scans("claim_due_posts", PostService.claim_due_posts, scheduled)
+			self.assert_no_full_scans("claim_continuations", PostService.claim_continuations, scheduled)
+		finally:
+			ScheduleIndex.remove_members(scheduled)
+			ScheduleIndex.remove_members([f"{ScheduleIndex.RESUME_PREFIX}{name}" for name in scheduled])
+
+	def test_analytics_queries(self):
+		from frappe_social.frappe_social.api.analytics import get_post_analytics
+		from frappe_social.frappe_social.services.analytics_rollup import AnalyticsRollup
+		from frappe_social.frappe_social.services.analytics_service import AnalyticsService
+		from frappe_social.frappe_social.services.post_leaderboard import PostLeaderboard
+
+		integration = self.integrations[0]
+		self.assert_no_full_scans("due posts", AnalyticsService.get_due_posts_for_analytics)
+		self.assert_no_full_scans("previous snapshot", AnalyticsService._get_previous_analytics, integration)
+		self.assert_no_full_scans("summary", AnalyticsService.get_analytics_summary, integration)
+		self.assert_no_full_scans("compare platforms", AnalyticsService.compare_platforms, 30)
+		self.assert_no_full_scans("leaderboard source", PostLeaderboard._published_posts)
+		self.assert_no_full_scans(
+			"leaderboard update source",
+			PostLeaderboard._published_posts,
+			[f"{PREFIX}post-{i}" for i in range(0, 500, 10)],
+		)
+		self.assert_no_full_scans(
+			"rollup refresh", AnalyticsRollup.refresh, [integration], add_days(today(), -7), today()
+		)
+		self.assert_no_full_scans("latest post analytics", get_post_analytics, f"{PREFIX}post-0")
+		self.assert_no_full_scans(
+			"integration lookup",
+			frappe.db.get_value,
+			"Social Integration",
+			{"platform": "Facebook", "profile_id": f"{PREFIX}0"},
+			"name",
+		)
+
+	def test_report_queries(self):
+		from frappe_social.frappe_social.report.account_growth import account_growth
+		from frappe_social.frappe_social.report.post_performance import post_performance
+		from frappe_social.frappe_social.report.publishing_summary import publishing_summary
+
+		filters = {"from_date": add_days(today(), -30), "to_date": today()}
+		self.assert_no_full_scans("account growth", account_growth.execute, {**filters, "period": "Day"})
+		self.assert_no_full_scans("post performance", post_performance.execute, dict(filters))
+		self.assert_no_full_scans("publishing summary", publishing_summary.execute, dict(filters))
@@ -0,0 +1,61 @@
+"""
+Bulk writes that bypass the document layer
+
+For ingestion paths that write hundreds of rows at a time, where get_doc/save per
+row (validation, hooks, one query per field table) dominates. Rows are written
+as-is: no controller methods run, so callers must fill every value they need.
+"""
+
+import frappe
+from frappe.utils import now_datetime
+from typing import Any, Dict, Iterable, List
+
+# Rows per INSERT statement
+UPSERT_CHUNK_SIZE = 500
+
+# Never overwritten when a row already exists
+_INSERT_ONLY_COLUMNS = frozenset(["name", "creation", "owner"])
+
+
+def bulk_upsert(doctype: str, rows: List[Dict[str, Any]], update_fields: Iterable[str] = None) -> None:
+    """
+    Write `rows` into `doctype` with multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+
+    A row that collides with an existing one on the primary key or a unique index
+    updates that row's `update_fields` (default: every column given) and `modified`.
+    Missing name, creation, modified, owner, modified_by and docstatus are filled in.
+    """
+    if not rows:
+        return
+
+    now = now_datetime()
+    user = frappe.session.user
+    standard = {"creation": now, "modified": now, "owner": user, "modified_by": user, "docstatus": 0}
+
+    given = list(dict.fromkeys(c for row in rows for c in row if c != "name"))
+    columns = ["name", *[c for c in standard if c not in given], *given]
+
+    updates = [c for c in (update_fields or given) if c not in _INSERT_ONLY_COLUMNS]
+    updates += [c for c in ("modified", "modified_by") if c not in updates]
+
+    values = []
+    for row in rows:
+        row = {**standard, **row}
+        if not row.get("name"):
+            row["name"] = frappe.generate_hash(length=10)
+        values.append(tuple(row.get(c) for c in columns))
+
+    column_list = ", ".join(f"`{c}`" for c in columns)
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    update_list = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in updates)
+
+    for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        chunk = values[start : start + UPSERT_CHUNK_SIZE]
+        frappe.db.sql(
+            f"""
+            INSERT INTO `tab{doctype}` ({column_list})
+            VALUES {", ".join([placeholders] * len(chunk))}
+            ON DUPLICATE KEY UPDATE {update_list}
+            """,
+            [v for row in chunk for v in row],
+        )
@@ -0,0 +1,345 @@
+"""
+Pooled HTTP sessions shared by all providers
+
+Each process keeps one requests.Session per host, so repeated calls to the same
+API reuse keep-alive connections instead of doing a new TCP+TLS handshake every
+time. Every request gets default connect/read timeouts. 429/5xx responses and
+connection resets are retried with jittered exponential backoff. Pass
+retry=False for requests whose caller must see every failure itself (e.g. the
+chunks of a resumable upload, which have to ask the server what arrived first).
+
+Responses that reject the access token (HTTP 401, or Meta's error 190 on a 400)
+are noted per thread, along with whether a write (a successful POST/PUT/DELETE)
+went through before the rejection; TokenService.call_with_refresh uses that to
+refresh the token and decide how the operation may be repeated. Likewise the
+last failed request (its status and Graph API error or the exception raised,
+whether it was a write, and any Retry-After) is kept per thread, for PublishRetry
+to tell a transient failure from one that will never succeed. Requests made in
+worker threads are carried back to the calling thread with WorkerNotes.
+
+Tunable from site_config.json:
+    social_http_pool_size        connections kept per host (default 10)
+    social_http_connect_timeout  seconds (default 5)
+    social_http_read_timeout     seconds (default 60)
+    social_http_max_retries      retries after the first attempt (default 3)
+    social_http_max_retry_after  longest Retry-After slept through, seconds (default 5)
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import frappe
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+READ_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+# Graph API error code for an expired or invalidated access token
+META_TOKEN_ERROR_CODE = 190
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_auth = threading.local()
+_failure = threading.local()
+
+
+def _conf(key: str, default):
+    try:
+        return frappe.conf.get(key) or default
+    except Exception:
+        # No site context (e.g. a helper thread); use the defaults
+        return default
+
+
+class JitteredRetry(Retry):
+    """
+    Exponential backoff with full jitter.
+
+    Non-idempotent requests (POST) are only resent when the platform cannot have
+    acted on them: on a connect failure or a 429. A reset after the body was sent
+    could have published already, so it is not retried.
+
+    A Retry-After is slept through only up to `max_retry_after` seconds: a longer
+    one (Twitter and Meta often ask for minutes) would hold the worker, so that
+    response is handed back and the publish is deferred instead (see PostService).
+    """
+
+    def __init__(self, *args, max_retry_after: float = 5, **kwargs):
+        self.max_retry_after = max_retry_after
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        wait = self.get_retry_after(response) if response is not None else None
+        if wait is not None and wait > self.max_retry_after:
+            # Returned as the response, since raise_on_status is off
+            raise MaxRetryError(_pool, url, ResponseError(f"Retry-After of {wait:.0f}s is too long to wait"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    def sleep_for_retry(self, response=None) -> bool:
+        wait = self.get_retry_after(response) if response is not None else None
+        if wait is None:
+            return False
+        time.sleep(min(wait, self.max_retry_after))
+        return True
+
+    def _is_method_retryable(self, method: str) -> bool:
+        return method.upper() in self.DEFAULT_ALLOWED_METHODS
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout when the caller gives none"""
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _build_session(retry: bool = True) -> requests.Session:
+    pool_size = int(_conf("social_http_pool_size", 10))
+    timeout = (
+        float(_conf("social_http_connect_timeout", 5)),
+        float(_conf("social_http_read_timeout", 60)),
+    )
+    retry = JitteredRetry(
+        total=int(_conf("social_http_max_retries", 3)) if retry else 0,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        max_retry_after=float(_conf("social_http_max_retry_after", 5)),
+        # Hand the last response back to the provider instead of raising
+        raise_on_status=False,
+    )
+
+    adapter = PooledAdapter(
+        timeout=timeout, pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str, retry: bool = True) -> requests.Session:
+    """Get this process's pooled session for the host of `url`"""
+    parts = urlsplit(url)
+    key = (f"{parts.scheme}://{parts.netloc}", retry)
+
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = _build_session(retry)
+    return session
+
+
+def request(method: str, url: str, retry: bool = True, read_only: bool = False, **kwargs) -> requests.Response:
+    """
+    Send a request on the pooled session for `url`. Pass read_only=True for a POST
+    that changes nothing by itself (e.g. a Graph batch, which notes its own writes)
+    """
+    write = not read_only and method.upper() not in READ_METHODS
+    try:
+        response = get_session(url, retry).request(method, url, **kwargs)
+    except requests.RequestException as e:
+        note_failure(exception=e, write=write)
+        raise
+    if response.status_code >= 400:
+        note_failure(
+            response.status_code, _error_body(response), write=write, retry_after=retry_after(response)
+        )
+    elif write:
+        note_write()
+    if is_auth_rejection(response.status_code, response):
+        mark_auth_failure()
+    return response
+
+
+def _error_body(response) -> dict:
+    try:
+        body = response.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def note_failure(
+    status_code: int = None,
+    body: dict = None,
+    exception: Exception = None,
+    write: bool = False,
+    retry_after: float = None,
+) -> None:
+    """
+    Remember a failed request: its status and Graph API error, or the exception it raised,
+    whether it was a write, and how long the platform asked to wait (Retry-After)
+    """
+    _failure.last = failure_note(status_code, body, exception, write, retry_after)
+
+
+def failure_note(
+    status_code: int = None,
+    body: dict = None,
+    exception: Exception = None,
+    write: bool = False,
+    retry_after: float = None,
+) -> frappe._dict:
+    """The record note_failure() keeps, as last_failure() returns it"""
+    error = (body or {}).get("error")
+    error = error if isinstance(error, dict) else {}
+    return frappe._dict(
+        status_code=status_code,
+        error_code=error.get("code"),
+        is_transient=bool(error.get("is_transient")),
+        exception=exception,
+        write=write,
+        retry_after=retry_after,
+    )
+
+
+def retry_after(response) -> Optional[float]:
+    """Seconds a response's Retry-After header asks to wait (given in seconds or as a date), or None"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def reset_failure() -> None:
+    _failure.last = None
+
+
+def last_failure():
+    """The last request on this thread that failed since reset_failure(), or None"""
+    return getattr(_failure, "last", None)
+
+
+def is_auth_rejection(status_code: int, response=None, body: dict = None) -> bool:
+    """Whether a response rejects the access token: a 401, or Meta's error 190"""
+    if status_code == 401:
+        return True
+    if status_code != 400:
+        return False
+    if body is None:
+        try:
+            body = response.json()
+        except ValueError:
+            return False
+    error = body.get("error") if isinstance(body, dict) else None
+    return isinstance(error, dict) and error.get("code") == META_TOKEN_ERROR_CODE
+
+
+def note_write() -> None:
+    _auth.wrote = True
+
+
+def mark_auth_failure() -> None:
+    if not auth_failed():
+        _auth.after_write = getattr(_auth, "wrote", False)
+    _auth.failed = True
+
+
+def reset_auth_failure() -> None:
+    _auth.failed = False
+    _auth.wrote = False
+    _auth.after_write = False
+
+
+def auth_failed() -> bool:
+    """Whether a request on this thread was rejected for its token since reset_auth_failure()"""
+    return getattr(_auth, "failed", False)
+
+
+def auth_failed_after_write() -> bool:
+    """Whether a write had already gone through when the token was first rejected"""
+    return auth_failed() and getattr(_auth, "after_write", False)
+
+
+class WorkerNotes:
+    """
+    Carries the failure, write and token-rejection notes of worker threads back
+    to the thread that started them, which is the one the callers inspect:
+
+        notes = http.WorkerNotes()
+        pool.submit(notes.wrap(upload), part)
+        ...
+        notes.apply()
+    """
+
+    def __init__(self):
+        self._notes = []
+        self._lock = threading.Lock()
+
+    def wrap(self, fn: Callable) -> Callable:
+        def run(*args, **kwargs):
+            # Pool threads are reused; start each task with clean notes
+            reset_failure()
+            reset_auth_failure()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._notes.append((last_failure(), getattr(_auth, "wrote", False), auth_failed()))
+
+        return run
+
+    def apply(self) -> None:
+        """Re-note on this thread what the wrapped tasks saw: writes first, then failures"""
+        for _, wrote, _ in self._notes:
+            if wrote:
+                note_write()
+        for failure, _, rejected in self._notes:
+            if failure is not None:
+                _failure.last = failure
+            if rejected:
+                mark_auth_failure()
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def delete(url: str, **kwargs) -> requests.Response:
+    return request("DELETE", url, **kwargs)
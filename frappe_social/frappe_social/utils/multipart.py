@@ -0,0 +1,225 @@
+"""
+Streaming multipart/form-data bodies
+
+requests builds a `files=` upload completely in memory before sending it.
+MultipartEncoder is a file-like body instead: file parts are read from disk in
+CHUNK_SIZE blocks while the request is being sent, so memory stays flat however
+large the file is.
+
+    encoder = MultipartEncoder({"access_token": token}, {"source": FilePart(path)})
+    http.post(url, data=encoder, headers={"Content-Type": encoder.content_type})
+
+ChunkReader does the same for raw (non-multipart) chunk bodies, e.g. one
+Content-Range chunk of a resumable upload.
+"""
+
+import os
+import mimetypes
+import secrets
+from typing import Callable, Dict, List, Optional, Union
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+class FilePart:
+    """A file, or a byte window of one, to send as a multipart field"""
+
+    def __init__(
+        self,
+        path: str,
+        offset: int = 0,
+        length: int = None,
+        filename: str = None,
+        content_type: str = None,
+    ):
+        self.path = path
+        self.offset = offset
+        self.length = os.path.getsize(path) - offset if length is None else length
+        self.filename = filename or os.path.basename(path)
+        self.content_type = (
+            content_type or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+        )
+
+
+class MultipartEncoder:
+    """
+    File-like multipart/form-data body with a known length.
+
+    `callback(bytes_sent, total_bytes)` is called as the body is read.
+    Supports tell()/seek() so the HTTP layer can rewind it for a retry.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, str] = None,
+        files: Dict[str, FilePart] = None,
+        callback: Optional[Callable[[int, int], None]] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.boundary = secrets.token_hex(16)
+        self.callback = callback
+        self.chunk_size = chunk_size
+        self._parts: List[Union[bytes, FilePart]] = []
+
+        for name, value in (fields or {}).items():
+            self._parts.append(
+                (
+                    f"--{self.boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                    f"{value}\r\n"
+                ).encode()
+            )
+        for name, part in (files or {}).items():
+            self._parts.append(
+                (
+                    f"--{self.boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{name}"; filename="{part.filename}"\r\n'
+                    f"Content-Type: {part.content_type}\r\n\r\n"
+                ).encode()
+            )
+            self._parts.append(part)
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode())
+
+        self._sizes = [len(p) if isinstance(p, bytes) else p.length for p in self._parts]
+        self.len = sum(self._sizes)
+
+        self._file = None
+        self._file_part = None
+        self.seek(0)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self.len
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.len
+        self._position = max(0, min(offset, self.len))
+
+        # Find the part containing the new position
+        self._index, self._part_offset = 0, self._position
+        while self._index < len(self._parts) and self._part_offset >= self._sizes[self._index]:
+            self._part_offset -= self._sizes[self._index]
+            self._index += 1
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.len - self._position
+
+        out = []
+        remaining = size
+        while remaining > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            available = self._sizes[self._index] - self._part_offset
+
+            if isinstance(part, bytes):
+                data = part[self._part_offset : self._part_offset + min(remaining, available)]
+            else:
+                data = self._read_file(part, min(remaining, available))
+
+            out.append(data)
+            remaining -= len(data)
+            self._part_offset += len(data)
+            if self._part_offset >= self._sizes[self._index]:
+                self._index += 1
+                self._part_offset = 0
+
+        data = b"".join(out)
+        self._position += len(data)
+        if self.callback and data:
+            self.callback(self._position, self.len)
+        return data
+
+    def _read_file(self, part: FilePart, size: int) -> bytes:
+        if self._file_part is not part:
+            self.close()
+            self._file = open(part.path, "rb", buffering=self.chunk_size)
+            self._file_part = part
+        position = part.offset + self._part_offset
+        if self._file.tell() != position:
+            self._file.seek(position)
+
+        data = self._file.read(size)
+        if len(data) < size:
+            raise IOError(f"{part.path} is shorter than expected")
+        return data
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+        self._file = None
+        self._file_part = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ChunkReader:
+    """
+    File-like raw body over a FilePart, read from disk as it is sent.
+
+    `callback(bytes_sent, total_bytes)` is called as the body is read.
+    """
+
+    def __init__(
+        self,
+        part: FilePart,
+        callback: Optional[Callable[[int, int], None]] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.part = part
+        self.callback = callback
+        self.len = part.length
+        self._file = open(part.path, "rb", buffering=chunk_size)
+        self.seek(0)
+
+    def __len__(self) -> int:
+        return self.len
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.len
+        self._position = max(0, min(offset, self.len))
+        self._file.seek(self.part.offset + self._position)
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.len - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+
+        data = self._file.read(size)
+        if len(data) < size:
+            raise IOError(f"{self.part.path} is shorter than expected")
+
+        self._position += len(data)
+        if self.callback and data:
+            self.callback(self._position, self.len)
+        return data
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -10,19 +10,28 @@ required_apps = ["frappe"]
 
 # Installation
 after_install = "frappe_social.install.after_install"
+after_migrate = [
+    "frappe_social.frappe_social.tasks.rebuild_schedule_index",
+    "frappe_social.frappe_social.tasks.rebuild_post_leaderboards",
+]
 
 # Scheduled Tasks
 scheduler_events = {
     "cron": {
         # Every minute - check for posts to publish
         "* * * * *": ["frappe_social.frappe_social.tasks.publish_scheduled_posts"],
+        # Every 15 minutes - refresh analytics of posts that are due (AnalyticsService.POST_REFRESH_TIERS)
+        "*/15 * * * *": ["frappe_social.frappe_social.tasks.fetch_post_analytics"],
         # Daily at midnight - reset rate limit counters
         "0 0 * * *": ["frappe_social.frappe_social.tasks.reset_rate_limit_counters"],
     },
     # Hourly - refresh expiring tokens AND fetch analytics
     "hourly": [
+        "frappe_social.frappe_social.tasks.rebuild_schedule_index",
+        "frappe_social.frappe_social.tasks.rebuild_post_leaderboards",
         "frappe_social.frappe_social.tasks.refresh_expiring_tokens",
         "frappe_social.frappe_social.tasks.fetch_daily_analytics",
-        "frappe_social.frappe_social.tasks.fetch_post_analytics",
     ],
+    # Daily - downsample old post metric points
+    "daily": ["frappe_social.frappe_social.tasks.downsample_post_metrics"],
 }
@@ -0,0 +1,26 @@
+def execute():
+    """
+    Add the composite and unique indexes the scheduler, analytics and reports rely on.
+
+    on_doctype_update only runs when a DocType is synced from changed JSON, so an
+    upgraded site would otherwise miss the keys declared there. add_index and
+    add_unique skip indexes that already exist.
+    """
+    from frappe_social.frappe_social.doctype.social_analytics import social_analytics
+    from frappe_social.frappe_social.doctype.social_analytics_metric import social_analytics_metric
+    from frappe_social.frappe_social.doctype.social_analytics_rollup import social_analytics_rollup
+    from frappe_social.frappe_social.doctype.social_integration import social_integration
+    from frappe_social.frappe_social.doctype.social_post import social_post
+    from frappe_social.frappe_social.doctype.social_post_analytics import social_post_analytics
+    from frappe_social.frappe_social.doctype.social_post_metric_point import social_post_metric_point
+
+    for module in (
+        social_post,
+        social_integration,
+        social_analytics,
+        social_analytics_metric,
+        social_analytics_rollup,
+        social_post_analytics,
+        social_post_metric_point,
+    ):
+        module.on_doctype_update()
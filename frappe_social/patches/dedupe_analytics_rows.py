@@ -0,0 +1,55 @@
+import frappe
+
+
+def execute():
+    """
+    Remove duplicate analytics rows before the unique upsert keys are added:
+    Social Analytics (integration, date), Social Analytics Metric (parent, metric_name)
+    and Social Post Analytics (social_post, platform, day of fetched_at).
+    The most recently written row of each group is kept.
+    """
+    # Account snapshots: drop the older copies and their metric rows
+    frappe.db.sql(
+        """
+        DELETE m FROM `tabSocial Analytics Metric` m
+        JOIN `tabSocial Analytics` a ON a.name = m.parent
+        JOIN `tabSocial Analytics` newer
+            ON newer.integration = a.integration
+            AND newer.date = a.date
+            AND (newer.modified > a.modified OR (newer.modified = a.modified AND newer.name > a.name))
+        WHERE m.parenttype = 'Social Analytics'
+        """
+    )
+    frappe.db.sql(
+        """
+        DELETE a FROM `tabSocial Analytics` a
+        JOIN `tabSocial Analytics` newer
+            ON newer.integration = a.integration
+            AND newer.date = a.date
+            AND (newer.modified > a.modified OR (newer.modified = a.modified AND newer.name > a.name))
+        """
+    )
+
+    frappe.db.sql(
+        """
+        DELETE m FROM `tabSocial Analytics Metric` m
+        JOIN `tabSocial Analytics Metric` newer
+            ON newer.parent = m.parent
+            AND newer.metric_name = m.metric_name
+            AND (newer.modified > m.modified OR (newer.modified = m.modified AND newer.name > m.name))
+        """
+    )
+
+    frappe.db.sql(
+        """
+        DELETE spa FROM `tabSocial Post Analytics` spa
+        JOIN `tabSocial Post Analytics` newer
+            ON newer.social_post = spa.social_post
+            AND newer.platform = spa.platform
+            AND DATE(newer.fetched_at) = DATE(spa.fetched_at)
+            AND (
+                newer.fetched_at > spa.fetched_at
+                OR (newer.fetched_at = spa.fetched_at AND newer.name > spa.name)
+            )
+        """
+    )
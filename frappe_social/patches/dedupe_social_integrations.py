@@ -0,0 +1,80 @@
+import frappe
+
+
+def execute():
+    """
+    Merge duplicate Social Integrations (same platform and profile_id) before the
+    unique key on that pair is added.
+
+    The enabled, connected integration is kept, else the most recently modified.
+    Posts and analytics of the duplicates move to it; where both hold a daily
+    account snapshot for the same date, the kept integration's snapshot wins.
+    """
+    # Blank ids would collide under the unique key; unconnected integrations have none
+    frappe.db.sql("UPDATE `tabSocial Integration` SET profile_id = NULL WHERE profile_id = ''")
+
+    groups = frappe.db.sql(
+        """
+        SELECT platform, profile_id
+        FROM `tabSocial Integration`
+        WHERE profile_id IS NOT NULL
+        GROUP BY platform, profile_id
+        HAVING COUNT(*) > 1
+        """,
+        as_dict=True,
+    )
+
+    for group in groups:
+        names = frappe.get_all(
+            "Social Integration",
+            filters={"platform": group.platform, "profile_id": group.profile_id},
+            order_by="enabled desc, (connection_status = 'Connected') desc, modified desc",
+            pluck="name",
+        )
+        keep, duplicates = names[0], names[1:]
+        for duplicate in duplicates:
+            merge_integration(duplicate, keep)
+
+    frappe.db.commit()
+
+
+def merge_integration(duplicate: str, keep: str) -> None:
+    params = {"duplicate": duplicate, "keep": keep}
+
+    # Snapshots for dates the kept integration already has would break (integration, date)
+    frappe.db.sql(
+        """
+        DELETE m FROM `tabSocial Analytics Metric` m
+        JOIN `tabSocial Analytics` a ON a.name = m.parent
+        JOIN `tabSocial Analytics` kept ON kept.integration = %(keep)s AND kept.date = a.date
+        WHERE a.integration = %(duplicate)s AND m.parenttype = 'Social Analytics'
+        """,
+        params,
+    )
+    frappe.db.sql(
+        """
+        DELETE a FROM `tabSocial Analytics` a
+        JOIN `tabSocial Analytics` kept ON kept.integration = %(keep)s AND kept.date = a.date
+        WHERE a.integration = %(duplicate)s
+        """,
+        params,
+    )
+
+    for doctype, field in (
+        ("Social Analytics", "integration"),
+        ("Social Post Analytics", "integration"),
+        ("Social Post", "account"),
+        ("Social Post Platform", "platform"),
+    ):
+        frappe.db.sql(
+            f"UPDATE `tab{doctype}` SET `{field}` = %(keep)s WHERE `{field}` = %(duplicate)s", params
+        )
+
+    # Rollups are derived: drop the duplicate's and recompute the kept integration's
+    if frappe.db.table_exists("Social Analytics Rollup"):
+        from frappe_social.frappe_social.services.analytics_rollup import AnalyticsRollup
+
+        frappe.db.delete("Social Analytics Rollup", {"integration": duplicate})
+        AnalyticsRollup.refresh([keep])
+
+    frappe.delete_doc("Social Integration", duplicate, force=True, ignore_permissions=True)
@@ -0,0 +1,12 @@
+import frappe
+
+
+def execute():
+    """Fill Social Post Analytics.bucket (the upsert key's day) for rows written before it existed"""
+    frappe.db.sql(
+        """
+        UPDATE `tabSocial Post Analytics`
+        SET bucket = DATE(fetched_at)
+        WHERE bucket IS NULL AND fetched_at IS NOT NULL
+        """
+    )